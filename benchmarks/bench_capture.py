@@ -0,0 +1,122 @@
+"""
+프록시 응답 캡처(youtube_capture) 벤치마크 / 재생 검증.
+
+benchmarks/flows 의 녹화된 유튜브 응답(manifest.json)을 사용합니다.
+  parse   응답별 압축 해제(gzip) + 추출 시간 (프록시 캡처 스레드에서 수행되는 작업:
+          메타데이터/자막 + 다음 볼 영상 목록). --page-mb 로 시청 페이지를 실제 크기(수 MB)로 부풀려 함께 측정합니다.
+  replay  추출 결과를 ingest_capture 로 서버(in-process)에 전달한 뒤 자막 Resource 를 읽어
+          캡처만으로 자막이 구성되는지(yt_dlp 미로드 = 유튜브 재요청 없음) 확인합니다.
+          다음 볼 영상 목록은 queue_watch_next 로 등록만 합니다 (유휴 대기 시간을 길게 두어 분석은 실행하지 않음).
+
+    python benchmarks/bench_capture.py --runs 50 --page-mb 2
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FLOW_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "flows")
+sys.path.insert(0, ROOT)
+
+# 메모리 전용 캐시 + Mock LLM 으로 서버 실행 (replay 단계)
+os.environ.update({
+    "LLM_PROVIDER": "openai", "OPENAI_API_KEY": "",
+    "TRANSCRIPT_STORE_DIR": "", "ANALYSIS_CACHE_PATH": "", "CAPTURE_CACHE_PATH": "",
+    "CAPTION_FIXTURE_DIR": "",
+    "WATCH_NEXT_ENABLED": "true", "WATCH_NEXT_IDLE_SECONDS": "3600",
+})
+
+from mcp_test import youtube_capture
+
+
+def load_flows() -> list[dict]:
+    with open(os.path.join(FLOW_DIR, "manifest.json"), encoding="utf-8") as f:
+        flows = json.load(f)
+    for flow in flows:
+        with open(os.path.join(FLOW_DIR, flow["file"]), "rb") as f:
+            flow["body"] = f.read()
+        flow["kind"] = youtube_capture.classify(urlsplit(flow["url"]).path)
+    return flows
+
+
+def extract(kind: str, url: str, body: bytes) -> tuple[dict | None, dict | None]:
+    """프록시 캡처 스레드와 같은 작업. 반환: (ingest_capture 인자, queue_watch_next 인자)"""
+    return youtube_capture.extract_capture(kind, url, body), youtube_capture.extract_watch_next(kind, body)
+
+
+def inflate_page(page: bytes, megabytes: float) -> bytes:
+    """시청 페이지를 실제 크기로 부풀림 (앞쪽 스크립트 + 뒤쪽 ytInitialData)"""
+    filler = b'<script nonce="bench">var ytcfg_pad = "' + b"x" * 1024 + b'";</script>'
+    half = int(megabytes * 1024 / 2)
+    head, sep, tail = page.partition(b"<body")
+    return head + filler * half + sep + tail.replace(b"</body>", filler * half + b"</body>")
+
+
+def bench_parse(flows: list[dict], runs: int, page_mb: float):
+    cases = [(flow["file"], flow["kind"], flow["url"], flow["body"]) for flow in flows]
+    watch = next(flow for flow in flows if flow["kind"] == "watch")
+    if page_mb > 0:
+        cases.append((f"watch.html x{page_mb:g}MB", "watch", watch["url"], inflate_page(watch["body"], page_mb)))
+
+    print(f"{'response':<28}{'size':>10}{'gzip':>10}{'p50 ms':>10}{'max ms':>10}")
+    for name, kind, url, body in cases:
+        compressed = gzip.compress(body)
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            payloads = extract(kind, url, gzip.decompress(compressed))
+            samples.append((time.perf_counter() - started) * 1000)
+        assert any(payloads), f"nothing extracted from {name}"
+        print(f"{name:<28}{len(body):>10}{len(compressed):>10}{statistics.median(samples):>10.2f}{max(samples):>10.2f}")
+
+
+async def replay(flows: list[dict]):
+    from mcp.shared.memory import create_connected_server_and_client_session
+    from mcp_test.server import server
+
+    async with create_connected_server_and_client_session(server) as session:
+        video_ids = []
+        for flow in flows:
+            payload, upcoming = extract(flow["kind"], flow["url"], flow["body"])
+            if payload:
+                result = await session.call_tool("ingest_capture", arguments=payload)
+                print(f"  ingest {flow['file']:<22} -> {result.content[0].text}")
+                video_ids.append(payload["video_id"])
+            if upcoming:
+                result = await session.call_tool("queue_watch_next", arguments=upcoming)
+                state = json.loads(result.content[0].text)
+                print(f"  watch-next {flow['file']:<18} -> {upcoming['video_id']}: pending {state['pending']}")
+
+        for video_id in dict.fromkeys(video_ids):
+            resource = await session.read_resource(f"youtube://transcript/{video_id}")
+            text = resource.contents[0].text
+            lines = text.count("\n[")
+            print(f"  transcript {video_id}: {lines} caption lines, header={text.splitlines()[0]!r}")
+            assert lines > 0, f"{video_id}: transcript has no captions"
+
+    loaded = "yt_dlp" in sys.modules
+    print(f"  yt_dlp loaded: {loaded}")
+    assert not loaded, "transcript fell back to yt-dlp"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--page-mb", type=float, default=2.0, help="부풀린 시청 페이지 크기 (0 = 생략)")
+    args = parser.parse_args()
+
+    flows = load_flows()
+    print("[parse]")
+    bench_parse(flows, args.runs, args.page_mb)
+    print("[replay]")
+    asyncio.run(replay(flows))
+
+
+if __name__ == "__main__":
+    main()
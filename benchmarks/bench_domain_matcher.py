@@ -0,0 +1,75 @@
+"""
+SponsorDetector 도메인 필터 마이크로 벤치마크.
+
+기존 방식(any(domain in host ...))과 DomainMatcher(캐시 미적중 / 적중)의
+호출당 비용을 실제와 비슷한 호스트 분포로 비교합니다.
+
+    python benchmarks/bench_domain_matcher.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_test.config import config
+from mcp_test.domains import DomainMatcher
+
+# 시스템 전체 트래픽을 흉내낸 호스트 목록 (YouTube 관련 약 30%)
+YOUTUBE_HOSTS = [
+    "www.youtube.com", "m.youtube.com", "i.ytimg.com", "youtubei.googleapis.com",
+    "rr3---sn-ab5l6nrz.googlevideo.com", "rr1---sn-3u-bh2ss.googlevideo.com",
+    "www.youtube-nocookie.com", "music.youtube.com",
+]
+OTHER_HOSTS = [
+    "www.google.com", "fonts.gstatic.com", "github.com", "api.github.com",
+    "cdn.jsdelivr.net", "login.microsoftonline.com", "update.googleapis.com",
+    "notyoutube.com.evil", "youtube.com.attacker.net", "static.xx.fbcdn.net",
+    "d1.awsstatic.com", "clients4.google.com", "safebrowsing.googleapis.com",
+]
+RANDOM_SUBDOMAINS = [f"edge-{i}.cdn{i % 17}.example{i % 5}.net" for i in range(2000)]
+
+
+def build_mix(n: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    hosts = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.3:
+            hosts.append(rng.choice(YOUTUBE_HOSTS))
+        elif r < 0.8:
+            hosts.append(rng.choice(OTHER_HOSTS))
+        else:
+            hosts.append(rng.choice(RANDOM_SUBDOMAINS))
+    return hosts
+
+
+def legacy_match(host: str) -> bool:
+    return any(domain in host for domain in config.ALLOWED_DOMAINS)
+
+
+def bench(label: str, func, hosts: list[str], repeat: int = 5):
+    best = min(timeit.repeat(lambda: [func(h) for h in hosts], number=1, repeat=repeat))
+    print(f"{label:<28} {best / len(hosts) * 1e9:8.1f} ns/call")
+
+
+def main():
+    hosts = build_mix(100_000)
+
+    matcher = DomainMatcher(config.ALLOWED_DOMAINS, config.DOMAIN_DECISION_CACHE_SIZE)
+    uncached = DomainMatcher(config.ALLOWED_DOMAINS)._match
+
+    print(f"hosts: {len(hosts)} calls, {len(set(hosts))} distinct")
+    bench("legacy any(substring)", legacy_match, hosts)
+    bench("DomainMatcher (no cache)", uncached, hosts)
+    bench("DomainMatcher (LRU)", matcher.matches, hosts)
+    print(matcher.cache_info())
+
+    # 정확성 차이 (기존 방식의 오탐)
+    false_positives = sorted({h for h in hosts if legacy_match(h) and not matcher.matches(h)})
+    print(f"legacy false positives: {false_positives}")
+
+
+if __name__ == "__main__":
+    main()
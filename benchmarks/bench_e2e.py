@@ -0,0 +1,333 @@
+"""
+analyze_sponsor_block 종단간(End-to-End) 지연 시간 벤치마크.
+
+- yt-dlp 대신 benchmarks/fixtures 의 로컬 자막 파일을 사용합니다 (CAPTION_FIXTURE_DIR).
+- LLM 대신 지연 주입이 가능한 가짜 OpenAI 호환 서버(fake_llm.py)를 띄웁니다.
+- mcp_test.server 를 stdio / SSE 로 실행하여 단계별 p50/p95/p99 와 처리량을 보고합니다.
+
+단계 정의 (ms):
+  spawn       stdio 서버 프로세스 생성
+  initialize  인터프리터 기동 + import + initialize 핸드셰이크 (SSE 는 연결 + 핸드셰이크)
+  fetch       서버 측 자막 확보 (_meta.timings.fetch)
+  llm         서버 측 LLM 분석 (_meta.timings.llm)
+  ttft        호출 시작 ~ 첫 스트리밍 토큰(progress notification) 수신
+  serialize   클라이언트 왕복 - 서버 핸들러 시간 (JSON-RPC 직렬화 + 전송)
+  total       클라이언트 측 call_tool 왕복
+
+    python benchmarks/bench_e2e.py --transport both --iterations 20 --concurrency 4
+    # 모델 캐스케이드: 작은 모델(빠름) -> bench-model(느림), confidence 로 재분석 여부 결정
+    python benchmarks/bench_e2e.py --profile small=0.05:0.9 --profile bench-model=0.5:0.95
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.sse import sse_client
+from mcp.client.stdio import stdio_client
+
+from fake_llm import parse_profile, start_fake_llm
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+STAGES = ("spawn", "initialize", "fetch", "llm", "ttft", "serialize", "total")
+
+
+# ==============================================================================
+# Fixtures
+# ==============================================================================
+def prepare_fixtures(target: str, copies: int, long_hours: float) -> list[str]:
+    """벤치마크용 자막 디렉터리 구성. 반환: 분석할 video_id 목록"""
+    for name in os.listdir(FIXTURE_DIR):
+        shutil.copy(os.path.join(FIXTURE_DIR, name), target)
+    video_ids = sorted({name.split(".")[0] for name in os.listdir(FIXTURE_DIR)})
+
+    # 동시 실행 측정 시 요청 병합(coalescing)을 피하기 위한 복제본
+    for i in range(copies):
+        shutil.copy(os.path.join(FIXTURE_DIR, "bench_short.vtt"), os.path.join(target, f"bench_copy{i}.vtt"))
+        video_ids.append(f"bench_copy{i}")
+
+    if long_hours > 0:
+        events = [
+            {"tStartMs": i * 3000, "dDurationMs": 3000, "segs": [{"utf8": f"segment {i} talking about the product"}]}
+            for i in range(int(long_hours * 3600 / 3))
+        ]
+        with open(os.path.join(target, "bench_long.json3"), "w") as f:
+            json.dump({"events": events}, f)
+        with open(os.path.join(target, "bench_long.info.json"), "w") as f:
+            json.dump({"title": f"{long_hours}h synthetic video", "description": "long"}, f)
+        video_ids.append("bench_long")
+    return video_ids
+
+
+def server_env(fixture_dir: str, llm_url: str, transport: str, port: int | None = None) -> dict:
+    env = os.environ.copy()
+    env.update({
+        "MCP_TRANSPORT": transport,
+        "LLM_PROVIDER": "ollama",
+        "OLLAMA_BASE_URL": llm_url,
+        "LLM_MODEL": "bench-model",
+        "CAPTION_FIXTURE_DIR": fixture_dir,
+        "PYTHONPATH": ROOT,
+        "NO_PROXY": "*",
+        "no_proxy": "*",
+    })
+    # 영속 캐시는 사용하지 않음 (매 실행 동일 조건)
+    for key in ("TRANSCRIPT_STORE_DIR", "ANALYSIS_CACHE_PATH", "CAPTURE_CACHE_PATH"):
+        env.pop(key, None)
+    if port:
+        env["MCP_SSE_HOST"] = "127.0.0.1"
+        env["MCP_SSE_PORT"] = str(port)
+    return env
+
+
+# ==============================================================================
+# Measurement
+# ==============================================================================
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, dict[str, list[float]]] = {}
+        self.throughput: dict[str, float] = {}
+        self.errors: dict[str, int] = {}
+
+    def add(self, phase: str, stage: str, seconds: float):
+        self.samples.setdefault(phase, {}).setdefault(stage, []).append(seconds * 1000)
+
+    def error(self, phase: str):
+        self.errors[phase] = self.errors.get(phase, 0) + 1
+
+    @staticmethod
+    def percentile(values: list[float], pct: float) -> float:
+        ordered = sorted(values)
+        index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+        return ordered[index]
+
+    def summary(self) -> dict:
+        result = {}
+        for phase, stages in self.samples.items():
+            result[phase] = {
+                stage: {
+                    "n": len(values),
+                    "p50": self.percentile(values, 50),
+                    "p95": self.percentile(values, 95),
+                    "p99": self.percentile(values, 99),
+                    "mean": sum(values) / len(values),
+                }
+                for stage, values in stages.items()
+            }
+            if phase in self.throughput:
+                result[phase]["throughput_per_s"] = self.throughput[phase]
+            if phase in self.errors:
+                result[phase]["errors"] = self.errors[phase]
+        return result
+
+    def print_report(self):
+        for phase, stages in self.summary().items():
+            print(f"\n== {phase} ==")
+            print(f"{'stage':<12}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}  (ms)")
+            for stage in STAGES:
+                s = stages.get(stage)
+                if s:
+                    print(f"{stage:<12}{s['n']:>6}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}{s['mean']:>10.1f}")
+            if "throughput_per_s" in stages:
+                print(f"throughput: {stages['throughput_per_s']:.2f} calls/s")
+            if "errors" in stages:
+                print(f"errors: {stages['errors']}")
+
+
+async def timed_call(session: ClientSession, recorder: Recorder, phase: str, video_id: str, force_refresh: bool):
+    started = time.perf_counter()
+    first_token = None
+
+    async def _on_progress(progress, total, message):
+        nonlocal first_token
+        if first_token is None:
+            first_token = time.perf_counter()
+
+    result = await session.call_tool(
+        "analyze_sponsor_block",
+        arguments={"video_id": video_id, "force_refresh": force_refresh},
+        progress_callback=_on_progress,
+    )
+    total = time.perf_counter() - started
+    text = result.content[0].text if result.content else ""
+    if result.isError or text.startswith("LLM API Error"):
+        recorder.error(phase)
+        return
+
+    recorder.add(phase, "total", total)
+    if first_token is not None:
+        recorder.add(phase, "ttft", first_token - started)
+    timings = (result.meta or {}).get("timings")
+    if timings:
+        recorder.add(phase, "fetch", timings["fetch"])
+        recorder.add(phase, "llm", timings["llm"])
+        recorder.add(phase, "serialize", max(total - timings["handler"], 0.0))
+
+
+async def run_calls(make_session, recorder: Recorder, phase: str, video_ids: list[str],
+                    iterations: int, concurrency: int, force_refresh: bool):
+    """concurrency 개의 세션으로 iterations 회 호출"""
+    queue = asyncio.Queue()
+    for i in range(iterations):
+        queue.put_nowait(video_ids[i % len(video_ids)])
+
+    async def _worker():
+        async with make_session() as session:
+            while not queue.empty():
+                video_id = queue.get_nowait()
+                await timed_call(session, recorder, phase, video_id, force_refresh)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[_worker() for _ in range(concurrency)])
+    recorder.throughput[phase] = iterations / (time.perf_counter() - started)
+
+
+# ==============================================================================
+# Transports
+# ==============================================================================
+async def bench_stdio(args, env: dict, video_ids: list[str], recorder: Recorder):
+    params = StdioServerParameters(command=sys.executable, args=["-m", "mcp_test.server"], env=env)
+
+    # 1. 콜드 스타트 (프로세스 생성 + 초기화)
+    for _ in range(args.startups):
+        started = time.perf_counter()
+        async with stdio_client(params) as (read, write):
+            spawned = time.perf_counter()
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                recorder.add("stdio/startup", "spawn", spawned - started)
+                recorder.add("stdio/startup", "initialize", time.perf_counter() - spawned)
+
+    # 2. 하나의 세션에서 반복 호출 (proxy_addon 의 장기 세션과 동일)
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            class _Shared:
+                async def __aenter__(self):
+                    return session
+
+                async def __aexit__(self, *exc):
+                    return False
+
+            await run_calls(_Shared, recorder, "stdio/fresh", video_ids, args.iterations, 1, True)
+            await run_calls(_Shared, recorder, "stdio/cached", video_ids, args.iterations, 1, False)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"SSE server did not start on port {port}")
+
+
+async def bench_sse(args, fixture_dir: str, llm_url: str, video_ids: list[str], recorder: Recorder):
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "mcp_test.server"],
+        env=server_env(fixture_dir, llm_url, "sse", port),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/sse"
+    try:
+        await wait_for_port(port)
+
+        # 1. 연결 + 초기화
+        for _ in range(args.startups):
+            started = time.perf_counter()
+            async with sse_client(url) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    recorder.add("sse/connect", "initialize", time.perf_counter() - started)
+
+        class _SseSession:
+            async def __aenter__(self):
+                self._client = sse_client(url)
+                read, write = await self._client.__aenter__()
+                self._session = ClientSession(read, write)
+                session = await self._session.__aenter__()
+                await session.initialize()
+                return session
+
+            async def __aexit__(self, *exc):
+                await self._session.__aexit__(*exc)
+                await self._client.__aexit__(*exc)
+                return False
+
+        # 2. 동시 클라이언트 처리량
+        await run_calls(_SseSession, recorder, "sse/fresh", video_ids, args.iterations, args.concurrency, True)
+        await run_calls(_SseSession, recorder, "sse/cached", video_ids, args.iterations, args.concurrency, False)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+async def main_async(args):
+    recorder = Recorder()
+    profiles = dict(parse_profile(p) for p in args.profile)
+    # bench-model(LLM_MODEL) 외의 프로필 모델은 지정 순서대로 캐스케이드 앞 단계로 사용
+    cascade = [model for model in profiles if model != "bench-model"]
+    if cascade:
+        os.environ["CASCADE_MODELS"] = ",".join(cascade)
+    httpd, llm_url = start_fake_llm(ttft=args.ttft, token_delay=args.token_delay, profiles=profiles)
+    fixture_dir = tempfile.mkdtemp(prefix="mcp_bench_")
+    try:
+        video_ids = prepare_fixtures(fixture_dir, args.concurrency, args.long_hours)
+        print(f"fixtures: {video_ids}")
+        print(f"fake LLM: {llm_url} (ttft={args.ttft}s, token_delay={args.token_delay}s)")
+        if args.transport in ("stdio", "both"):
+            await bench_stdio(args, server_env(fixture_dir, llm_url, "stdio"), video_ids, recorder)
+        if args.transport in ("sse", "both"):
+            await bench_sse(args, fixture_dir, llm_url, video_ids, recorder)
+    finally:
+        httpd.shutdown()
+        shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    recorder.print_report()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(recorder.summary(), f, indent=2)
+        print(f"\nwrote {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=["stdio", "sse", "both"], default="both")
+    parser.add_argument("--iterations", type=int, default=20, help="단계별 tool 호출 횟수")
+    parser.add_argument("--startups", type=int, default=3, help="콜드 스타트/연결 측정 횟수")
+    parser.add_argument("--concurrency", type=int, default=4, help="SSE 동시 클라이언트 수")
+    parser.add_argument("--ttft", type=float, default=0.2, help="가짜 LLM 첫 토큰 지연(초)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="가짜 LLM 토큰 간 지연(초)")
+    parser.add_argument("--profile", action="append", default=[],
+                        help="가짜 LLM 모델별 model=ttft:confidence (반복 가능, bench-model 외 모델은 캐스케이드 앞 단계)")
+    parser.add_argument("--long-hours", type=float, default=1.0, help="합성 장시간 자막 길이(시간), 0 이면 생략")
+    parser.add_argument("--json", help="결과 JSON 저장 경로 (PR 간 비교용)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+mcp_test.server 기동 시간 벤치마크.
+
+proxy_addon.py 는 stdio 서버를 프로세스로 띄우므로, initialize 응답까지의 시간이
+곧 첫 분석 요청의 대기 시간에 더해집니다. 매 측정마다 새 인터프리터를 사용합니다.
+
+  import      python -c "import mcp_test.server" 종료까지 (인터프리터 기동 포함)
+  initialize  stdio 서버 spawn ~ initialize 응답 수신
+  modules     initialize + tools/list 이후 로드되지 않아야 하는 무거운 모듈 확인
+
+    python benchmarks/bench_import.py --runs 10 --top 15
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+# stdio 모드 기동 경로에서 지연 로드되어야 하는 모듈
+LAZY_MODULES = ("yt_dlp", "openai", "numpy")
+
+CHECK_MODULES = f"""
+import asyncio, sys
+import mcp_test.tools
+asyncio.run(mcp_test.tools.handle_list_tools())
+print(",".join(m for m in {LAZY_MODULES!r} if m in sys.modules))
+"""
+
+
+def server_env() -> dict:
+    env = os.environ.copy()
+    env.update({"MCP_TRANSPORT": "stdio", "PYTHONPATH": ROOT})
+    return env
+
+
+def measure_import(runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", "import mcp_test.server"],
+            env=server_env(), check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def measure_initialize(runs: int) -> list[float]:
+    params = StdioServerParameters(command=sys.executable, args=["-m", "mcp_test.server"], env=server_env())
+    samples = []
+    with open(os.devnull, "w") as devnull:
+        for _ in range(runs):
+            started = time.perf_counter()
+            async with stdio_client(params, errlog=devnull) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    samples.append(time.perf_counter() - started)
+    return samples
+
+
+def loaded_lazy_modules() -> list[str]:
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK_MODULES],
+        env=server_env(), check=True, capture_output=True, text=True,
+    )
+    return [m for m in result.stdout.strip().split(",") if m]
+
+
+def import_profile(top: int) -> list[tuple[int, str]]:
+    """-X importtime 누적 시간 상위 모듈 (us, module)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import mcp_test.server"],
+        env=server_env(), check=True, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), module.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def report(name: str, samples: list[float]):
+    ms = sorted(s * 1000 for s in samples)
+    print(f"{name:<12} median {statistics.median(ms):8.1f} ms   min {ms[0]:8.1f}   max {ms[-1]:8.1f}   (n={len(ms)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="-X importtime 상위 N개 모듈 출력")
+    args = parser.parse_args()
+
+    report("import", measure_import(args.runs))
+    report("initialize", asyncio.run(measure_initialize(args.runs)))
+
+    loaded = loaded_lazy_modules()
+    print(f"{'modules':<12} {'OK (lazy: ' + ', '.join(LAZY_MODULES) + ')' if not loaded else 'loaded eagerly: ' + ', '.join(loaded)}")
+
+    if args.top:
+        print(f"\nTop {args.top} imports by cumulative time:")
+        for cumulative, module in import_profile(args.top):
+            print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
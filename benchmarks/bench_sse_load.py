@@ -0,0 +1,345 @@
+"""
+SSE 전송(run_sse) 부하 테스트: 수백 개의 동시 MCP 세션.
+
+- mcp_test.server 를 SSE 모드로 띄우고 (가짜 LLM + 로컬 자막 fixture), 세션을 동시에 엽니다.
+- 각 세션은 GET /sse 스트림 + POST /messages/ 로 list_tools / call_tool / read_resource 를 섞어 실행합니다.
+- 실패 원인을 HTTP 상태 코드 단위로 보기 위해 mcp 클라이언트 대신 JSON-RPC 를 직접 주고받습니다.
+  (mcp 의 sse_client 는 POST 실패를 로그로만 남기고 응답을 기다리다 타임아웃됩니다)
+
+보고 항목:
+  connect      GET /sse ~ initialize 응답 (세션 수립 시간)
+  list/call/read  작업별 왕복 지연 p50/p95/p99/max
+  memory       세션 수립 전후 서버 RSS (멀티 워커는 자식 프로세스 합산, /proc 이 있는 환경만)
+  failures     단계별 실패 원인 (HTTP 503/429/413, timeout, 연결 오류 등)
+
+    python benchmarks/bench_sse_load.py --sessions 300 --ops 10 --mix list=2,call=1,read=2
+    python benchmarks/bench_sse_load.py --sessions 300 --max-sessions 200     # 한도 초과 시 동작 확인
+    python benchmarks/bench_sse_load.py --url http://127.0.0.1:8000 --sessions 50  # 실행 중인 서버 대상
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from bench_e2e import Recorder, free_port, prepare_fixtures, server_env, wait_for_port
+from fake_llm import start_fake_llm
+
+OPS = ("list", "call", "read")
+
+
+class LoadError(Exception):
+    """실패 원인 분류용 (kind 가 보고서에 집계됨)"""
+
+    def __init__(self, kind: str):
+        super().__init__(kind)
+        self.kind = kind
+
+
+def classify(exc: BaseException) -> str:
+    if isinstance(exc, LoadError):
+        return exc.kind
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return "timeout"
+    return type(exc).__name__
+
+
+# ==============================================================================
+# Raw SSE + JSON-RPC client
+# ==============================================================================
+class LoadSession:
+    """GET /sse 스트림 1개 + POST 요청으로 구성된 MCP 세션 (응답은 id 로 매칭)"""
+
+    def __init__(self, client: httpx.AsyncClient, base_url: str, timeout: float):
+        self.client = client
+        self.base_url = base_url
+        self.timeout = timeout
+        self.endpoint = None
+        self._ids = itertools.count(1)
+        self._waiting: dict[int, asyncio.Future] = {}
+        self._endpoint_ready = asyncio.Event()
+        self._stream = None
+        self._reader = None
+
+    async def connect(self):
+        request = self.client.build_request("GET", self.base_url + "/sse")
+        self._stream = await self.client.send(request, stream=True)
+        if self._stream.status_code != 200:
+            status = self._stream.status_code
+            await self._stream.aclose()
+            raise LoadError(f"HTTP {status}")
+        self._reader = asyncio.create_task(self._read_events())
+        await asyncio.wait_for(self._endpoint_ready.wait(), self.timeout)
+        if self.endpoint is None:
+            raise LoadError("stream closed")
+        await self.request("initialize", {
+            "protocolVersion": "2025-06-18",
+            "capabilities": {},
+            "clientInfo": {"name": "bench-sse-load", "version": "1.0"},
+        })
+        await self._post({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    async def _read_events(self):
+        event, data = "message", []
+        try:
+            async for line in self._stream.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].strip())
+                elif not line and data:
+                    self._dispatch(event, "\n".join(data))
+                    event, data = "message", []
+        except Exception:
+            pass
+        finally:
+            self._endpoint_ready.set()
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(LoadError("stream closed"))
+
+    def _dispatch(self, event: str, data: str):
+        if event == "endpoint":
+            self.endpoint = self.base_url + data
+            self._endpoint_ready.set()
+            return
+        message = json.loads(data)
+        future = self._waiting.get(message.get("id"))
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    async def _post(self, message: dict):
+        response = await self.client.post(self.endpoint, json=message)
+        if response.status_code != 202:
+            raise LoadError(f"HTTP {response.status_code}")
+
+    async def request(self, method: str, params: dict | None = None) -> dict:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        try:
+            await self._post({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}})
+            message = await asyncio.wait_for(future, self.timeout)
+        finally:
+            self._waiting.pop(request_id, None)
+        if "error" in message:
+            raise LoadError(f"rpc {message['error'].get('code')}")
+        return message["result"]
+
+    async def close(self):
+        if self._reader:
+            self._reader.cancel()
+        if self._stream:
+            await self._stream.aclose()
+
+
+# ==============================================================================
+# Load
+# ==============================================================================
+def parse_mix(text: str) -> list[str]:
+    """"list=2,call=1,read=2" -> 가중치만큼 반복된 작업 목록"""
+    weights = []
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in OPS:
+            raise argparse.ArgumentTypeError(f"unknown op: {name} (choose from {', '.join(OPS)})")
+        weights += [name] * int(weight or 1)
+    return weights
+
+
+async def run_op(session: LoadSession, op: str, video_id: str):
+    if op == "list":
+        await session.request("tools/list")
+    elif op == "call":
+        result = await session.request("tools/call", {
+            "name": "analyze_sponsor_block", "arguments": {"video_id": video_id},
+        })
+        if result.get("isError"):
+            raise LoadError("tool error")
+    else:
+        await session.request("resources/read", {"uri": f"youtube://transcript/{video_id}?bytes=0-1023"})
+
+
+async def run_session(args, client, base_url, video_ids, mix, recorder, failures, opened, done):
+    session = LoadSession(client, base_url, args.timeout)
+    try:
+        started = time.perf_counter()
+        try:
+            await session.connect()
+        except Exception as e:
+            failures[("connect", classify(e))] += 1
+            return
+        recorder.add("load", "connect", time.perf_counter() - started)
+        opened.append(session)
+
+        # 모든 세션이 열린 뒤 동시에 작업 시작 (세션당 메모리 측정 구간)
+        await done.wait()
+        for _ in range(args.ops):
+            op = random.choice(mix)
+            started = time.perf_counter()
+            try:
+                await run_op(session, op, random.choice(video_ids))
+            except Exception as e:
+                failures[(op, classify(e))] += 1
+                continue
+            recorder.add("load", op, time.perf_counter() - started)
+        await asyncio.sleep(args.hold)
+    finally:
+        await session.close()
+
+
+def rss_kb(pid: int) -> int | None:
+    """프로세스 + 하위 프로세스 RSS 합 (KB), /proc 이 없으면 None"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        children = []
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                children += [int(c) for c in f.read().split()]
+    except (OSError, StopIteration):
+        return None
+    return rss + sum(rss_kb(child) or 0 for child in children)
+
+
+async def scrape_rejections(client: httpx.AsyncClient, base_url: str) -> dict[str, float]:
+    try:
+        text = (await client.get(base_url + "/metrics", timeout=5)).text
+    except httpx.HTTPError:
+        return {}
+    rejected = {}
+    for line in text.splitlines():
+        if line.startswith("mcp_sse_rejected_total{"):
+            sample, _, value = line.rpartition(" ")
+            labels = sample[len("mcp_sse_rejected_total"):]
+            rejected[labels] = rejected.get(labels, 0) + float(value)
+    return rejected
+
+
+async def run_load(args, base_url: str, video_ids: list[str], pid: int | None):
+    recorder = Recorder()
+    failures: Counter = Counter()
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=args.sessions)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(args.timeout, read=None), limits=limits) as client:
+        baseline = rss_kb(pid) if pid else None
+        opened: list[LoadSession] = []
+        done = asyncio.Event()
+
+        started = time.perf_counter()
+        tasks = []
+        for i in range(args.sessions):
+            tasks.append(asyncio.create_task(
+                run_session(args, client, base_url, video_ids, mix, recorder, failures, opened, done)))
+            if args.connect_rate > 0:
+                await asyncio.sleep(1 / args.connect_rate)
+        # 연결 단계가 끝날 때까지 대기 (성공 또는 실패)
+        while len(opened) + sum(v for (phase, _), v in failures.items() if phase == "connect") < args.sessions:
+            await asyncio.sleep(0.05)
+        connect_wall = time.perf_counter() - started
+        connected = rss_kb(pid) if pid else None
+
+        done.set()
+        started = time.perf_counter()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        ops_wall = time.perf_counter() - started - args.hold
+        rejected = await scrape_rejections(client, base_url)
+
+    print(f"\nsessions: {len(opened)}/{args.sessions} connected in {connect_wall:.2f}s")
+    print(f"{'stage':<12}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)")
+    for stage, values in recorder.samples.get("load", {}).items():
+        p = Recorder.percentile
+        print(f"{stage:<12}{len(values):>6}{p(values, 50):>10.1f}{p(values, 95):>10.1f}"
+              f"{p(values, 99):>10.1f}{max(values):>10.1f}")
+    total_ops = sum(len(v) for k, v in recorder.samples.get("load", {}).items() if k != "connect")
+    if ops_wall > 0:
+        print(f"throughput: {total_ops / ops_wall:.1f} ops/s")
+    if baseline is not None and connected is not None:
+        per_session = (connected - baseline) / max(len(opened), 1)
+        print(f"memory: {baseline / 1024:.1f} MB idle -> {connected / 1024:.1f} MB with "
+              f"{len(opened)} sessions ({per_session:.1f} KB/session)")
+    print("failures:" + ("" if failures else " none"))
+    for (phase, kind), count in sorted(failures.items()):
+        print(f"  {phase:<10}{kind:<24}{count:>6}")
+    if rejected:
+        print("server rejections: " + ", ".join(f"{k}={v:g}" for k, v in rejected.items()))
+
+    if args.json:
+        summary = recorder.summary().get("load", {})
+        summary["failures"] = {f"{phase}/{kind}": count for (phase, kind), count in failures.items()}
+        summary["connected"] = len(opened)
+        summary["memory_kb"] = {"idle": baseline, "connected": connected}
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nwrote {args.json}")
+
+
+async def main_async(args):
+    if args.url:
+        # 실행 중인 서버 대상 (메모리 측정 없음, analyze 는 서버에 있는 영상 ID 사용)
+        await run_load(args, args.url.rstrip("/"), args.video_ids.split(","), None)
+        return
+
+    httpd, llm_url = start_fake_llm(ttft=args.ttft, token_delay=args.token_delay)
+    fixture_dir = tempfile.mkdtemp(prefix="mcp_load_")
+    video_ids = prepare_fixtures(fixture_dir, 0, 0)
+    port = free_port()
+    env = server_env(fixture_dir, llm_url, "sse", port)
+    env.update({
+        "MCP_SSE_MAX_SESSIONS": str(args.max_sessions),
+        "MCP_SSE_WORKERS": str(args.workers),
+        "MCP_SSE_WORKER_BASE_PORT": str(free_port()),
+        "CLUSTER_CACHE_PATH": os.path.join(fixture_dir, "cluster", "cache.sqlite3"),
+        "WARMUP_DELAY": "0",
+    })
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "mcp_test.server"], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        await wait_for_port(port)
+        if args.workers > 1:
+            # 라우터가 먼저 포트를 열므로 워커 준비까지 대기
+            await asyncio.sleep(5)
+        print(f"server: pid={proc.pid} workers={args.workers} max_sessions={args.max_sessions} "
+              f"fake LLM ttft={args.ttft}s")
+        await run_load(args, f"http://127.0.0.1:{port}", video_ids, proc.pid)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        httpd.shutdown()
+        shutil.rmtree(fixture_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200, help="동시 세션 수")
+    parser.add_argument("--ops", type=int, default=10, help="세션당 작업 수")
+    parser.add_argument("--mix", default="list=2,call=1,read=2", help="작업 가중치 (list/call/read)")
+    parser.add_argument("--connect-rate", type=float, default=0, help="초당 연결 수 (0 = 한 번에)")
+    parser.add_argument("--hold", type=float, default=0.0, help="작업 후 연결 유지 시간(초)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="요청별 응답 대기 제한(초)")
+    parser.add_argument("--max-sessions", type=int, default=256, help="서버 MCP_SSE_MAX_SESSIONS")
+    parser.add_argument("--workers", type=int, default=1, help="서버 MCP_SSE_WORKERS")
+    parser.add_argument("--ttft", type=float, default=0.2, help="가짜 LLM 첫 토큰 지연(초)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="가짜 LLM 토큰 간 지연(초)")
+    parser.add_argument("--url", help="이미 실행 중인 서버 주소 (지정 시 서버를 띄우지 않음)")
+    parser.add_argument("--video-ids", default="bench_short", help="--url 사용 시 analyze 대상 (쉼표 구분)")
+    parser.add_argument("--json", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
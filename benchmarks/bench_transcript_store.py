@@ -0,0 +1,136 @@
+"""
+TranscriptStore 멀티 프로세스 읽기/압축 경합 검사 + 조회 처리량.
+
+SSE 멀티 워커는 같은 저장소 디렉터리를 공유하므로, 한 워커가 색인 행을 읽은 직후
+다른 워커가 압축(새 세대 파일로 복사 후 이전 파일 삭제)할 수 있습니다.
+쓰기 프로세스가 작은 compact_bytes 로 압축을 계속 일으키는 동안 읽기 프로세스들이
+get / read_range / read_bytes 결과를 검증하고, 예외나 다른 영상의 본문이 하나라도 나오면 실패(종료 코드 1)합니다.
+
+  writes      쓰기 프로세스의 set 횟수 (압축 횟수 포함)
+  reads       읽기 프로세스별 조회 횟수 / 초당 조회 수
+  errors      예외 또는 내용 불일치 (0 이어야 함)
+
+--stall-ms 는 읽기 프로세스가 색인 행을 읽은 뒤 매핑하기 전에 잠시 멈춰 경합 구간을 넓힙니다.
+(처리량만 볼 때는 --stall-ms 0)
+
+    python benchmarks/bench_transcript_store.py --readers 4 --seconds 5
+    # 재시도 없이 실행하면 경합이 드러남
+    python benchmarks/bench_transcript_store.py --retries 1
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mcp_test.transcript_store import TranscriptStore
+
+KEYS = 64
+LINES = 40
+
+
+def make_transcript(key: str, version: int) -> str:
+    """본문 모든 줄에 영상 ID 를 넣어 다른 영상/위치의 바이트를 읽으면 드러나도록 함"""
+    lines = [f"[{i * 5:.1f}-{i * 5 + 5:.1f}] {key} v{version} line {i} " + "x" * random.randint(0, 80)
+             for i in range(LINES)]
+    return f"Title: {key}\nDescription: \n\nTranscript:\n" + "\n".join(lines) + "\n"
+
+
+def open_store(directory: str, retries: int, stall: float = 0.0) -> TranscriptStore:
+    store = TranscriptStore("transcripts", directory, max_size=KEYS * 2, compact_bytes=64 * 1024)
+    store.STALE_RETRIES = retries
+    # 압축 검사를 자주 하도록
+    store.TRIM_INTERVAL = 4
+    if stall:
+        row = store._row
+
+        def stalled_row(*args):
+            found = row(*args)
+            time.sleep(random.uniform(0, stall))
+            return found
+
+        store._row = stalled_row
+    return store
+
+
+def writer(directory: str, retries: int, deadline: float, result):
+    store = open_store(directory, retries)
+    writes = 0
+    while time.time() < deadline:
+        key = f"vid{random.randrange(KEYS):03d}"
+        store[key] = make_transcript(key, writes)
+        writes += 1
+    result.put(("writer", writes, store.compactions, 0, []))
+
+
+def reader(directory: str, retries: int, stall: float, deadline: float, result):
+    store = open_store(directory, retries, stall)
+    reads, errors = 0, []
+    while time.time() < deadline:
+        key = f"vid{random.randrange(KEYS):03d}"
+        try:
+            kind = random.randrange(3)
+            if kind == 0:
+                text = store.get(key)
+                ok = text is None or (text.startswith(f"Title: {key}\n") and text.count(key) == LINES + 1)
+            elif kind == 1:
+                text = store.read_range(key, 50, 100)
+                ok = text is None or (text != "" and all(f" {key} v" in line for line in text.splitlines()))
+            else:
+                data = store.read_bytes(key, 0, 15)
+                ok = data is None or data.startswith(f"Title: {key}".encode())
+            if not ok:
+                errors.append(f"{key}: mismatched content")
+        except Exception as e:
+            errors.append(f"{key}: {type(e).__name__}: {e}")
+        reads += 1
+    result.put(("reader", reads, 0, len(errors), errors[:5]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--retries", type=int, default=TranscriptStore.STALE_RETRIES,
+                        help="TranscriptStore.STALE_RETRIES (1 = 재시도 없음)")
+    parser.add_argument("--stall-ms", type=float, default=1.0, help="색인 조회 ~ 매핑 사이 최대 지연(ms)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_transcript_store_")
+    # 모든 키를 먼저 채워 둠
+    seed = open_store(directory, args.retries)
+    for i in range(KEYS):
+        seed[f"vid{i:03d}"] = make_transcript(f"vid{i:03d}", 0)
+
+    ctx = multiprocessing.get_context("spawn")
+    result = ctx.Queue()
+    deadline = time.time() + args.seconds + 1.0  # spawn 기동 시간 여유
+    processes = [ctx.Process(target=writer, args=(directory, args.retries, deadline, result))]
+    processes += [ctx.Process(target=reader, args=(directory, args.retries, args.stall_ms / 1000, deadline, result))
+                  for _ in range(args.readers)]
+    for process in processes:
+        process.start()
+    outcomes = [result.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    failed = False
+    for role, count, compactions, error_count, errors in sorted(outcomes, reverse=True):
+        if role == "writer":
+            print(f"{'writes':<10} {count:8d}   compactions {compactions}")
+        else:
+            print(f"{'reads':<10} {count:8d}   {count / args.seconds:10.0f}/s   errors {error_count}")
+        failed = failed or error_count > 0
+        for error in errors:
+            print(f"    {error}")
+    print(f"{'result':<10} {'FAILED' if failed else 'OK'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+벤치마크용 가짜 OpenAI 호환 LLM 서버 (/v1/chat/completions).
+
+실제 모델 대신 고정된 스폰서 분석 JSON 을 돌려주며, 지연 시간을 주입할 수 있습니다.
+- ttft: 첫 토큰까지의 지연(초)
+- token_delay: 이후 토큰(청크) 사이 지연(초)
+- stream=true 요청은 SSE 청크로, 그 외에는 단일 JSON 응답으로 반환합니다.
+- profiles: 모델별 (ttft, confidence) - 모델 캐스케이드(작은 모델 -> 큰 모델) 측정용
+
+    python benchmarks/fake_llm.py --port 11435 --ttft 0.3 --token-delay 0.02
+    python benchmarks/fake_llm.py --profile small=0.05:0.5 --profile big=0.5:0.95
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_CONFIDENCE = 0.9
+
+
+def make_response(confidence: float) -> str:
+    return json.dumps({
+        "sponsor": "BenchVPN",
+        "segments": [{"start": 30.0, "end": 62.5, "sponsor": "BenchVPN"}],
+        "summary": "Sponsor read for BenchVPN near the start of the video.",
+        "confidence": confidence,
+    })
+
+
+RESPONSE = make_response(DEFAULT_CONFIDENCE)
+
+
+def parse_profile(text: str) -> tuple[str, tuple[float, float]]:
+    """"model=ttft:confidence" -> (model, (ttft, confidence))"""
+    model, _, spec = text.partition("=")
+    ttft, _, confidence = spec.partition(":")
+    return model, (float(ttft), float(confidence or DEFAULT_CONFIDENCE))
+
+
+def split_tokens(text: str, size: int = 8) -> list[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def make_handler(ttft: float, token_delay: float, profiles: dict | None = None):
+    profiles = profiles or {}
+
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = body.get("model", "fake")
+            model_ttft, confidence = profiles.get(model, (ttft, DEFAULT_CONFIDENCE))
+            response = RESPONSE if confidence == DEFAULT_CONFIDENCE else make_response(confidence)
+            time.sleep(model_ttft)
+
+            if not body.get("stream"):
+                payload = json.dumps({
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": response},
+                        "finish_reason": "stop",
+                    }],
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i, token in enumerate(split_tokens(response)):
+                if i:
+                    time.sleep(token_delay)
+                self._send_chunk(model, {"content": token}, None)
+            self._send_chunk(model, {}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+        def _send_chunk(self, model: str, delta: dict, finish_reason):
+            chunk = {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+    return FakeLLMHandler
+
+
+def start_fake_llm(host: str = "127.0.0.1", port: int = 0, ttft: float = 0.2, token_delay: float = 0.01,
+                   profiles: dict | None = None):
+    """백그라운드 스레드로 서버 시작. 반환: (server, base_url)"""
+    httpd = ThreadingHTTPServer((host, port), make_handler(ttft, token_delay, profiles))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://{host}:{httpd.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--profile", action="append", default=[], help="model=ttft:confidence (반복 가능)")
+    args = parser.parse_args()
+
+    profiles = dict(parse_profile(p) for p in args.profile)
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(args.ttft, args.token_delay, profiles))
+    print(f"Fake LLM listening on http://{args.host}:{args.port}/v1")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import json
+
+
+def extract_json(text: str) -> dict | None:
+    """LLM 응답에서 JSON 객체 추출 (코드 블록/앞뒤 설명 문구 허용)"""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        value = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def result_confidence(result: dict | None) -> float | None:
+    """분석 결과의 confidence (0~1). 백분율(0~100)로 답한 경우 환산, 없거나 잘못된 값이면 None"""
+    value = result.get("confidence") if result else None
+    if isinstance(value, str):
+        try:
+            value = float(value.strip().rstrip("%"))
+        except ValueError:
+            return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if 1 < value <= 100:
+        value /= 100
+    return float(value) if 0 <= value <= 1 else None
+
+
+def parse_timestamp(value) -> float | None:
+    """초(숫자) 또는 "HH:MM:SS" / "MM:SS" 문자열을 초 단위로 변환"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        seconds = 0.0
+        for part in value.strip().split(":"):
+            seconds = seconds * 60 + float(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def format_timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+def normalize_segments(result: dict) -> list[dict]:
+    """분석 결과 JSON 의 segments 를 {start, end, sponsor} 목록으로 정규화"""
+    segments = []
+    for seg in result.get("segments") or []:
+        if isinstance(seg, str) and "-" in seg:
+            # "02:30 - 03:15" 형식
+            start, _, end = seg.partition("-")
+            seg = {"start": start, "end": end}
+        if not isinstance(seg, dict):
+            continue
+        start, end = parse_timestamp(seg.get("start")), parse_timestamp(seg.get("end"))
+        if start is None or end is None or end < start:
+            continue
+        segments.append({"start": start, "end": end, "sponsor": seg.get("sponsor") or result.get("sponsor")})
+    return segments
+
+
+def merge_segments(segments: list[dict], gap: float = 2.0) -> list[dict]:
+    """겹치거나 gap 초 이내로 붙어있는 구간을 하나로 병합 (창 겹침으로 인한 중복 제거)"""
+    merged: list[dict] = []
+    for seg in sorted(segments, key=lambda s: s["start"]):
+        if merged and seg["start"] <= merged[-1]["end"] + gap:
+            last = merged[-1]
+            last["end"] = max(last["end"], seg["end"])
+            if not last.get("sponsor"):
+                last["sponsor"] = seg.get("sponsor")
+        else:
+            merged.append(dict(seg))
+    return merged
+
+
+def reduce_window_results(window_texts: list[str]) -> dict:
+    """창별 LLM 응답을 하나의 분석 결과로 합침"""
+    segments = []
+    failed = 0
+    for text in window_texts:
+        result = extract_json(text)
+        if result is None:
+            failed += 1
+            continue
+        segments.extend(normalize_segments(result))
+
+    merged = merge_segments(segments)
+    sponsors = list(dict.fromkeys(s["sponsor"] for s in merged if s.get("sponsor")))
+    return {
+        "sponsor": ", ".join(sponsors) if sponsors else None,
+        "segments": [
+            {
+                "start": round(s["start"], 2),
+                "end": round(s["end"], 2),
+                "timestamp": f"{format_timestamp(s['start'])} - {format_timestamp(s['end'])}",
+                "sponsor": s.get("sponsor"),
+            }
+            for s in merged
+        ],
+        "windows": len(window_texts),
+        "failed_windows": failed,
+    }
@@ -0,0 +1,317 @@
+import asyncio
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    크기 제한(LRU) + 만료 시간(TTL)을 갖는 캐시.
+    path 를 지정하면 SQLite 파일(WAL 모드)에 압축 저장하여 재시작 후에도 캐시가 유지되며,
+    같은 파일을 여는 여러 프로세스(SSE 멀티 워커)가 캐시를 공유합니다.
+
+    - max_size: 최대 항목 수 (초과 시 가장 오래 사용되지 않은 항목부터 제거)
+    - ttl: 항목 유효 시간(초). 0 이하이면 만료 없음
+    - path: SQLite 파일 경로. None 이면 메모리 전용
+
+    영속 모드에서는 SQLite 가 기준 저장소이고 메모리는 프로세스별 L1 캐시입니다.
+    조회 시 stored_at 만 비교하여 다른 프로세스가 갱신/삭제한 항목을 반영하되,
+    REVALIDATE_INTERVAL 안에 확인한 메모리 사본은 디스크 조회 없이 반환합니다.
+    디스크 항목도 마지막 사용 시각(accessed_at) 순으로 정리하며(LRU), 조회 시각은 모아 두었다가 쓰기 때 반영합니다.
+    이벤트 루프에서는 aget / aset / acontains 를 사용하면 디스크 작업이 스레드에서 실행됩니다.
+    """
+
+    # 영속 모드에서 디스크 항목 수를 max_size 로 정리하는 주기 (쓰기 횟수)
+    TRIM_INTERVAL = 32
+    # 영속 모드에서 메모리 사본을 디스크와 다시 비교하는 간격(초)
+    REVALIDATE_INTERVAL = 1.0
+
+    def __init__(self, name: str, max_size: int = 256, ttl: float = 0, path: str | None = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._checked: dict[str, float] = {}  # 키 -> 디스크와 마지막으로 비교한 시각 (monotonic)
+        self._touched: dict[str, float] = {}  # 디스크에 아직 반영하지 않은 조회 시각
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes = 0
+
+        # 통계 카운터
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if path:
+            self._open_db(path)
+
+    # ------------------------------------------------------------------
+    # 영속 저장소 (SQLite)
+    # ------------------------------------------------------------------
+    def _open_db(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # timeout: 다른 프로세스가 쓰기 잠금을 잡고 있을 때 대기(초)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        # WAL: 읽기와 쓰기가 서로를 막지 않음 (여러 워커 동시 접근)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} ("
+            "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, accessed_at REAL NOT NULL, value BLOB NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {self._table}_stored_at ON {self._table} (stored_at)")
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {self._table}_accessed_at ON {self._table} (accessed_at)")
+        self._warm_up()
+
+    @property
+    def _table(self) -> str:
+        return "cache_" + "".join(c if c.isalnum() else "_" for c in self.name)
+
+    def _warm_up(self):
+        """디스크에 남아있는 유효 항목을 최근 순으로 max_size 개까지 메모리에 적재"""
+        if self.ttl > 0:
+            self._db.execute(f"DELETE FROM {self._table} WHERE stored_at < ?", (time.time() - self.ttl,))
+        rows = self._db.execute(
+            f"SELECT key, stored_at, value FROM {self._table} ORDER BY accessed_at DESC LIMIT ?",
+            (self.max_size,),
+        ).fetchall()
+        for key, stored_at, blob in reversed(rows):
+            self._data[key] = (stored_at, self._decode(blob))
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    @staticmethod
+    def _decode(blob: bytes):
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def _db_write(self, key: str, stored_at: float, value):
+        self._db.execute(
+            f"INSERT OR REPLACE INTO {self._table} (key, stored_at, accessed_at, value) VALUES (?, ?, ?, ?)",
+            (key, stored_at, stored_at, self._encode(value)),
+        )
+        self._touched.pop(key, None)
+        self._flush_touched()
+        self._writes += 1
+        if self._writes % self.TRIM_INTERVAL == 0:
+            self._db_trim()
+
+    def _flush_touched(self):
+        """모아 둔 조회 시각을 디스크에 반영 (다른 프로세스의 정리 순서에도 사용)"""
+        if self._touched:
+            self._db.executemany(
+                f"UPDATE {self._table} SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(at, key) for key, at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _db_trim(self):
+        """디스크 항목을 최근 사용 순으로 max_size 개만 남김 (LRU)"""
+        self.evictions += self._db.execute(
+            f"DELETE FROM {self._table} WHERE key IN ("
+            f"SELECT key FROM {self._table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,),
+        ).rowcount
+
+    def _db_delete(self, key: str):
+        if self._db:
+            self._db.execute(f"DELETE FROM {self._table} WHERE key = ?", (key,))
+
+    def _db_get(self, key: str, cached: tuple[float, object] | None) -> tuple[float, object] | None:
+        """디스크 기준으로 항목 조회. 메모리 사본의 stored_at 이 같으면 역직렬화를 생략"""
+        now = time.monotonic()
+        if cached is not None and now - self._checked.get(key, float("-inf")) < self.REVALIDATE_INTERVAL:
+            return cached
+        self._checked[key] = now
+        row = self._db.execute(f"SELECT stored_at FROM {self._table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if cached is not None and cached[0] == row[0]:
+            return cached
+        row = self._db.execute(f"SELECT stored_at, value FROM {self._table} WHERE key = ?", (key,)).fetchone()
+        return (row[0], self._decode(row[1])) if row else None
+
+    # ------------------------------------------------------------------
+    # 내부 유틸
+    # ------------------------------------------------------------------
+    def _is_expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl > 0 and now - stored_at > self.ttl
+
+    def _purge_expired(self, now: float):
+        # OrderedDict 는 사용 순서이므로 전체를 훑어야 합니다.
+        expired = [k for k, (stored_at, _) in self._data.items() if self._is_expired(stored_at, now)]
+        for key in expired:
+            del self._data[key]
+            self._checked.pop(key, None)
+            self._db_delete(key)
+            self.expirations += 1
+
+    def _evict(self):
+        # 영속 모드에서는 메모리 사본만 제거 (디스크 항목은 다른 프로세스가 사용 중일 수 있음)
+        # 이 경우 evictions 는 _db_trim 이 디스크에서 지운 항목 수로 집계합니다.
+        while len(self._data) > self.max_size:
+            key, _ = self._data.popitem(last=False)
+            self._checked.pop(key, None)
+            if not self._db:
+                self.evictions += 1
+
+    def _forget(self, key: str):
+        self._data.pop(key, None)
+        self._checked.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # 공개 API (dict 호환)
+    # ------------------------------------------------------------------
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if self._db:
+                entry = self._db_get(key, entry)
+                if entry is None:
+                    self._forget(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            stored_at, value = entry
+            if self._is_expired(stored_at, time.time()):
+                self._forget(key)
+                self._db_delete(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            if self._db:
+                self._touched[key] = time.time()
+            self._evict()
+            self.hits += 1
+            return value
+
+    async def aget(self, key: str, default=None):
+        """get 의 비동기 버전 (영속 모드에서는 디스크 조회를 스레드에서 실행)"""
+        if self._db:
+            return await asyncio.to_thread(self.get, key, default)
+        return self.get(key, default)
+
+    def set(self, key: str, value):
+        now = time.time()
+        with self._lock:
+            self._data[key] = (now, value)
+            self._data.move_to_end(key)
+            if self._db:
+                self._db_write(key, now, value)
+                self._checked[key] = time.monotonic()
+            self._evict()
+
+    async def aset(self, key: str, value):
+        """set 의 비동기 버전 (영속 모드에서는 디스크 쓰기를 스레드에서 실행)"""
+        if self._db:
+            await asyncio.to_thread(self.set, key, value)
+        else:
+            self.set(key, value)
+
+    def pop(self, key: str, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if self._db:
+                entry = self._db_get(key, None)
+                self._db_delete(key)
+            self._checked.pop(key, None)
+            if entry is None:
+                return default
+            return entry[1]
+
+    def keys(self) -> list[str]:
+        """유효한 키 목록 (조회 통계/LRU 순서에 영향 없음)"""
+        with self._lock:
+            now = time.time()
+            if self._db:
+                cutoff = now - self.ttl if self.ttl > 0 else float("-inf")
+                rows = self._db.execute(
+                    f"SELECT key FROM {self._table} WHERE stored_at >= ? ORDER BY stored_at", (cutoff,)
+                ).fetchall()
+                return [key for (key,) in rows]
+            self._purge_expired(now)
+            return list(self._data.keys())
+
+    def page(self, after: tuple[float, str] | None = None, limit: int = 100) -> list[tuple[float, str]]:
+        """
+        저장 시각 순 키 목록의 한 페이지 (조회 통계/LRU 순서에 영향 없음).
+        after 는 이전 페이지 마지막 항목의 (stored_at, key) 로, 중간에 항목이 추가되어도 순서가 유지됩니다.
+        반환: [(stored_at, key), ...]
+        """
+        with self._lock:
+            now = time.time()
+            cutoff = now - self.ttl if self.ttl > 0 else float("-inf")
+            after = after or (float("-inf"), "")
+            if self._db:
+                rows = self._db.execute(
+                    f"SELECT stored_at, key FROM {self._table} "
+                    "WHERE stored_at >= ? AND (stored_at, key) > (?, ?) ORDER BY stored_at, key LIMIT ?",
+                    (cutoff, after[0], after[1], limit),
+                ).fetchall()
+                return [tuple(row) for row in rows]
+            self._purge_expired(now)
+            # 메모리 모드: 전체 정렬 대신 limit 개만 선택
+            return heapq.nsmallest(
+                limit,
+                (entry for entry in ((stored_at, key) for key, (stored_at, _) in self._data.items()) if entry > after),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._checked.clear()
+            self._touched.clear()
+            if self._db:
+                self._db.execute(f"DELETE FROM {self._table}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": self._size(),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "persistent": self._db is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _size(self) -> int:
+        if self._db:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+        return len(self._data)
+
+    def __setitem__(self, key: str, value):
+        self.set(key, value)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            if self._db:
+                entry = self._db_get(key, entry)
+                if entry is None:
+                    self._forget(key)
+                elif key in self._data:
+                    self._data[key] = entry
+            return entry is not None and not self._is_expired(entry[0], time.time())
+
+    async def acontains(self, key: str) -> bool:
+        """in 연산의 비동기 버전 (영속 모드에서는 디스크 조회를 스레드에서 실행)"""
+        if self._db:
+            return await asyncio.to_thread(self.__contains__, key)
+        return key in self
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size()
@@ -0,0 +1,238 @@
+import html
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from array import array
+from bisect import bisect_left
+
+# 자막 포맷 선호 순서 (json3 가 파싱이 가장 빠르고 정확함)
+CAPTION_EXT_PREFERENCE = ("json3", "vtt")
+
+_VTT_TIMING = re.compile(r"^(\S+)\s+-->\s+(\S+)")
+_VTT_TAG = re.compile(r"<[^>]+>")
+_TRANSCRIPT_LINE = re.compile(r"^\[(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)\] (.*)$")
+
+
+class SegmentStore:
+    """
+    타임스탬프 자막 구간 저장소.
+
+    구간마다 파이썬 객체를 만들지 않고, 시작/종료 시각은 array('d'),
+    텍스트는 하나의 문자열 + 오프셋 array('L') 로 보관하여
+    수 시간 분량의 자막도 적은 메모리로 다룰 수 있습니다.
+    """
+
+    __slots__ = ("starts", "ends", "offsets", "_parts", "_text")
+
+    def __init__(self):
+        self.starts = array("d")
+        self.ends = array("d")
+        self.offsets = array("L", [0])
+        self._parts: list[str] = []
+        self._text = None
+
+    def append(self, start: float, end: float, text: str):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.offsets.append(self.offsets[-1] + len(text))
+        self._parts.append(text)
+        self._text = None
+
+    @property
+    def text(self) -> str:
+        # 추가가 끝난 뒤 한 번만 합쳐서 보관
+        if self._text is None:
+            self._text = "".join(self._parts)
+            self._parts = [self._text]
+        return self._text
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def duration(self) -> float:
+        return self.ends[-1] if self.ends else 0.0
+
+    def segment_text(self, i: int) -> str:
+        return self.text[self.offsets[i]:self.offsets[i + 1]]
+
+    def index_at(self, t: float) -> int:
+        """시작 시각이 t 이상인 첫 구간의 인덱스"""
+        return bisect_left(self.starts, t)
+
+    def format_lines(self, i: int = 0, j: int | None = None) -> str:
+        """[start-end] text 형식의 줄 목록 (LLM 입력 / 캐시 직렬화 공용)"""
+        if j is None:
+            j = len(self)
+        text = self.text
+        return "\n".join(
+            f"[{self.starts[k]:.2f}-{self.ends[k]:.2f}] {text[self.offsets[k]:self.offsets[k + 1]]}"
+            for k in range(i, j)
+        )
+
+    def windows(self, size: float, overlap: float) -> list[tuple[float, float, int, int]]:
+        """
+        겹치는 시간 창으로 분할합니다.
+        반환: [(창 시작 시각, 창 종료 시각, 시작 인덱스, 끝 인덱스(미포함)), ...]
+        """
+        if not len(self):
+            return []
+        step = max(size - overlap, 1.0)
+        result = []
+        t = 0.0
+        end_of_video = self.duration
+        while t < end_of_video:
+            i, j = self.index_at(t), self.index_at(t + size)
+            if i < j:
+                result.append((t, min(t + size, end_of_video), i, j))
+            if t + size >= end_of_video:
+                break
+            t += step
+        return result
+
+
+# ==============================================================================
+# Parsers
+# ==============================================================================
+def _parse_vtt_time(value: str) -> float:
+    # HH:MM:SS.mmm 또는 MM:SS.mmm
+    seconds = 0.0
+    for part in value.replace(",", ".").split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def parse_vtt(data: str) -> SegmentStore:
+    """
+    WebVTT 파싱.
+    유튜브 자동 자막은 이전 줄을 반복하는 롤링 방식이므로 직전과 같은 줄은 건너뜁니다.
+    """
+    store = SegmentStore()
+    previous = None
+    start = end = None
+    lines: list[str] = []
+
+    def _flush():
+        nonlocal previous
+        for line in lines:
+            if line and line != previous:
+                store.append(start, end, line)
+                previous = line
+
+    for raw in data.splitlines():
+        match = _VTT_TIMING.match(raw)
+        if match:
+            if start is not None:
+                _flush()
+            start, end = _parse_vtt_time(match.group(1)), _parse_vtt_time(match.group(2))
+            lines = []
+        elif start is not None:
+            line = _VTT_TAG.sub("", raw).strip()
+            if line:
+                lines.append(line)
+            else:
+                _flush()
+                start = None
+    if start is not None:
+        _flush()
+    return store
+
+
+def parse_json3(data: str | bytes) -> SegmentStore:
+    """유튜브 json3 자막 파싱 ({"events": [{"tStartMs", "dDurationMs", "segs": [{"utf8"}]}]})"""
+    store = SegmentStore()
+    for event in json.loads(data).get("events", ()):
+        segs = event.get("segs")
+        if not segs:
+            continue
+        text = "".join(seg.get("utf8", "") for seg in segs).replace("\n", " ").strip()
+        if not text:
+            continue
+        start = event.get("tStartMs", 0) / 1000
+        store.append(start, start + event.get("dDurationMs", 0) / 1000, text)
+    return store
+
+
+def parse_timedtext_xml(data: str | bytes) -> SegmentStore:
+    """
+    유튜브 timedtext XML 파싱 (fmt 미지정 시 기본 응답).
+      srv1: <transcript><text start="초" dur="초">
+      srv2/srv3: <text t="ms" d="ms"> / <body><p t="ms" d="ms"><s>..</s></p>
+    """
+    store = SegmentStore()
+    for element in ET.fromstring(data).iter():
+        if element.tag not in ("text", "p"):
+            continue
+        if "start" in element.attrib:
+            start = float(element.get("start"))
+            end = start + float(element.get("dur", 0))
+        elif "t" in element.attrib:
+            start = int(element.get("t")) / 1000
+            end = start + int(element.get("d", 0)) / 1000
+        else:
+            continue
+        # srv1 은 본문이 한 번 더 HTML 이스케이프되어 있음 (&amp;#39;)
+        text = html.unescape("".join(element.itertext())).replace("\n", " ").strip()
+        if text:
+            store.append(start, end, text)
+    return store
+
+
+def parse_captions(data: str | bytes, ext: str) -> SegmentStore:
+    if ext == "json3":
+        return parse_json3(data)
+    if ext in ("srv1", "srv2", "srv3", "xml"):
+        return parse_timedtext_xml(data)
+    if ext == "vtt":
+        return parse_vtt(data.decode("utf-8") if isinstance(data, bytes) else data)
+    raise ValueError(f"Unsupported caption format: {ext}")
+
+
+def load_caption_file(path: str) -> SegmentStore:
+    """로컬 자막 파일 로드 (확장자로 포맷 판별)"""
+    ext = os.path.splitext(path)[1].lstrip(".").lower()
+    with open(path, "rb") as f:
+        return parse_captions(f.read(), ext)
+
+
+def pick_caption_track(info: dict, languages: list[str]) -> dict | None:
+    """
+    yt-dlp info 에서 사용할 자막 트랙 선택.
+    수동 자막 > 자동 자막, 언어는 languages 순서, 포맷은 CAPTION_EXT_PREFERENCE 순서로 우선합니다.
+    """
+    for source in ("subtitles", "automatic_captions"):
+        tracks = info.get(source) or {}
+        for lang in languages:
+            formats = tracks.get(lang)
+            if not formats:
+                continue
+            for ext in CAPTION_EXT_PREFERENCE:
+                for fmt in formats:
+                    if fmt.get("ext") == ext and fmt.get("url"):
+                        return fmt
+    return None
+
+
+# ==============================================================================
+# Transcript text <-> SegmentStore
+# ==============================================================================
+def format_transcript(title: str | None, description: str | None, store: SegmentStore | None) -> str:
+    """캐시/Resource 용 자막 텍스트 (헤더 + [start-end] 줄)"""
+    header = f"Title: {title}\nDesc: {(description or '')[:500]}..."
+    if not store or not len(store):
+        return f"{header}\nTranscript: (none)"
+    return f"{header}\nTranscript:\n{store.format_lines()}"
+
+
+def parse_transcript(transcript: str) -> tuple[str, SegmentStore]:
+    """format_transcript 결과를 (헤더, SegmentStore) 로 복원"""
+    header, sep, body = transcript.partition("\nTranscript:\n")
+    store = SegmentStore()
+    if not sep:
+        return transcript, store
+    for line in body.splitlines():
+        match = _TRANSCRIPT_LINE.match(line)
+        if match:
+            store.append(float(match.group(1)), float(match.group(2)), match.group(3))
+    return header, store
@@ -0,0 +1,300 @@
+import _thread
+import asyncio
+import os
+import sys
+import threading
+import time
+
+from .config import config
+from .core import logger
+from .metrics import Registry
+
+# 라우터 -> 워커 프록시 시 제외할 hop-by-hop 헤더
+HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade", "host",
+}
+
+# 워커가 죽었을 때 재시작까지 대기(초)
+RESTART_DELAY = 1.0
+
+
+def worker_prefix(worker_id) -> str:
+    """
+    워커별 경로 접두사. 워커는 이 값을 root_path 로 사용하므로 endpoint 이벤트에 포함되고,
+    라우터는 접두사를 떼고 워커로 전달합니다.
+    """
+    return f"/w/{worker_id}"
+
+
+def add_label(sample: str, name: str, value: str) -> str:
+    """Prometheus 샘플 줄에 라벨 추가"""
+    metric, _, rest = sample.partition(" ")
+    if "{" in metric:
+        head, _, labels = metric.partition("{")
+        return f'{head}{{{name}="{value}",{labels} {rest}'
+    return f'{metric}{{{name}="{value}"}} {rest}'
+
+
+def merge_expositions(texts: dict[str, str]) -> str:
+    """워커별 /metrics 출력을 worker 라벨을 붙여 하나로 합침 (메트릭 패밀리 단위로 묶음)"""
+    families: dict[str, tuple[list[str], list[str]]] = {}
+    for worker, text in texts.items():
+        current = None
+        for line in text.splitlines():
+            if line.startswith("# HELP "):
+                current = families.setdefault(line.split()[2], ([], []))
+                if not current[0]:
+                    current[0].append(line)
+            elif line.startswith("# TYPE "):
+                if current is not None and len(current[0]) < 2:
+                    current[0].append(line)
+            elif line and current is not None:
+                current[1].append(add_label(line, "worker", worker))
+    lines = []
+    for header, samples in families.values():
+        lines.extend(header)
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def watch_parent():
+    """
+    워커 측: 라우터(부모)가 종료되면 워커도 종료합니다.
+    stdin 파이프의 EOF 로 감지하므로 라우터가 강제 종료된 경우에도 동작합니다.
+    """
+    def _wait():
+        try:
+            while sys.stdin.buffer.read(4096):
+                pass
+        except (OSError, ValueError):
+            pass
+        logger.info("[Cluster] Router is gone, shutting down worker")
+        # uvicorn 의 SIGINT 처리로 정상 종료
+        _thread.interrupt_main()
+
+    threading.Thread(target=_wait, name="parent-watch", daemon=True).start()
+
+
+class Worker:
+    """SSE 워커 프로세스 하나 (127.0.0.1:port, 경로 접두사 /w/<id>)"""
+
+    def __init__(self, worker_id: int, port: int):
+        self.id = worker_id
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.process: asyncio.subprocess.Process | None = None
+        self.ready = False
+        self.streams = 0     # 이 워커로 연결된 SSE 스트림 수
+        self.restarts = 0
+
+    def env(self) -> dict:
+        env = os.environ.copy()
+        env.update({
+            "MCP_TRANSPORT": "sse",
+            "MCP_SSE_HOST": "127.0.0.1",
+            "MCP_SSE_PORT": str(self.port),
+            "MCP_SSE_WORKERS": "1",
+            "MCP_WORKER_ID": str(self.id),
+            # 캐시는 모든 워커가 같은 SQLite 파일 / 자막 저장소를 공유 (재시작 후에도 유지)
+            "TRANSCRIPT_STORE_DIR": config.TRANSCRIPT_STORE_DIR or os.path.join(
+                os.path.dirname(config.CLUSTER_CACHE_PATH), "transcripts"),
+            "ANALYSIS_CACHE_PATH": config.ANALYSIS_CACHE_PATH or config.CLUSTER_CACHE_PATH,
+            "CAPTURE_CACHE_PATH": config.CAPTURE_CACHE_PATH or config.CLUSTER_CACHE_PATH,
+        })
+        return env
+
+    async def start(self):
+        self.ready = False
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "mcp_test.server",
+            env=self.env(),
+            # 라우터 종료 감지용 파이프 (watch_parent)
+            stdin=asyncio.subprocess.PIPE,
+            # both 모드에서 stdio JSON-RPC 출력과 섞이지 않도록 stdout 분리 (로그는 stderr)
+            stdout=asyncio.subprocess.DEVNULL,
+        )
+        await self._wait_ready()
+
+    async def _wait_ready(self, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.process.returncode is None:
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", self.port)
+                writer.close()
+                self.ready = True
+                logger.info(f"[Cluster] Worker {self.id} ready on port {self.port} (pid {self.process.pid})")
+                return
+            except OSError:
+                await asyncio.sleep(0.1)
+        logger.error(f"[Cluster] Worker {self.id} failed to start")
+
+    async def supervise(self):
+        """워커가 종료되면 재시작 (공유 캐시는 유지, 해당 워커의 SSE 세션은 끊김)"""
+        try:
+            while True:
+                await self.start()
+                code = await self.process.wait()
+                self.ready = False
+                self.streams = 0
+                self.restarts += 1
+                logger.warning(f"[Cluster] Worker {self.id} exited with {code}, restarting")
+                await asyncio.sleep(RESTART_DELAY)
+        except asyncio.CancelledError:
+            await self.stop()
+            raise
+
+    async def stop(self):
+        self.ready = False
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), 5)
+            except asyncio.TimeoutError:
+                self.process.kill()
+
+
+class Cluster:
+    """
+    SSE 멀티 워커 라우터.
+
+    - GET /sse 는 연결된 스트림이 가장 적은 워커로 보냅니다.
+    - 워커는 root_path=/w/<id> 로 실행되므로 endpoint 이벤트가 /w/<id>/messages/?session_id=... 가 되고,
+      이후 POST 는 경로 접두사만 보고 스트림을 가진 워커로 전달됩니다 (라우터에 세션 상태 없음).
+    - /metrics 는 모든 워커의 메트릭을 worker 라벨로 합쳐서 노출합니다.
+    """
+
+    def __init__(self, workers: int, base_port: int):
+        self.workers = [Worker(i, base_port + i) for i in range(workers)]
+        self._next = 0
+        self._client = None
+        self.registry = Registry()
+        self.registry.callback(
+            "mcp_cluster_worker_streams", "SSE streams routed to each worker.", "gauge",
+            lambda: {(str(w.id),): w.streams for w in self.workers}, ("worker",))
+        self.registry.callback(
+            "mcp_cluster_worker_up", "Whether the worker is accepting requests.", "gauge",
+            lambda: {(str(w.id),): int(w.ready) for w in self.workers}, ("worker",))
+        self.registry.callback(
+            "mcp_cluster_worker_restarts_total", "Worker restarts.", "counter",
+            lambda: {(str(w.id),): w.restarts for w in self.workers}, ("worker",))
+
+    def pick(self) -> Worker | None:
+        """연결 수가 가장 적은 워커 (동률이면 라운드 로빈, 세션 한도에 찬 워커는 제외)"""
+        ready = [w for w in self.workers if w.ready and w.streams < config.SSE_MAX_SESSIONS]
+        if not ready:
+            return None
+        self._next += 1
+        ready = ready[self._next % len(ready):] + ready[:self._next % len(ready)]
+        return min(ready, key=lambda w: w.streams)
+
+    def get(self, worker_id: str) -> Worker | None:
+        try:
+            worker = self.workers[int(worker_id)]
+        except (ValueError, IndexError):
+            return None
+        return worker if worker.ready else None
+
+    async def proxy(self, request, worker: Worker, path: str, on_close=None):
+        """요청을 워커로 전달하고 응답을 스트리밍으로 돌려줌 (SSE 장기 연결 포함)"""
+        import httpx
+        from starlette.background import BackgroundTask
+        from starlette.responses import PlainTextResponse, StreamingResponse
+
+        headers = [(k, v) for k, v in request.headers.raw if k.decode("latin-1").lower() not in HOP_HEADERS]
+        # JSON-RPC 메시지 본문은 작으므로 한 번에 읽어서 전달 (한도 초과는 읽기 전에 거절)
+        length = request.headers.get("content-length", "")
+        if length.isdigit() and int(length) > config.SSE_MAX_BODY:
+            if on_close:
+                on_close()
+            return PlainTextResponse("Message too large", status_code=413)
+        body = await request.body() if request.method in ("POST", "PUT", "PATCH") else None
+        upstream = self._client.build_request(
+            request.method, worker.url + path, params=request.url.query, headers=headers, content=body,
+        )
+        try:
+            response = await self._client.send(upstream, stream=True)
+        except httpx.HTTPError as e:
+            if on_close:
+                on_close()
+            return PlainTextResponse(f"Worker {worker.id} unavailable: {e}", status_code=502)
+
+        async def _close():
+            await response.aclose()
+            if on_close:
+                on_close()
+
+        return StreamingResponse(
+            response.aiter_raw(),
+            status_code=response.status_code,
+            headers={k: v for k, v in response.headers.items() if k.lower() not in HOP_HEADERS | {"content-length"}},
+            background=BackgroundTask(_close),
+        )
+
+    async def handle_sse(self, request):
+        from starlette.responses import PlainTextResponse
+
+        worker = self.pick()
+        if worker is None:
+            return PlainTextResponse(
+                "No worker available", status_code=503, headers={"Retry-After": str(config.SSE_RETRY_AFTER)})
+        worker.streams += 1
+
+        def _release():
+            worker.streams = max(worker.streams - 1, 0)
+
+        return await self.proxy(request, worker, "/sse", on_close=_release)
+
+    async def handle_worker(self, request):
+        from starlette.responses import PlainTextResponse
+
+        worker = self.get(request.path_params["worker_id"])
+        if worker is None:
+            # 워커 재시작 등으로 세션이 사라짐 -> 클라이언트가 재연결하도록 404
+            return PlainTextResponse("Unknown worker", status_code=404)
+        # 워커의 uvicorn 이 root_path 를 다시 붙이므로 접두사를 떼고 전달
+        return await self.proxy(request, worker, "/" + request.path_params["path"])
+
+    async def handle_metrics(self, request):
+        from starlette.responses import PlainTextResponse
+
+        async def _fetch(worker: Worker):
+            try:
+                response = await self._client.get(f"{worker.url}/metrics", timeout=5)
+                return str(worker.id), response.text
+            except Exception:
+                return str(worker.id), ""
+
+        texts = dict(await asyncio.gather(*(_fetch(w) for w in self.workers if w.ready)))
+        body = self.registry.render() + merge_expositions(texts)
+        return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+    async def run(self):
+        import httpx
+        import uvicorn
+        from starlette.applications import Starlette
+        from starlette.routing import Route
+
+        os.makedirs(os.path.dirname(os.path.abspath(config.CLUSTER_CACHE_PATH)), exist_ok=True)
+        logger.info(f"[Cluster] Starting {len(self.workers)} SSE workers behind http://{config.SSE_HOST}:{config.SSE_PORT}")
+
+        # SSE 스트림은 끝나지 않으므로 읽기 타임아웃 없음
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, read=None),
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=64),
+        )
+        methods = ["GET", "POST", "DELETE", "OPTIONS"]
+        app = Starlette(routes=[
+            Route("/sse", endpoint=self.handle_sse),
+            Route("/metrics", endpoint=self.handle_metrics),
+            Route("/w/{worker_id}/{path:path}", endpoint=self.handle_worker, methods=methods),
+        ])
+        supervisors = [asyncio.create_task(w.supervise()) for w in self.workers]
+        try:
+            conf = uvicorn.Config(app, host=config.SSE_HOST, port=config.SSE_PORT, log_level="info")
+            await uvicorn.Server(conf).serve()
+        finally:
+            for task in supervisors:
+                task.cancel()
+            await asyncio.gather(*supervisors, return_exceptions=True)
+            await self._client.aclose()
@@ -10,10 +10,33 @@ class Config:
     
     # 전송 모드: "stdio", "sse", "both"
     TRANSPORT = os.getenv("MCP_TRANSPORT", "stdio").lower()
+    # 기동 후 무거운 모듈(openai, yt_dlp)을 백그라운드로 미리 로드하기까지 대기(초), 음수 = 비활성
+    WARMUP_DELAY = float(os.getenv("WARMUP_DELAY", "1.0"))
     
     # SSE(Online) 설정
     SSE_HOST = os.getenv("MCP_SSE_HOST", "0.0.0.0")
     SSE_PORT = int(os.getenv("MCP_SSE_PORT", "8000"))
+    # [수정] 개발용 옵션: Starlette 디버그(오류 시 스택 트레이스 응답), 허용 Origin (쉼표 구분, "*" = 전체)
+    # 프록시/MCP 클라이언트는 브라우저가 아니므로 기본값은 디버그 끔 + CORS 헤더 없음
+    SSE_DEBUG = os.getenv("MCP_SSE_DEBUG", "false").lower() == "true"
+    SSE_CORS_ORIGINS = [o.strip() for o in os.getenv("MCP_SSE_CORS_ORIGINS", "").split(",") if o.strip()]
+
+    # [신규] SSE 과부하 제한 (프로세스 단위, 멀티 워커는 워커마다 적용)
+    # 한도를 넘으면 대기시키지 않고 바로 거절하여 과부하 시에도 예측 가능하게 실패합니다.
+    #   세션 수 초과 -> 503 + Retry-After / POST 본문 초과 -> 413 / 세션의 처리 대기 메시지 초과 -> 429
+    SSE_MAX_SESSIONS = int(os.getenv("MCP_SSE_MAX_SESSIONS", "256"))
+    SSE_MAX_BODY = int(os.getenv("MCP_SSE_MAX_BODY", str(1024 * 1024)))
+    SSE_MAX_PENDING_MESSAGES = int(os.getenv("MCP_SSE_MAX_PENDING_MESSAGES", "32"))
+    SSE_RETRY_AFTER = int(os.getenv("MCP_SSE_RETRY_AFTER", "2"))
+
+    # [신규] SSE 멀티 워커: 2 이상이면 SSE_PORT 의 라우터 뒤에 워커 프로세스를 띄웁니다.
+    # 워커는 SSE_WORKER_BASE_PORT 부터 순서대로 127.0.0.1 에 바인딩되며,
+    # 캐시 PATH 가 없으면 CLUSTER_CACHE_PATH 의 SQLite(WAL) 파일을 공유합니다.
+    SSE_WORKERS = int(os.getenv("MCP_SSE_WORKERS", "1"))
+    SSE_WORKER_BASE_PORT = int(os.getenv("MCP_SSE_WORKER_BASE_PORT", str(SSE_PORT + 1)))
+    CLUSTER_CACHE_PATH = os.getenv("CLUSTER_CACHE_PATH", os.path.join(".cache", "mcp_cluster.sqlite3"))
+    # 라우터가 워커 프로세스에 지정하는 값 (직접 설정하지 않음)
+    WORKER_ID = os.getenv("MCP_WORKER_ID") or None
     
     # [수정] LLM 설정 (Ollama vs OpenAI)
     LLM_PROVIDER = os.getenv("LLM_PROVIDER", "ollama")
@@ -23,12 +46,112 @@ class Config:
     # OpenAI API 키
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+    # [신규] 모델 캐스케이드: 작은 모델부터 분석하고, 결과 JSON 이 깨졌거나 confidence 가
+    # CASCADE_MIN_CONFIDENCE 미만이면 다음 모델로 재분석합니다 (마지막 단계는 항상 LLM_MODEL).
+    # 쉼표 구분, 작은 모델부터 (예: "llama3.2:3b"). 비우면 LLM_MODEL 단일 호출.
+    # Ollama 는 단계별 모델이 번갈아 로드되지 않도록 OLLAMA_MAX_LOADED_MODELS 를 단계 수 이상으로 설정하세요.
+    CASCADE_MODELS = [m.strip() for m in os.getenv("CASCADE_MODELS", "").split(",") if m.strip()]
+    CASCADE_MIN_CONFIDENCE = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.7"))
+
+    # [신규] LLM 호출 스케줄러 (프로세스 단위, SSE 멀티 워커는 워커 수만큼 곱해짐)
+    # 동시 실행 수를 넘는 요청은 우선순위(클릭 > 일괄 분석 > 선행 수집) 순으로 대기합니다.
+    LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "2" if LLM_PROVIDER == "ollama" else "8"))
+    LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))  # 응답(스트림 청크) 읽기 제한(초)
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))  # 연결 오류/429/5xx 재시도 (토큰 수신 전까지만)
+    LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))  # 첫 재시도 대기(초), 이후 2배씩
+    LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", str(LLM_MAX_INFLIGHT + 4)))  # HTTP 연결 풀 크기
+
+    # [신규] 자막(Transcript) 캐시 설정
+    # 자막 본문은 추가 전용 파일 + 메모리 매핑 저장소에 보관합니다.
+    # DIR 를 지정하면 서버 재시작 후에도 유지됩니다. (없으면 임시 디렉터리)
+    TRANSCRIPT_CACHE_SIZE = int(os.getenv("TRANSCRIPT_CACHE_SIZE", "512"))
+    TRANSCRIPT_CACHE_TTL = float(os.getenv("TRANSCRIPT_CACHE_TTL", "86400"))  # 초 단위, 0 = 만료 없음
+    TRANSCRIPT_STORE_DIR = os.getenv("TRANSCRIPT_STORE_DIR") or None
+    # 데이터 파일이 이 크기 이상이고 교체/삭제된 바이트가 절반을 넘으면 압축
+    TRANSCRIPT_STORE_COMPACT_BYTES = int(os.getenv("TRANSCRIPT_STORE_COMPACT_BYTES", str(64 * 1024 * 1024)))
+
+    # [신규] 분석 결과 캐시 설정 (영상 + 자막 해시 + 모델 + 프롬프트 버전 기준)
+    ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "1024"))
+    ANALYSIS_CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL", "604800"))  # 기본 7일
+    ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH") or None
+
+    # [신규] yt-dlp 전용 워커 풀 설정
+    YTDLP_WORKERS = int(os.getenv("YTDLP_WORKERS", "4"))
+    YTDLP_QUEUE_SIZE = int(os.getenv("YTDLP_QUEUE_SIZE", "16"))  # 워커 외 추가 대기 허용 개수
+    YTDLP_TIMEOUT = float(os.getenv("YTDLP_TIMEOUT", "60"))  # 대기 + 실행 제한(초)
+
+    # [신규] 일괄 분석(analyze_sponsor_blocks) 단계별 동시 실행 제한
+    BATCH_FETCH_CONCURRENCY = int(os.getenv("BATCH_FETCH_CONCURRENCY", "4"))
+    BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "2"))
+    BATCH_MAX_VIDEOS = int(os.getenv("BATCH_MAX_VIDEOS", "50"))
+
+    # [신규] 자막(Caption) 수집 설정
+    # 우선 언어 순서 (수동 자막 > 자동 자막)
+    CAPTION_LANGS = [lang.strip() for lang in os.getenv("CAPTION_LANGS", "ko,en").split(",") if lang.strip()]
+    # 지정 시 네트워크 대신 {video_id}.json3 / {video_id}.vtt (+ {video_id}.info.json) 로컬 파일 사용
+    CAPTION_FIXTURE_DIR = os.getenv("CAPTION_FIXTURE_DIR") or None
+
+    # [신규] 프록시 응답 캡처: 브라우저가 받은 시청 페이지 / /youtubei/v1/player / /api/timedtext 응답에서
+    # 메타데이터와 자막을 추출해 서버로 전달하고, 서버는 yt-dlp 대신 이 데이터로 자막을 구성합니다.
+    CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "true").lower() == "true"
+    CAPTURE_MAX_BODY = int(os.getenv("CAPTURE_MAX_BODY", str(8 * 1024 * 1024)))  # 이보다 큰 응답은 건너뜀(바이트)
+    CAPTURE_CACHE_SIZE = int(os.getenv("CAPTURE_CACHE_SIZE", "64"))
+    CAPTURE_CACHE_TTL = float(os.getenv("CAPTURE_CACHE_TTL", "3600"))  # 자막 트랙 URL 은 몇 시간 뒤 만료됨
+    CAPTURE_CACHE_PATH = os.getenv("CAPTURE_CACHE_PATH") or None  # 캡처 레코드 SQLite 파일 (없으면 메모리 전용)
+    # ingest_capture 는 프록시가 띄운 stdio 세션에서만 받음 (트랙 URL 을 서버가 직접 요청하고 캐시를 공유하므로)
+    # 신뢰할 수 있는 네트워크에서 SSE 로 프록시를 연결할 때만 true
+    CAPTURE_ALLOW_SSE = os.getenv("CAPTURE_ALLOW_SSE", "false").lower() == "true"
+
+    # [신규] 긴 자막 분할 분석(Map-Reduce) 설정 (초 단위)
+    ANALYSIS_WINDOW_SECONDS = float(os.getenv("ANALYSIS_WINDOW_SECONDS", "600"))
+    ANALYSIS_WINDOW_OVERLAP = float(os.getenv("ANALYSIS_WINDOW_OVERLAP", "60"))
+    ANALYSIS_MAP_CONCURRENCY = int(os.getenv("ANALYSIS_MAP_CONCURRENCY", "3"))
+
+    # [신규] 로컬 스폰서 문구 사전 필터 (LLM 호출 전)
+    # 문구가 없으면 LLM 생략, 후보 구간이 좁으면 그 구간만 전송, 그 외에는 전체 자막 전송
+    PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "true").lower() == "true"
+    PREFILTER_MIN_SCORE = float(os.getenv("PREFILTER_MIN_SCORE", "2.0"))  # 후보 구간으로 인정할 최소 점수
+    PREFILTER_CONTEXT_SECONDS = float(os.getenv("PREFILTER_CONTEXT_SECONDS", "90"))  # 문구 앞뒤로 포함할 시간
+    PREFILTER_MAX_COVERAGE = float(os.getenv("PREFILTER_MAX_COVERAGE", "0.6"))  # 후보가 영상의 이 비율을 넘으면 전체 전송
+
+    # [신규] 스폰서 유사도 인덱스: 분석된 광고 멘트를 벡터로 저장하여 영상 간 유사 광고 검색 (find_similar_sponsors)
+    # 임베딩: "hash" (문자 n-gram 해싱, 외부 모델 없음) 또는 "ollama" (OLLAMA_BASE_URL 의 EMBEDDING_MODEL)
+    SPONSOR_INDEX_ENABLED = os.getenv("SPONSOR_INDEX_ENABLED", "false").lower() == "true"
+    SPONSOR_INDEX_PATH = os.getenv("SPONSOR_INDEX_PATH") or None  # 세그먼트 파일 디렉터리, 없으면 메모리 전용
+    EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "hash").lower()
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+    EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "512"))  # hash 방식 벡터 차원
+    SIMILAR_MIN_SCORE = float(os.getenv("SIMILAR_MIN_SCORE", "0.3"))  # 검색 결과 최소 코사인 유사도
+
+    # [신규] 선행 수집(Prefetch): 프록시가 /watch 를 감지하면 클릭 전에 미리 자막(옵션: 분석까지) 확보
+    PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"
+    PREFETCH_ANALYSIS = os.getenv("PREFETCH_ANALYSIS", "false").lower() == "true"
+    PREFETCH_DEBOUNCE = float(os.getenv("PREFETCH_DEBOUNCE", "1.5"))  # 빠른 영상 전환 시 마지막 영상만 수집
+    PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "1"))
+
+    # [신규] 다음 볼 영상(자동재생/추천) 유휴 시간 분석
+    # 프록시가 시청 페이지/next API 응답에서 다음 영상 목록을 추출해 서버 대기열로 보내고,
+    # 서버는 사용자 요청과 LLM 작업이 없을 때만 하나씩 분석하여 캐시에 넣어 둡니다.
+    WATCH_NEXT_ENABLED = os.getenv("WATCH_NEXT_ENABLED", "false").lower() == "true"
+    WATCH_NEXT_PER_PAGE = int(os.getenv("WATCH_NEXT_PER_PAGE", "3"))  # 페이지당 대기열에 넣을 영상 수 (자동재생 우선)
+    WATCH_NEXT_BUDGET_PER_HOUR = int(os.getenv("WATCH_NEXT_BUDGET_PER_HOUR", "20"))  # 시간당 분석 수 (캐시 적중 제외)
+    WATCH_NEXT_IDLE_SECONDS = float(os.getenv("WATCH_NEXT_IDLE_SECONDS", "10"))  # 마지막 사용자 요청 후 대기 시간
+
+    # [신규] resources/list 한 페이지당 항목 수 (nextCursor 로 다음 페이지 조회)
+    RESOURCE_PAGE_SIZE = int(os.getenv("RESOURCE_PAGE_SIZE", "100"))
+
+    # [신규] LLM 스트리밍 진행 알림(progress notification) 전송 최소 간격(초)
+    STREAM_PROGRESS_INTERVAL = float(os.getenv("STREAM_PROGRESS_INTERVAL", "0.2"))
+
     # [신규] 감시 허용 도메인 목록 (Whitelist)
-    # 이 도메인들에 포함된 문자열이 호스트명에 있으면 감시합니다.
+    # 호스트명이 이 도메인이거나 그 하위 도메인이면 감시합니다. (예: youtube.com -> www.youtube.com)
     ALLOWED_DOMAINS = [
         "youtube.com",
         "googlevideo.com",
         "youtube-nocookie.com"
     ]
+    # 호스트별 허용 판정 LRU 캐시 크기
+    DOMAIN_DECISION_CACHE_SIZE = int(os.getenv("DOMAIN_DECISION_CACHE_SIZE", "4096"))
 
 config = Config()
\ No newline at end of file
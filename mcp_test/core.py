@@ -1,10 +1,21 @@
 import asyncio
+import importlib
 import logging
 import json
-import yt_dlp
+import os
+import threading
+import time
+import urllib.request
 from mcp.server import Server
-from openai import AsyncOpenAI
 from .config import config
+from .cache import TTLCache
+from .transcript_store import TranscriptStore
+from .inflight import InflightGroup
+from .ytdlp_pool import YtDlpPool
+from . import captions
+from . import youtube_capture
+from .metrics import registry
+from .llm_scheduler import LLMScheduler
 
 # Logger 설정
 logging.basicConfig(level=logging.INFO)
@@ -14,40 +25,347 @@ logger = logging.getLogger("mcp_server")
 server = Server(config.MCP_SERVER_NAME)
 
 # 2. 공유 상태 (Resource Caching)
-transcript_cache = {}
+# 자막은 메모리 매핑 저장소 (자막이 늘어도 프로세스 메모리에 본문을 보관하지 않음, 시간/바이트 구간 조회 지원)
+transcript_cache = TranscriptStore(
+    "transcripts",
+    config.TRANSCRIPT_STORE_DIR,
+    max_size=config.TRANSCRIPT_CACHE_SIZE,
+    ttl=config.TRANSCRIPT_CACHE_TTL,
+    compact_bytes=config.TRANSCRIPT_STORE_COMPACT_BYTES,
+)
+
+# LLM 분석 결과 캐시 (동일 영상/모델/프롬프트 재분석 시 LLM 호출 생략, 옵션: SQLite 영속화)
+analysis_cache = TTLCache(
+    "analyses",
+    max_size=config.ANALYSIS_CACHE_SIZE,
+    ttl=config.ANALYSIS_CACHE_TTL,
+    path=config.ANALYSIS_CACHE_PATH,
+)
+
+# 프록시가 가로챈 유튜브 응답에서 추출한 메타데이터/자막 트랙 (video_id -> 레코드)
+# SSE 멀티 워커는 CLUSTER_CACHE_PATH 를 공유합니다.
+captured_cache = TTLCache(
+    "captures",
+    max_size=config.CAPTURE_CACHE_SIZE,
+    ttl=config.CAPTURE_CACHE_TTL,
+    path=config.CAPTURE_CACHE_PATH,
+)
+
+# 자막이 새로 저장될 때 호출할 콜백 목록 (video_id) -> Resource 구독 알림 등
+transcript_stored_hooks: list = []
+
+def initialization_options():
+    """initialize 응답 옵션 (Resource 구독 지원을 광고)"""
+    options = server.create_initialization_options()
+    if options.capabilities.resources:
+        # 저수준 Server 는 subscribe 를 항상 False 로 광고하므로 직접 설정
+        options.capabilities.resources.subscribe = True
+    return options
+
+# LLM 호출 동시 실행 제한 + 우선순위 대기열
+llm_scheduler = LLMScheduler(config.LLM_MAX_INFLIGHT)
+
+# 동시 중복 요청 병합 (같은 영상에 대한 자막 수집 / LLM 분석을 한 번만 수행)
+transcript_inflight = InflightGroup("transcripts")
+analysis_inflight = InflightGroup("analyses")
+
+# yt-dlp 전용 워커 풀 (워커별 YoutubeDL 인스턴스 재사용)
+ytdlp_pool = YtDlpPool(
+    workers=config.YTDLP_WORKERS,
+    queue_size=config.YTDLP_QUEUE_SIZE,
+    timeout=config.YTDLP_TIMEOUT,
+    ydl_opts={
+        'skip_download': True,
+        'writeautomaticsub': True,
+        'quiet': True,
+    },
+)
+
+# 메트릭 (SSE 모드에서 /metrics 로 노출)
+TRANSCRIPT_FETCH_SECONDS = registry.histogram(
+    "mcp_transcript_fetch_seconds", "Transcript fetch latency (yt-dlp or fixture).", ("source",))
+LLM_REQUEST_SECONDS = registry.histogram(
+    "mcp_llm_request_seconds", "LLM request latency until the last token.", ("model",))
+LLM_TTFT_SECONDS = registry.histogram(
+    "mcp_llm_time_to_first_token_seconds", "LLM time to first streamed token.", ("model",))
+TOOL_CALL_SECONDS = registry.histogram(
+    "mcp_tool_call_seconds", "Tool handler latency.", ("tool",))
+LLM_QUEUE_WAIT_SECONDS = registry.histogram(
+    "mcp_llm_queue_wait_seconds", "Time LLM requests wait for a scheduler slot.", ("priority",))
+YTDLP_QUEUE_WAIT_SECONDS = registry.histogram(
+    "mcp_ytdlp_queue_wait_seconds", "Time yt-dlp jobs wait for a worker.")
+CASCADE_RESULTS_TOTAL = registry.counter(
+    "mcp_cascade_results_total", "Model cascade outcomes per tier (accepted or escalation reason).",
+    ("tier", "outcome"))
+CASCADE_CONFIDENCE = registry.histogram(
+    "mcp_cascade_confidence", "Self-reported confidence of analysis results per tier.", ("tier",),
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0))
+WATCH_NEXT_RESULTS_TOTAL = registry.counter(
+    "mcp_watch_next_results_total", "Idle-time watch-next analyses by result.", ("result",))
+PREFILTER_DECISIONS_TOTAL = registry.counter(
+    "mcp_prefilter_decisions_total", "Local pre-filter decisions (skip, candidates, full).", ("path",))
+LLM_INPUT_CHARS_TOTAL = registry.counter(
+    "mcp_llm_input_chars_total", "Transcript characters sent to the LLM vs. available.", ("kind",))
+ERRORS_TOTAL = registry.counter(
+    "mcp_errors_total", "Errors by pipeline stage.", ("stage",))
+SSE_SESSIONS_ACTIVE = registry.gauge(
+    "mcp_sse_sessions_active", "Currently connected SSE sessions.")
+SSE_SESSIONS_TOTAL = registry.counter(
+    "mcp_sse_sessions_total", "SSE sessions opened since start.")
+SSE_REJECTED_TOTAL = registry.counter(
+    "mcp_sse_rejected_total", "SSE requests rejected by overload limits.", ("reason",))
+
+def _cache_stat(field: str):
+    return lambda: {(c.name,): c.stats()[field] for c in (transcript_cache, analysis_cache, captured_cache)}
+
+registry.callback("mcp_cache_hits_total", "Cache hits.", "counter", _cache_stat("hits"), ("cache",))
+registry.callback("mcp_cache_misses_total", "Cache misses.", "counter", _cache_stat("misses"), ("cache",))
+registry.callback("mcp_cache_evictions_total", "Cache LRU evictions.", "counter", _cache_stat("evictions"), ("cache",))
+registry.callback("mcp_cache_expirations_total", "Cache TTL expirations.", "counter", _cache_stat("expirations"), ("cache",))
+registry.callback("mcp_cache_entries", "Cache entries.", "gauge", _cache_stat("size"), ("cache",))
+registry.callback(
+    "mcp_inflight_coalesced_total", "Requests that joined an in-flight duplicate.", "counter",
+    lambda: {(g.name,): g.coalesced for g in (transcript_inflight, analysis_inflight)}, ("group",))
+registry.callback(
+    "mcp_ytdlp_queue_depth", "yt-dlp jobs waiting for a worker.", "gauge",
+    lambda: {(): ytdlp_pool.stats()["queue_depth"]})
+registry.callback(
+    "mcp_ytdlp_running", "yt-dlp jobs currently running.", "gauge",
+    lambda: {(): ytdlp_pool.stats()["running"]})
+registry.callback(
+    "mcp_ytdlp_rejected_total", "yt-dlp jobs rejected by backpressure.", "counter",
+    lambda: {(): ytdlp_pool.stats()["rejected"]})
+registry.callback(
+    "mcp_ytdlp_timeouts_total", "yt-dlp jobs that timed out.", "counter",
+    lambda: {(): ytdlp_pool.stats()["timeouts"]})
+ytdlp_pool.wait_observer = YTDLP_QUEUE_WAIT_SECONDS.observe
+registry.callback(
+    "mcp_llm_inflight", "LLM requests currently running.", "gauge",
+    lambda: {(): llm_scheduler.inflight})
+registry.callback(
+    "mcp_llm_queue_depth", "LLM requests waiting for a slot.", "gauge",
+    lambda: {(name,): depth for name, depth in llm_scheduler.queue_depth().items()}, ("priority",))
+registry.callback(
+    "mcp_llm_retries_total", "LLM request retries.", "counter",
+    lambda: {(): llm_scheduler.retries})
+llm_scheduler.wait_observer = LLM_QUEUE_WAIT_SECONDS.observe
 
 # 3. [수정] 외부 클라이언트 설정 (Ollama 지원)
-openai_client = None
-
-if config.LLM_PROVIDER == "ollama":
-    logger.info(f"Connecting to Local LLM (Ollama) at {config.OLLAMA_BASE_URL} [{config.LLM_MODEL}]")
-    # Ollama는 OpenAI API와 호환되므로 AsyncOpenAI 클라이언트를 그대로 사용합니다.
-    # api_key는 필수값이지만 Ollama에서는 무시되므로 더미 값을 넣습니다.
-    openai_client = AsyncOpenAI(
-        base_url=config.OLLAMA_BASE_URL,
-        api_key="ollama" 
-    )
-elif config.OPENAI_API_KEY:
-    logger.info("Connecting to OpenAI API")
-    openai_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
-else:
+# openai 패키지는 임포트 비용이 커서 첫 LLM 호출 시점에 클라이언트를 생성합니다 (stdio 기동 시간 단축).
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def llm_enabled() -> bool:
+    """LLM 설정 여부 (False 이면 Mock 모드)"""
+    return config.LLM_PROVIDER == "ollama" or bool(config.OPENAI_API_KEY)
+
+def get_llm_client():
+    """AsyncOpenAI 클라이언트 반환 (최초 호출 시 생성, 미설정 시 None)"""
+    global _llm_client
+    if _llm_client is not None or not llm_enabled():
+        return _llm_client
+    with _llm_client_lock:
+        if _llm_client is not None:
+            return _llm_client
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        # 재시도는 스케줄러가 담당 (백오프 중 자리를 반납하기 위해 SDK 재시도는 끔)
+        options = {
+            "timeout": httpx.Timeout(config.LLM_TIMEOUT, connect=config.LLM_CONNECT_TIMEOUT),
+            "max_retries": 0,
+            "http_client": DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_connections=config.LLM_POOL_CONNECTIONS,
+                max_keepalive_connections=config.LLM_POOL_CONNECTIONS,
+                keepalive_expiry=60,
+            )),
+        }
+        if config.LLM_PROVIDER == "ollama":
+            logger.info(f"Connecting to Local LLM (Ollama) at {config.OLLAMA_BASE_URL} [{config.LLM_MODEL}]")
+            # Ollama는 OpenAI API와 호환되므로 AsyncOpenAI 클라이언트를 그대로 사용합니다.
+            # api_key는 필수값이지만 Ollama에서는 무시되므로 더미 값을 넣습니다.
+            _llm_client = AsyncOpenAI(
+                base_url=config.OLLAMA_BASE_URL,
+                api_key="ollama",
+                **options,
+            )
+        else:
+            logger.info("Connecting to OpenAI API")
+            _llm_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY, **options)
+    return _llm_client
+
+def is_retryable_llm_error(e: Exception) -> bool:
+    """재시도할 LLM 오류: 연결 실패/타임아웃, 429, 5xx"""
+    import openai
+
+    if isinstance(e, openai.APIConnectionError):
+        return True
+    return isinstance(e, openai.APIStatusError) and (e.status_code in (408, 429) or e.status_code >= 500)
+
+if not llm_enabled():
     logger.warning("No valid LLM configuration found. Mock mode will be used.")
 
+async def warm_up(delay: float):
+    """initialize 응답 이후 유휴 시간에 LLM 클라이언트 / yt_dlp 를 미리 로드 (첫 호출 지연 완화)"""
+    await asyncio.sleep(delay)
+    try:
+        await asyncio.to_thread(get_llm_client)
+        if not config.CAPTION_FIXTURE_DIR:
+            await asyncio.to_thread(importlib.import_module, "yt_dlp")
+    except Exception as e:
+        # 실패해도 첫 호출 시 다시 시도되므로 경고만 남김
+        logger.warning(f"Warm-up failed: {e}")
+
 # 4. 공통 유틸리티 함수
+def load_fixture_transcript(video_id: str) -> str:
+    """CAPTION_FIXTURE_DIR 의 로컬 자막/메타데이터 파일로 자막 텍스트 구성 (테스트/벤치마크용)"""
+    base = os.path.join(config.CAPTION_FIXTURE_DIR, video_id)
+    info = {}
+    if os.path.exists(base + ".info.json"):
+        with open(base + ".info.json", encoding="utf-8") as f:
+            info = json.load(f)
+    store = None
+    for ext in captions.CAPTION_EXT_PREFERENCE:
+        if os.path.exists(f"{base}.{ext}"):
+            store = captions.load_caption_file(f"{base}.{ext}")
+            break
+    if store is None and not info:
+        raise FileNotFoundError(f"No caption fixture for {video_id}")
+    return captions.format_transcript(info.get("title", video_id), info.get("description"), store)
+
+# 캡처 병합(조회 -> 수정 -> 저장) 사이에 다른 캡처가 끼어들지 않도록 직렬화
+capture_lock = asyncio.Lock()
+
+async def store_capture(video_id: str, payload: dict) -> dict:
+    """프록시 캡처를 기존 레코드에 병합 (시청 페이지와 timedtext 응답은 따로 도착)"""
+    async with capture_lock:
+        record = await captured_cache.aget(video_id) or {}
+        for key in ("title", "description", "tracks", "captions"):
+            if payload.get(key) is not None:
+                record[key] = payload[key]
+        record["captured_at"] = time.time()
+        await captured_cache.aset(video_id, record)
+    return record
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """리다이렉트로 유튜브 밖의 주소를 요청하지 않도록 3xx 응답은 오류로 처리"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+_track_opener = urllib.request.build_opener(_NoRedirect)
+
+def _download_track(track: dict) -> captions.SegmentStore:
+    url = youtube_capture.track_url(track)
+    # 트랙 URL 은 클라이언트가 보낸 값이므로 요청 직전에 다시 확인
+    if not youtube_capture.is_caption_url(url):
+        raise ValueError(f"refusing non-YouTube caption URL: {url[:200]}")
+    with _track_opener.open(url, timeout=config.YTDLP_TIMEOUT) as resp:
+        data = resp.read()
+    if not data.strip():
+        raise ValueError("empty caption response")
+    return captions.parse_json3(data)
+
+async def transcript_from_capture(video_id: str) -> str | None:
+    """
+    프록시 캡처로 자막 텍스트 구성 (메타데이터가 없으면 None -> yt-dlp 사용).
+    브라우저가 받은 자막 본문이 선호 트랙이면 그대로 쓰고, 아니면 트랙 URL 하나만 받습니다.
+    (yt-dlp 의 시청 페이지/플레이어 API 재요청 없음)
+    """
+    record = await captured_cache.aget(video_id)
+    if not record or "title" not in record:
+        return None
+    track = youtube_capture.pick_track(record.get("tracks") or [], config.CAPTION_LANGS)
+    captured = record.get("captions")
+    store = None
+    if captured and (track is None or (
+        captured["language"] == track["language"] and (captured["kind"] == "asr") == (track["kind"] == "asr")
+    )):
+        store = captions.parse_captions(captured["data"], captured["ext"])
+    elif track:
+        try:
+            store = await asyncio.to_thread(_download_track, track)
+        except Exception as e:
+            logger.info(f"[Capture] Caption track download failed for {video_id}: {e}")
+            if not captured:
+                return None
+            store = captions.parse_captions(captured["data"], captured["ext"])
+    return captions.format_transcript(record["title"], record.get("description"), store)
+
 async def fetch_transcript(video_id: str) -> str:
-    """yt-dlp를 사용하여 자막 메타데이터를 가져옵니다."""
-    def _download():
-        ydl_opts = {
-            'skip_download': True,
-            'writeautomaticsub': True,
-            'quiet': True,
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            try:
-                info = ydl.extract_info(video_id, download=False)
-                return f"Title: {info.get('title')}\nDesc: {info.get('description')[:500]}..."
-            except Exception as e:
-                return f"Error: {str(e)}"
-
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, _download)
\ No newline at end of file
+    """
+    메타데이터와 타임스탬프 자막(수동 > 자동)을 가져옵니다.
+    프록시 캡처가 있으면 그것을 사용하고, 없으면 yt-dlp로 수집합니다.
+    """
+    started = time.perf_counter()
+    try:
+        transcript = await transcript_from_capture(video_id)
+    except Exception as e:
+        logger.warning(f"[Capture] Ignoring capture for {video_id}: {e}")
+        transcript = None
+    if transcript is not None:
+        TRANSCRIPT_FETCH_SECONDS.observe(time.perf_counter() - started, source="capture")
+        return transcript
+
+    def _download(ydl):
+        info = ydl.extract_info(video_id, download=False)
+        store = None
+        track = captions.pick_caption_track(info, config.CAPTION_LANGS)
+        if track:
+            # 같은 YoutubeDL 의 네트워크 설정(프록시/쿠키)으로 자막 파일 다운로드
+            with ydl.urlopen(track["url"]) as resp:
+                store = captions.parse_captions(resp.read(), track["ext"])
+        return captions.format_transcript(info.get('title'), info.get('description'), store)
+
+    source = "fixture" if config.CAPTION_FIXTURE_DIR else "ytdlp"
+    started = time.perf_counter()
+    try:
+        if config.CAPTION_FIXTURE_DIR:
+            return await asyncio.to_thread(load_fixture_transcript, video_id)
+        return await ytdlp_pool.submit(_download)
+    except Exception as e:
+        # 풀 포화(Backpressure) / 타임아웃 포함
+        ERRORS_TOTAL.inc(stage="fetch")
+        return f"Error: {str(e)}"
+    finally:
+        TRANSCRIPT_FETCH_SECONDS.observe(time.perf_counter() - started, source=source)
+
+async def fetch_playlist_ids(playlist_url: str, limit: int) -> list[str]:
+    """재생목록 URL 에서 영상 ID 목록만 추출 (개별 영상 정보는 조회하지 않음)"""
+    def _expand(ydl):
+        info = ydl.extract_info(playlist_url, download=False, process=False)
+        if "entries" not in info:
+            # 재생목록이 아닌 단일 영상 URL
+            return [info["id"]] if info.get("id") else []
+        video_ids = []
+        for entry in info.get("entries") or []:
+            if entry and entry.get("id"):
+                video_ids.append(entry["id"])
+            if len(video_ids) >= limit:
+                break
+        return video_ids
+
+    return await ytdlp_pool.submit(_expand)
+
+async def load_transcript(video_id: str, force_refresh: bool = False) -> str:
+    """
+    캐시된 자막을 반환하고, 없으면 수집하여 캐시에 저장합니다.
+    같은 영상에 대한 동시 수집 요청은 하나로 합쳐집니다.
+    수집에 실패하면 "Error: ..." 문자열을 반환하며, 이 결과는 저장하지 않습니다.
+    """
+    if not force_refresh:
+        cached = await transcript_cache.aget(video_id)
+        if cached:
+            return cached
+
+    async def _fetch_and_store():
+        transcript = await fetch_transcript(video_id)
+        # 오류 결과는 저장/알림 없이 반환 (Resource 목록과 구독자에게 자막으로 보이지 않도록)
+        if transcript.startswith("Error:"):
+            return transcript
+        await transcript_cache.aset(video_id, transcript)  # Resource 조회를 위해 캐싱
+        for hook in transcript_stored_hooks:
+            hook(video_id)
+        return transcript
+
+    return await transcript_inflight.run(video_id, _fetch_and_store)
@@ -0,0 +1,34 @@
+from functools import lru_cache
+
+
+def normalize_host(host: str) -> str:
+    return host.strip().lower().rstrip(".")
+
+
+class DomainMatcher:
+    """
+    도메인 접미사(Suffix) 매처.
+
+    설정의 도메인 목록으로 정확히 일치용 해시 집합과 ".도메인" 접미사 튜플을 한 번만 만들어 두고,
+    집합 조회 + str.endswith(튜플) (C 레벨 단일 호출)로 판정합니다.
+    "youtube.com" 은 youtube.com / m.youtube.com 에는 매칭되지만
+    notyoutube.com.evil 같은 부분 문자열 호스트에는 매칭되지 않습니다.
+    판정 결과는 호스트별 LRU 캐시에 보관됩니다.
+    """
+
+    def __init__(self, domains: list[str], cache_size: int = 4096):
+        self.suffixes = frozenset(normalize_host(d) for d in domains if d.strip())
+        self._dotted = tuple("." + d for d in self.suffixes)
+        self.matches = lru_cache(maxsize=cache_size)(self._match)
+
+    def _match(self, host: str) -> bool:
+        if not host:
+            return False
+        host = normalize_host(host)
+        return host in self.suffixes or host.endswith(self._dotted)
+
+    def __contains__(self, host: str) -> bool:
+        return self.matches(host)
+
+    def cache_info(self):
+        return self.matches.cache_info()
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class InflightGroup:
+    """
+    동일 키에 대한 동시 작업을 하나로 합칩니다 (single-flight).
+
+    첫 호출자가 작업을 Task 로 시작하고, 같은 키로 들어온 나머지 호출자는
+    그 Task 의 결과(또는 예외)를 함께 기다립니다.
+    - 예외는 모든 대기자에게 그대로 전달됩니다.
+    - 대기자 한 명이 취소되어도 공유 작업은 계속됩니다.
+      (모든 대기자가 취소된 경우에만 작업 자체를 취소합니다)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[str, _Call] = {}
+
+        # 통계 카운터
+        self.started = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, func: Callable[[], Awaitable]):
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.get_running_loop().create_task(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            # shield: 개별 대기자의 취소가 공유 Task 로 전파되지 않도록 함
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # 취소 중인 Task 에 새 호출자가 합류하지 않도록 즉시 분리
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,143 @@
+import asyncio
+import itertools
+import random
+import time
+from contextlib import asynccontextmanager
+
+# 우선순위 클래스 (작을수록 먼저 실행)
+PRIORITY_INTERACTIVE = 0   # GUI 클릭 등 사용자가 결과를 기다리는 요청
+PRIORITY_BATCH = 1         # 일괄 분석
+PRIORITY_BACKGROUND = 2    # 선행 수집(Prefetch) 등
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BATCH: "batch",
+    PRIORITY_BACKGROUND: "background",
+}
+
+
+class Ticket:
+    """
+    한 분석 작업의 우선순위.
+    병합된(coalesced) 요청이 더 높은 우선순위로 합류하면 promote() 로 올려서,
+    대기 중인 LLM 호출도 바로 앞으로 이동합니다.
+    """
+
+    __slots__ = ("priority", "waited")
+
+    def __init__(self, priority: int = PRIORITY_INTERACTIVE):
+        self.priority = priority
+        self.waited = 0.0  # 이 작업의 LLM 호출들이 자리를 기다린 시간 합(초)
+
+    def promote(self, priority: int):
+        self.priority = min(self.priority, priority)
+
+    @property
+    def name(self) -> str:
+        return PRIORITY_NAMES.get(self.priority, str(self.priority))
+
+
+class _Waiter:
+    __slots__ = ("ticket", "seq", "future")
+
+    def __init__(self, ticket: Ticket, seq: int, future: asyncio.Future):
+        self.ticket = ticket
+        self.seq = seq
+        self.future = future
+
+
+class LLMScheduler:
+    """
+    LLM 호출 동시 실행 제한 + 우선순위 대기열.
+
+    - 동시에 max_inflight 개까지만 실행합니다 (로컬 Ollama 는 요청이 몰리면 직렬화/스래싱).
+    - 자리가 나면 (우선순위, 도착 순서)가 가장 앞선 대기자에게 넘겨주므로
+      사용자 클릭이 일괄 분석/선행 수집 뒤에 밀리지 않습니다.
+    - 우선순위는 Ticket 을 매번 다시 읽으므로 대기 중 promote() 가 즉시 반영됩니다.
+      (대기자는 많아야 수십 개라 힙 대신 선형 탐색)
+    """
+
+    def __init__(self, max_inflight: int):
+        self.max_inflight = max(1, max_inflight)
+        self.inflight = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+
+        # 통계 카운터
+        self.granted = 0
+        self.retries = 0
+        # 대기 시간 관찰 함수 (seconds, priority)
+        self.wait_observer = None
+
+    def queue_depth(self) -> dict[str, int]:
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for waiter in self._waiters:
+            depth[waiter.ticket.name] = depth.get(waiter.ticket.name, 0) + 1
+        return depth
+
+    async def acquire(self, ticket: Ticket) -> float:
+        """자리를 얻을 때까지 대기. 반환: 대기 시간(초)"""
+        started = time.perf_counter()
+        if self.inflight < self.max_inflight and not self._waiters:
+            self.inflight += 1
+        else:
+            waiter = _Waiter(ticket, next(self._seq), asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.future.done() and not waiter.future.cancelled():
+                    # 자리를 넘겨받은 직후 취소됨 -> 다음 대기자에게 양보
+                    self.release()
+                raise
+        self.granted += 1
+        waited = time.perf_counter() - started
+        ticket.waited += waited
+        if self.wait_observer:
+            self.wait_observer(waited, priority=ticket.name)
+        return waited
+
+    def release(self):
+        """자리를 반납하고 가장 앞선 대기자에게 넘겨줌 (inflight 수는 그대로 유지)"""
+        while self._waiters:
+            waiter = min(self._waiters, key=lambda w: (w.ticket.priority, w.seq))
+            self._waiters.remove(waiter)
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+                return
+        self.inflight -= 1
+
+    @asynccontextmanager
+    async def slot(self, ticket: Ticket):
+        await self.acquire(ticket)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(self, ticket: Ticket, func, retries: int = 0, backoff: float = 0.5, retryable=None):
+        """
+        자리를 얻어 func() 를 실행합니다.
+        retryable(exc) 가 True 인 오류는 지수 백오프(+지터) 후 최대 retries 번 재시도하며,
+        백오프 동안에는 자리를 반납하여 다른 요청이 먼저 실행될 수 있게 합니다.
+        """
+        for attempt in itertools.count():
+            async with self.slot(ticket):
+                try:
+                    return await func()
+                except Exception as e:
+                    if attempt >= retries or retryable is None or not retryable(e):
+                        raise
+            self.retries += 1
+            await asyncio.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    def stats(self) -> dict:
+        return {
+            "max_inflight": self.max_inflight,
+            "inflight": self.inflight,
+            "queue_depth": self.queue_depth(),
+            "granted": self.granted,
+            "retries": self.retries,
+        }
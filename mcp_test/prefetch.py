@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("mcp_server")
+
+
+class Prefetcher:
+    """
+    선행 수집(Speculative Prefetch) 작업 관리자.
+
+    - 요청자(owner, 예: MCP 세션)와 키(video_id)별로 백그라운드 Task 를 하나만 유지합니다.
+    - concurrency 개수만큼만 동시에 실행하여 사용자 요청(클릭)보다 자원을 적게 씁니다.
+    - 사용자가 다른 영상으로 이동하면 cancel_except() 로 그 요청자의 이전 영상 작업만 취소합니다.
+      (실제 수집/분석은 InflightGroup 으로 공유되므로, 같은 영상을 기다리는
+       다른 요청/세션이 있으면 공유 작업은 계속 진행됩니다)
+    """
+
+    def __init__(self, concurrency: int = 1):
+        self.concurrency = concurrency
+        self._slots = None
+        self.tasks: dict[tuple[object, str], asyncio.Task] = {}  # (owner, key) -> Task
+
+        # 통계 카운터
+        self.scheduled = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+
+    def schedule(self, key: str, func: Callable[[], Awaitable], owner=None) -> str:
+        task = self.tasks.get((owner, key))
+        if task and not task.done():
+            return "running"
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        self.tasks[(owner, key)] = asyncio.get_running_loop().create_task(self._run((owner, key), func))
+        self.scheduled += 1
+        return "scheduled"
+
+    async def _run(self, task_key: tuple[object, str], func: Callable[[], Awaitable]):
+        try:
+            async with self._slots:
+                await func()
+            self.completed += 1
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"[Prefetch] {task_key[1]} failed: {e}")
+        finally:
+            if self.tasks.get(task_key) is asyncio.current_task():
+                del self.tasks[task_key]
+
+    def cancel(self, key: str, owner=None) -> bool:
+        task = self.tasks.pop((owner, key), None)
+        if task and not task.done():
+            task.cancel()
+            return True
+        return False
+
+    def cancel_except(self, keep: set[str], owner=None) -> list[str]:
+        """owner 의 진행 중 작업 중 keep 에 없는 것을 취소 (다른 요청자의 작업은 그대로)"""
+        return [
+            key for task_owner, key in list(self.tasks)
+            if task_owner is owner and key not in keep and self.cancel(key, owner)
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "active": sorted({key for _, key in self.tasks}),
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+        }
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import re
+from bisect import bisect_right
+
+from .captions import SegmentStore
+
+# 스폰서 문구 규칙: (빠른 확인용 리터럴, 정규식, 가중치). 자막은 소문자로 변환 후 검색합니다.
+# 가중치 3: 그 자체로 광고임을 뜻하는 문구 / 1~1.5: 광고 구간에 자주 동반되는 보조 신호
+SPONSOR_RULES = (
+    # English
+    (("sponsor", "paid promotion"),
+     r"sponsored by|is sponsored|today'?s sponsor|for sponsoring|sponsor(?:ship)? of|paid promotion", 3.0),
+    (("code",),
+     r"(?:promo|discount|coupon) code|use (?:my |our )?code|code \w+ (?:at checkout|for)", 3.0),
+    (("%", "free", "sign up"),
+     r"\d{1,3}\s?% off|first month free|free trial|sign up (?:today|now|at|for)", 1.5),
+    (("description", ".co", ".io", ".net", ".org"),
+     r"link (?:is )?in the description|(?:head|go) (?:over )?to \S+\.(?:com|io|net|co|org)", 1.5),
+    ((".co", ".io", ".net", ".org", ".gg", ".kr"),
+     r"\b[\w-]+\.(?:com|io|net|co|org|gg|kr)(?:/| slash )[\w-]+", 1.0),
+    # 한국어
+    (("협찬", "광고", "스폰서", "후원"),
+     r"협찬|유료\s?광고|광고를 포함|광고입니다|스폰서|후원(?:을 받|받아|해 주신|으로)", 3.0),
+    (("코드",),
+     r"(?:할인|쿠폰|프로모션|추천인)\s?코드|코드를 입력|코드 입력", 3.0),
+    (("무료", "가입", "할인"),
+     r"무료\s?체험|첫\s?달 무료|지금 가입|가입하(?:면|시면)|\d{1,3}\s?% 할인", 1.5),
+    (("설명란", "댓글", "링크"),
+     r"설명란|고정\s?댓글|아래 링크|링크를 (?:통해|클릭)", 1.5),
+)
+
+# 규칙별 정규식은 모듈 로드 시 한 번만 컴파일.
+# 하나의 거대한 대안(|) 정규식은 모든 위치에서 모든 분기를 시도하므로,
+# 리터럴(str 의 C 구현 검색)로 먼저 걸러서 해당 문구가 있는 규칙만 실행합니다.
+_MATCHERS = tuple((triggers, re.compile(pattern), weight) for triggers, pattern, weight in SPONSOR_RULES)
+
+# 이 간격(초) 이내의 문구는 같은 광고 구간으로 묶음
+CLUSTER_GAP = 45.0
+
+
+def prefilter_version(min_score: float, context: float, max_coverage: float) -> str:
+    """패턴/임계값이 바뀌면 분석 캐시가 무효화되도록 캐시 키에 포함"""
+    signature = json.dumps([SPONSOR_RULES, min_score, context, max_coverage])
+    return hashlib.sha256(signature.encode("utf-8")).hexdigest()[:8]
+
+
+def find_hits(text: str) -> list[tuple[int, float]]:
+    """[(문자 위치, 가중치), ...] (위치 순)"""
+    text = text.lower()
+    hits = []
+    for triggers, matcher, weight in _MATCHERS:
+        if any(trigger in text for trigger in triggers):
+            hits.extend((m.start(), weight) for m in matcher.finditer(text))
+    hits.sort()
+    return hits
+
+
+def score_text(text: str) -> float:
+    return sum(weight for _, weight in find_hits(text))
+
+
+def candidate_spans(store: SegmentStore, min_score: float, context: float) -> tuple[list[tuple[float, float, float]], float]:
+    """
+    자막에서 스폰서 문구가 모인 시간 구간을 찾습니다.
+    반환: ([(시작 시각, 종료 시각, 점수), ...], 전체 점수)
+    """
+    # 구간 경계를 넘는 문구("sponsored" / "by ...")도 잡히도록 공백으로 이어 붙여 검색
+    positions = [store.offsets[k] + k for k in range(len(store))]
+    text = " ".join(store.segment_text(k) for k in range(len(store)))
+
+    clusters: list[list[float]] = []  # [첫 시각, 마지막 시각, 점수]
+    total = 0.0
+    for pos, weight in find_hits(text):
+        t = store.starts[bisect_right(positions, pos) - 1]
+        total += weight
+        if clusters and t - clusters[-1][1] <= CLUSTER_GAP:
+            clusters[-1][1] = t
+            clusters[-1][2] += weight
+        else:
+            clusters.append([t, t, weight])
+
+    # 점수가 충분한 묶음만 앞뒤 context 초를 붙여 후보 구간으로 (겹치면 병합)
+    spans: list[list[float]] = []
+    for first, last, score in clusters:
+        if score < min_score:
+            continue
+        start, end = max(first - context, 0.0), min(last + context, store.duration)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+            spans[-1][2] += score
+        else:
+            spans.append([start, end, score])
+    return [tuple(span) for span in spans], total
+
+
+def full_decision(reason: str) -> dict:
+    return {"path": "full", "reason": reason, "score": 0.0, "spans": []}
+
+
+def decide(header: str, store: SegmentStore, min_score: float, context: float, max_coverage: float) -> dict:
+    """
+    LLM 호출 전 로컬 판정.
+      skip        스폰서 문구 없음 -> LLM 생략
+      candidates  후보 구간만 LLM 으로 전송 (spans: [(시작 인덱스, 끝 인덱스)])
+      full        전체 자막 전송 (타임스탬프 없음 / 후보가 너무 넓음 / 설명란에만 언급)
+    """
+    decision = full_decision("")
+    if not len(store):
+        decision["reason"] = "no_timestamps"
+        return decision
+
+    spans, score = candidate_spans(store, min_score, context)
+    decision["score"] = score
+    if not spans:
+        # 설명란에 광고 표기가 있으면 자막 패턴이 놓쳤을 수 있으므로 전체 분석
+        if score_text(header) >= min_score:
+            decision["reason"] = "description_mentions"
+            return decision
+        decision.update(path="skip", reason="no_sponsor_phrases")
+        return decision
+
+    coverage = sum(end - start for start, end, _ in spans) / max(store.duration, 1.0)
+    if coverage > max_coverage:
+        decision["reason"] = f"coverage {coverage:.0%}"
+        return decision
+
+    decision.update(
+        path="candidates",
+        reason=f"coverage {coverage:.0%}",
+        spans=[(store.index_at(start), store.index_at(end)) for start, end, _ in spans],
+    )
+    return decision
+
+
+def candidate_bodies(store: SegmentStore, spans: list[tuple[int, int]], window_seconds: float) -> list[str]:
+    """
+    후보 구간들을 LLM 요청 본문으로 묶습니다.
+    한 요청에 담기는 구간 길이 합이 window_seconds 를 넘지 않도록 나눕니다 (넘으면 Map-Reduce).
+    """
+    bodies: list[str] = []
+    group: list[str] = []
+    group_seconds = 0.0
+    for i, j in spans:
+        seconds = store.ends[j - 1] - store.starts[i]
+        if group and group_seconds + seconds > window_seconds:
+            bodies.append("\n...\n".join(group))
+            group, group_seconds = [], 0.0
+        group.append(store.format_lines(i, j))
+        group_seconds += seconds
+    if group:
+        bodies.append("\n...\n".join(group))
+    return bodies
+
+
+def skip_result() -> str:
+    """LLM 을 생략했을 때의 분석 결과 (SYSTEM_PROMPT 의 JSON 형식과 동일)"""
+    return json.dumps({
+        "sponsor": None,
+        "segments": [],
+        "summary": "No sponsor mentions found in the transcript (local pre-filter, LLM skipped).",
+    }, indent=2)
+
+
+def report(decision: dict, sent_chars: int, total_chars: int) -> dict:
+    """Tool 결과(_meta)에 포함할 판정 요약 (sent_chars: LLM 으로 보낸 글자 수, total_chars: 전체 자막 글자 수)"""
+    return {
+        "path": decision["path"],
+        "reason": decision["reason"],
+        "score": decision["score"],
+        "candidates": len(decision["spans"]),
+        "sent_chars": sent_chars,
+        "total_chars": total_chars,
+    }
@@ -1,23 +1,160 @@
+import asyncio
+import base64
+import json
+import weakref
+from urllib.parse import parse_qs, urlsplit
 import mcp.types as types
-from .core import server, transcript_cache
+from .core import server, transcript_cache, transcript_stored_hooks, logger
+from .config import config
+from .tools import watch_next_queue
+
+TRANSCRIPT_URI = "youtube://transcript/{}"
+# 다음 볼 영상 대기열 상태 (JSON, 구독 시 상태가 바뀔 때마다 알림)
+WATCH_NEXT_URI = "youtube://watch-next"
+
+# URI -> 구독 중인 세션 (세션이 종료되어 해제되면 자동으로 빠짐)
+subscriptions: dict[str, weakref.WeakSet] = {}
+# 전송 중인 알림 작업 (GC 방지)
+_notify_tasks: set[asyncio.Task] = set()
+
+def encode_cursor(stored_at: float, key: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([stored_at, key]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        stored_at, key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(stored_at), str(key)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
 
 @server.list_resources()
-async def handle_list_resources() -> list[types.Resource]:
-    return [
+async def handle_list_resources(request: types.ListResourcesRequest) -> types.ListResourcesResult:
+    """저장 순서 기준 커서 페이지네이션 (페이지당 RESOURCE_PAGE_SIZE 개)"""
+    cursor = request.params.cursor if request.params else None
+    after = decode_cursor(cursor) if cursor else None
+    # 다음 페이지 존재 여부 확인을 위해 1개 더 조회
+    entries = await asyncio.to_thread(transcript_cache.page, after, config.RESOURCE_PAGE_SIZE + 1)
+    has_more = len(entries) > config.RESOURCE_PAGE_SIZE
+    entries = entries[:config.RESOURCE_PAGE_SIZE]
+    resources = [
         types.Resource(
-            uri=types.AnyUrl(f"youtube://transcript/{vid}"),
+            uri=types.AnyUrl(TRANSCRIPT_URI.format(vid)),
             name=f"Transcript for {vid}",
             mimeType="text/plain",
         )
-        for vid in transcript_cache.keys()
+        for _, vid in entries
+    ]
+    if after is None and config.WATCH_NEXT_ENABLED:
+        resources.insert(0, types.Resource(
+            uri=types.AnyUrl(WATCH_NEXT_URI), name="Watch-next analysis queue", mimeType="application/json",
+        ))
+    return types.ListResourcesResult(
+        resources=resources,
+        nextCursor=encode_cursor(*entries[-1]) if has_more else None,
+    )
+
+@server.list_resource_templates()
+async def handle_list_resource_templates() -> list[types.ResourceTemplate]:
+    return [
+        types.ResourceTemplate(
+            uriTemplate="youtube://transcript/{video_id}{?start,end}",
+            name="Transcript time range",
+            description="start~end 초와 겹치는 자막 줄만 반환",
+            mimeType="text/plain",
+        ),
+        types.ResourceTemplate(
+            uriTemplate="youtube://transcript/{video_id}{?bytes}",
+            name="Transcript byte range",
+            description="bytes=first-last (포함, last 생략 시 끝까지) 바이트 구간 반환",
+            mimeType="text/plain",
+        ),
     ]
 
+def _parse_byte_range(value: str) -> tuple[int, int | None]:
+    first, sep, last = value.partition("-")
+    try:
+        if not sep:
+            raise ValueError
+        return int(first or 0), int(last) if last else None
+    except ValueError:
+        raise ValueError(f"Invalid byte range: {value}")
+
+def _parse_seconds(query: dict, name: str, default: float) -> float:
+    if name not in query:
+        return default
+    try:
+        return float(query[name][0])
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {query[name][0]}")
+
 @server.read_resource()
 async def handle_read_resource(uri: types.AnyUrl) -> str | bytes:
-    # URI 파싱: youtube://transcript/{video_id}
-    parsed = str(uri).split("/")
-    if len(parsed) < 4 or parsed[2] != "transcript":
+    """
+    youtube://transcript/{video_id}                 전체 자막
+    youtube://transcript/{video_id}?start=120&end=240   해당 시간과 겹치는 줄만
+    youtube://transcript/{video_id}?bytes=0-1023        바이트 구간 (미리보기 등)
+    youtube://watch-next                                다음 볼 영상 대기열 상태 (JSON)
+    구간 요청은 mmap 된 저장소에서 필요한 부분만 잘라 읽습니다.
+    """
+    parts = urlsplit(str(uri))
+    if parts.netloc == "watch-next":
+        return json.dumps(watch_next_queue.stats())
+    video_id = parts.path.strip("/")
+    if parts.netloc != "transcript" or not video_id:
         raise ValueError("Invalid Resource URI")
-    
-    video_id = parsed[3]
-    return transcript_cache.get(video_id, "Transcript not found (Analyze first).")
\ No newline at end of file
+
+    not_found = "Transcript not found (Analyze first)."
+    query = parse_qs(parts.query)
+    if "bytes" in query:
+        first, last = _parse_byte_range(query["bytes"][0])
+        data = await transcript_cache.aread_bytes(video_id, first, last)
+        # 구간 경계에서 잘린 멀티바이트 문자는 버림
+        return not_found if data is None else data.decode("utf-8", errors="ignore")
+    if "start" in query or "end" in query:
+        start = _parse_seconds(query, "start", 0.0)
+        end = _parse_seconds(query, "end", float("inf"))
+        text = await transcript_cache.aread_range(video_id, start, end)
+        return not_found if text is None else text
+    return await transcript_cache.aget(video_id, not_found)
+
+@server.subscribe_resource()
+async def handle_subscribe_resource(uri: types.AnyUrl):
+    """
+    아직 없는 자막도 구독할 수 있습니다.
+    자막이 수집/갱신되면 notifications/resources/updated 를 보내므로 클라이언트는 목록을 다시 조회할 필요가 없습니다.
+    """
+    session = server.request_context.session
+    subscriptions.setdefault(str(uri), weakref.WeakSet()).add(session)
+
+@server.unsubscribe_resource()
+async def handle_unsubscribe_resource(uri: types.AnyUrl):
+    sessions = subscriptions.get(str(uri))
+    if sessions is not None:
+        sessions.discard(server.request_context.session)
+        if not sessions:
+            del subscriptions[str(uri)]
+
+async def _send_updated(uri: str, sessions: list):
+    for session in sessions:
+        try:
+            await session.send_resource_updated(types.AnyUrl(uri))
+        except Exception as e:
+            # 연결이 끊긴 세션은 구독 해제
+            logger.info(f"[Resource] Dropping subscriber of {uri}: {e}")
+            subscriptions.get(uri, weakref.WeakSet()).discard(session)
+
+def notify_resource_updated(uri: str):
+    """구독 세션에 갱신 알림 (호출 경로를 막지 않도록 별도 작업으로 전송)"""
+    sessions = list(subscriptions.get(uri, ()))
+    if not sessions:
+        return
+    task = asyncio.get_running_loop().create_task(_send_updated(uri, sessions))
+    _notify_tasks.add(task)
+    task.add_done_callback(_notify_tasks.discard)
+
+def notify_transcript_updated(video_id: str):
+    """자막 저장 시 구독 세션에 알림"""
+    notify_resource_updated(TRANSCRIPT_URI.format(video_id))
+
+transcript_stored_hooks.append(notify_transcript_updated)
+watch_next_queue.listeners.append(lambda: notify_resource_updated(WATCH_NEXT_URI))
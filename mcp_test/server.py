@@ -3,16 +3,12 @@ import sys
 
 # 모듈 임포트를 통해 데코레이터(@server.tool 등)가 실행되게 함
 from . import tools, resources, prompts
-from .core import server, logger
+from .core import (server, logger, warm_up, initialization_options,
+                   SSE_SESSIONS_ACTIVE, SSE_SESSIONS_TOTAL, SSE_REJECTED_TOTAL)
+from .metrics import registry
 from .config import config
 
 from mcp.server.stdio import stdio_server
-from mcp.server.sse import SseServerTransport
-from starlette.applications import Starlette
-from starlette.routing import Route
-from starlette.middleware import Middleware
-from starlette.middleware.cors import CORSMiddleware
-import uvicorn
 
 async def run_stdio():
     """Stdio Transport 실행 (로컬 프로세스 통신용)"""
@@ -20,39 +16,92 @@ async def run_stdio():
     async with stdio_server() as (read, write):
         await server.run(
             read, write,
-            server.create_initialization_options()
+            initialization_options()
         )
 
 async def run_sse():
     """SSE Transport 실행 (HTTP/웹 통신용)"""
     logger.info(f"Starting SSE Server at http://{config.SSE_HOST}:{config.SSE_PORT}...")
-    
-    sse = SseServerTransport("/sse")
+
+    # HTTP 스택은 SSE 모드에서만 로드 (stdio 기동 시간 단축)
+    from .cluster import worker_prefix, watch_parent
+    from mcp.server.sse import SseServerTransport
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import Response, PlainTextResponse
+    from starlette.routing import Route, Mount
+    from starlette.middleware import Middleware
+    from starlette.middleware.cors import CORSMiddleware
+    import uvicorn
+
+    # 클라이언트는 endpoint 이벤트로 받은 /messages/?session_id=... 경로로 POST 합니다.
+    sse = SseServerTransport("/messages/", max_request_body_size=config.SSE_MAX_BODY)
+    # 세션별 처리 대기 중인 POST 수 (202 응답 후 서버 루프가 메시지를 받아갈 때까지 유지됨)
+    pending_messages: dict[str, int] = {}
+
+    def reject(status_code: int, reason: str, message: str) -> Response:
+        SSE_REJECTED_TOTAL.inc(reason=reason)
+        headers = {"Retry-After": str(config.SSE_RETRY_AFTER)} if status_code in (429, 503) else None
+        return PlainTextResponse(message, status_code=status_code, headers=headers)
 
     async def handle_sse(request):
-        async with sse.connect_sse(request.scope, request.receive, request._send) as streams:
-            await server.run(
-                streams[0], streams[1],
-                server.create_initialization_options()
-            )
+        # 확인과 증가 사이에 await 가 없으므로 동시 연결에도 한도를 넘지 않음
+        if SSE_SESSIONS_ACTIVE.value() >= config.SSE_MAX_SESSIONS:
+            return reject(503, "sessions", "Too many sessions")
+        SSE_SESSIONS_TOTAL.inc()
+        SSE_SESSIONS_ACTIVE.inc()
+        try:
+            async with sse.connect_sse(request.scope, request.receive, request._send) as streams:
+                await server.run(
+                    streams[0], streams[1],
+                    initialization_options()
+                )
+        finally:
+            SSE_SESSIONS_ACTIVE.dec()
+        # 연결 종료 시 NoneType 응답 오류 방지
+        return Response()
+
+    async def handle_messages(scope, receive, send):
+        """POST 본문/대기 메시지 한도 확인 후 SSE 전송 계층으로 전달 (ASGI 앱)"""
+        request = Request(scope)
+        length = request.headers.get("content-length", "")
+        if length.isdigit() and int(length) > config.SSE_MAX_BODY:
+            # 본문을 읽기 전에 거절 (Content-Length 없는 스트리밍 본문은 전송 계층이 413 처리)
+            return await reject(413, "body", "Message too large")(scope, receive, send)
+        session_id = request.query_params.get("session_id", "")
+        if pending_messages.get(session_id, 0) >= config.SSE_MAX_PENDING_MESSAGES:
+            return await reject(429, "pending", "Too many pending messages")(scope, receive, send)
+        pending_messages[session_id] = pending_messages.get(session_id, 0) + 1
+        try:
+            await sse.handle_post_message(scope, receive, send)
+        finally:
+            pending_messages[session_id] -= 1
+            if not pending_messages[session_id]:
+                del pending_messages[session_id]
 
-    async def handle_messages(request):
-        await sse.handle_post_message(request.scope, request.receive, request._send)
+    async def handle_metrics(request):
+        """Prometheus 수집용 메트릭"""
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+    # CORS 는 브라우저에서 직접 접속하는 경우에만 허용 Origin 을 지정하여 사용
+    middleware = []
+    if config.SSE_CORS_ORIGINS:
+        middleware.append(Middleware(
+            CORSMiddleware,
+            allow_origins=config.SSE_CORS_ORIGINS,
+            allow_methods=["GET", "POST"],
+            allow_headers=["*"],
+        ))
 
     app = Starlette(
-        debug=True,
+        debug=config.SSE_DEBUG,
         routes=[
             Route("/sse", endpoint=handle_sse),
-            Route("/messages", endpoint=handle_messages, methods=["POST"]),
+            Route("/metrics", endpoint=handle_metrics),
+            # handle_messages 가 직접 응답을 전송하므로 ASGI 앱으로 마운트
+            Mount("/messages/", app=handle_messages),
         ],
-        middleware=[
-            Middleware(
-                CORSMiddleware,
-                allow_origins=["*"],
-                allow_methods=["*"],
-                allow_headers=["*"],
-            )
-        ]
+        middleware=middleware,
     )
 
     # Uvicorn 서버 설정 (stdout 오염 방지를 위해 로그 레벨 조정 가능)
@@ -62,10 +111,21 @@ async def run_sse():
         # Both 모드일 때 Uvicorn 로그가 Stdio JSON을 깨뜨리지 않도록 stderr로 보내거나 끔
         pass 
 
-    conf = uvicorn.Config(app, host=config.SSE_HOST, port=config.SSE_PORT, log_level="info")
+    # 멀티 워커 모드의 워커는 /w/<id> 아래에서 서비스됨 (endpoint 이벤트에 접두사 포함 -> 라우터가 POST 를 이 워커로 전달)
+    root_path = ""
+    if config.WORKER_ID is not None:
+        root_path = worker_prefix(config.WORKER_ID)
+        watch_parent()
+    conf = uvicorn.Config(app, host=config.SSE_HOST, port=config.SSE_PORT, log_level="info", root_path=root_path)
     server_uvicorn = uvicorn.Server(conf)
     await server_uvicorn.serve()
 
+async def run_cluster():
+    """SSE 멀티 워커 실행 (라우터 + 워커 프로세스, 캐시는 SQLite WAL 로 공유)"""
+    from .cluster import Cluster
+
+    await Cluster(config.SSE_WORKERS, config.SSE_WORKER_BASE_PORT).run()
+
 async def main():
     mode = config.TRANSPORT
     tasks = []
@@ -74,14 +134,24 @@ async def main():
         tasks.append(run_stdio())
     
     if mode in ["sse", "online", "both"]:
-        tasks.append(run_sse())
+        if config.SSE_WORKERS > 1 and config.WORKER_ID is None:
+            tasks.append(run_cluster())
+        else:
+            tasks.append(run_sse())
 
     if not tasks:
         logger.error(f"Invalid TRANSPORT config: {mode}")
         return
 
+    # 무거운 모듈은 지연 로드되므로, initialize 이후 유휴 시간에 미리 로드
+    warmup = asyncio.create_task(warm_up(config.WARMUP_DELAY)) if config.WARMUP_DELAY >= 0 else None
+
     # 선택된 모드 동시 실행
-    await asyncio.gather(*tasks)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        if warmup:
+            warmup.cancel()
 
 if __name__ == "__main__":
     # Windows SelectorEventLoopPolicy 이슈 해결 (Python 3.8+ Windows)
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import threading
+import time
+
+from .config import config
+from .core import get_llm_client, logger
+from .analysis import extract_json, normalize_segments
+from .captions import SegmentStore, parse_transcript
+from . import prefilter
+
+# 영상 ID 로 검색할 때 아직 분석되지 않은 영상은 사전 필터 후보 구간(문구 앞뒤 이 시간)을 질의로 사용
+QUERY_CONTEXT_SECONDS = 30.0
+# 인덱스 메타데이터에 보관할 광고 멘트 최대 글자 수 (임베딩은 전체 텍스트 기준)
+STORED_TEXT_CHARS = 500
+
+# numpy 는 임포트 비용이 있어 첫 인덱스 사용 시 로드합니다 (stdio 기동 시간 유지)
+_embedder = None
+_index = None
+_lock = threading.Lock()
+# 진행 중인 인덱싱 작업 (GC 방지)
+_index_tasks: set[asyncio.Task] = set()
+
+
+def get_embedder():
+    global _embedder
+    with _lock:
+        if _embedder is None:
+            from .vector_index import HashingEmbedder, OllamaEmbedder
+
+            if config.EMBEDDING_PROVIDER == "ollama":
+                _embedder = OllamaEmbedder(get_llm_client(), config.EMBEDDING_MODEL)
+            else:
+                _embedder = HashingEmbedder(config.EMBEDDING_DIM)
+    return _embedder
+
+
+async def get_index():
+    """
+    스폰서 멘트 벡터 인덱스 (최초 호출 시 생성).
+    임베딩 방식/차원별로 하위 디렉터리를 나누므로 설정을 바꿔도 이전 벡터와 섞이지 않습니다.
+    """
+    global _index
+    if _index is not None:
+        return _index
+    embedder = get_embedder()
+    dim = await embedder.dimension()
+    with _lock:
+        if _index is None:
+            from .vector_index import VectorIndex
+
+            path = config.SPONSOR_INDEX_PATH
+            if path:
+                path = os.path.join(path, f"{embedder.signature}-{dim}")
+            _index = VectorIndex(path, dim)
+    return _index
+
+
+def span_text(store: SegmentStore, start: float, end: float) -> str:
+    """start~end 초 사이 자막 구간의 텍스트"""
+    i = max(store.index_at(start) - 1, 0)
+    # 구간 시작 직전에 시작해 구간에 걸친 줄 포함
+    if i < len(store) and store.ends[i] <= start:
+        i += 1
+    j = store.index_at(end)
+    return " ".join(store.segment_text(k) for k in range(i, j))
+
+
+async def index_analysis(video_id: str, transcript: str, analysis_text: str) -> int:
+    """
+    분석 결과의 스폰서 구간 자막을 인덱스에 추가합니다 (이미 있는 구간은 생략).
+    반환: 추가한 항목 수
+    """
+    result = extract_json(analysis_text)
+    if result is None:
+        return 0
+    _, store = parse_transcript(transcript)
+    segments = []
+    for seg in normalize_segments(result):
+        text = span_text(store, seg["start"], seg["end"])
+        if text.strip():
+            segments.append((seg, text))
+    if not segments:
+        return 0
+
+    index = await get_index()
+    vectors = await get_embedder().embed([text for _, text in segments])
+    known = {
+        (m["start"], m["end"])
+        for _, m in await asyncio.to_thread(index.entries, lambda m: m["video_id"] == video_id)
+    }
+    rows, metadata = [], []
+    for k, (seg, text) in enumerate(segments):
+        span = (round(seg["start"], 2), round(seg["end"], 2))
+        if span in known:
+            continue
+        known.add(span)
+        rows.append(k)
+        metadata.append({
+            "video_id": video_id,
+            "start": span[0],
+            "end": span[1],
+            "sponsor": seg.get("sponsor"),
+            "text": text[:STORED_TEXT_CHARS],
+            "indexed_at": time.time(),
+        })
+    if rows:
+        await asyncio.to_thread(index.add, vectors[rows], metadata)
+        logger.info(f"[Similarity] Indexed {len(rows)} sponsor segment(s) of {video_id}")
+    return len(rows)
+
+
+def schedule_index(video_id: str, transcript: str, analysis_text: str):
+    """분석 응답을 지연시키지 않도록 인덱싱은 별도 작업으로 수행"""
+    async def _run():
+        try:
+            await index_analysis(video_id, transcript, analysis_text)
+        except Exception as e:
+            logger.warning(f"[Similarity] Indexing {video_id} failed: {e}")
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _index_tasks.add(task)
+    task.add_done_callback(_index_tasks.discard)
+
+
+async def queries_for_video(video_id: str, transcript: str | None) -> list[tuple[dict, object]]:
+    """
+    영상 ID 검색용 질의 벡터.
+    인덱스에 있는 영상은 저장된 스폰서 구간, 없으면 자막의 사전 필터 후보 구간을 사용합니다.
+    반환: [(질의 설명, 벡터), ...]
+    """
+    index = await get_index()
+    entries = await asyncio.to_thread(index.entries, lambda m: m["video_id"] == video_id)
+    if entries:
+        return [
+            ({"start": m["start"], "end": m["end"], "sponsor": m["sponsor"], "source": "index"}, vector)
+            for vector, m in entries
+        ]
+    if not transcript or transcript.startswith("Error:"):
+        return []
+    _, store = parse_transcript(transcript)
+    spans, _ = prefilter.candidate_spans(store, config.PREFILTER_MIN_SCORE, QUERY_CONTEXT_SECONDS)
+    texts = [span_text(store, start, end) for start, end, _ in spans]
+    if not texts:
+        return []
+    vectors = await get_embedder().embed(texts)
+    return [
+        ({"start": round(start, 2), "end": round(end, 2), "source": "prefilter"}, vector)
+        for (start, end, _), vector in zip(spans, vectors)
+    ]
+
+
+async def search(queries: list[tuple[dict, object]], top_k: int, exclude_video: str | None = None) -> list[dict]:
+    """질의별로 다른 영상의 유사한 광고 멘트 top_k 개"""
+    if not queries:
+        return []
+    index = await get_index()
+    exclude = (lambda m: m["video_id"] == exclude_video) if exclude_video else None
+    results = []
+    for query, vector in queries:
+        matches = await asyncio.to_thread(index.search, vector, top_k, config.SIMILAR_MIN_SCORE, exclude)
+        results.append({"query": query, "matches": matches})
+    return results
+
+
+async def search_text(text: str, top_k: int) -> list[dict]:
+    vectors = await get_embedder().embed([text])
+    return await search([({"text": text[:STORED_TEXT_CHARS], "source": "text"}, vectors[0])], top_k)
@@ -1,7 +1,407 @@
+import asyncio
 import json
+import hashlib
+import time
+from collections import Counter
 import mcp.types as types
-from .core import server, transcript_cache, openai_client, fetch_transcript, logger
+from .core import (
+    server, analysis_cache, analysis_inflight, get_llm_client, llm_enabled,
+    llm_scheduler, is_retryable_llm_error, load_transcript, fetch_playlist_ids, logger,
+    transcript_cache, store_capture,
+    LLM_REQUEST_SECONDS, LLM_TTFT_SECONDS, TOOL_CALL_SECONDS, ERRORS_TOTAL,
+    PREFILTER_DECISIONS_TOTAL, LLM_INPUT_CHARS_TOTAL, CASCADE_RESULTS_TOTAL, CASCADE_CONFIDENCE,
+    WATCH_NEXT_RESULTS_TOTAL,
+)
 from .config import config  # [추가] 설정 가져오기
+from .captions import parse_transcript
+from .analysis import extract_json, reduce_window_results, result_confidence
+from .prefetch import Prefetcher
+from .watch_next import WatchNextQueue
+from .llm_scheduler import Ticket, PRIORITY_INTERACTIVE, PRIORITY_BATCH, PRIORITY_BACKGROUND
+from . import prefilter
+from . import youtube_capture
+from . import similarity
+
+# 시스템 프롬프트 (변경 시 PROMPT_VERSION 이 바뀌어 기존 분석 캐시는 자동으로 무효화됩니다)
+SYSTEM_PROMPT = (
+    "Analyze the video transcript for sponsors. Transcript lines are formatted as "
+    "[start-end] text with times in seconds. Return a JSON summary: "
+    '{"sponsor": name or null, "segments": [{"start": seconds, "end": seconds, "sponsor": name}], '
+    '"summary": short text, "confidence": number from 0 to 1 for how certain the segments are}.'
+)
+PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+# 사전 필터 규칙/임계값이 바뀌면 LLM 에 보내는 내용이 달라지므로 캐시 키에 포함
+PREFILTER_VERSION = prefilter.prefilter_version(
+    config.PREFILTER_MIN_SCORE, config.PREFILTER_CONTEXT_SECONDS, config.PREFILTER_MAX_COVERAGE
+) if config.PREFILTER_ENABLED else "off"
+
+# 분석 모델 단계 (작은 모델 -> LLM_MODEL). 단계가 하나면 캐스케이드 없이 LLM_MODEL 만 호출
+CASCADE_TIERS = list(dict.fromkeys([*config.CASCADE_MODELS, config.LLM_MODEL]))
+# 단계 구성/임계값이 바뀌면 채택되는 결과가 달라지므로 캐시 키에 포함
+MODEL_SIGNATURE = "+".join(CASCADE_TIERS) + (
+    f"@{config.CASCADE_MIN_CONFIDENCE:g}" if len(CASCADE_TIERS) > 1 else ""
+)
+
+def analysis_cache_key(video_id: str, transcript: str) -> str:
+    """분석 캐시 키: (video_id, 자막 해시, 모델 단계, 프롬프트 버전, 사전 필터 버전)"""
+    transcript_hash = hashlib.sha256(transcript.encode("utf-8")).hexdigest()[:16]
+    return f"{video_id}:{transcript_hash}:{MODEL_SIGNATURE}:{PROMPT_VERSION}:{PREFILTER_VERSION}"
+
+class AnalysisStream:
+    """
+    진행 중인 LLM 스트림 출력.
+    병합된(coalesced) 요청들도 구독자로 등록되어 같은 토큰을 전달받으며,
+    늦게 합류한 구독자는 다음 전송 때 앞부분부터 한 번에 따라잡습니다.
+    """
+
+    def __init__(self):
+        self.parts: list[str] = []
+        self.length = 0
+        self.listeners = {}  # listener -> 이미 전달한 글자 수
+
+    def subscribe(self, listener):
+        self.listeners[listener] = 0
+
+    def unsubscribe(self, listener):
+        self.listeners.pop(listener, None)
+
+    async def publish(self, delta: str):
+        self.parts.append(delta)
+        self.length += len(delta)
+        text = "".join(self.parts)
+        for listener, offset in list(self.listeners.items()):
+            self.listeners[listener] = self.length
+            try:
+                await listener(text[offset:], self.length)
+            except Exception as e:
+                # 클라이언트 연결 종료 등: 해당 구독자만 제외
+                logger.debug(f"[Tool] Dropping stream listener: {e}")
+                self.unsubscribe(listener)
+
+# cache_key -> 진행 중인 스트림
+analysis_streams: dict[str, AnalysisStream] = {}
+# cache_key -> [우선순위 Ticket, 기다리는 요청 수] (병합된 요청 중 가장 높은 우선순위로 실행)
+analysis_tickets: dict[str, list] = {}
+
+def progress_listener():
+    """현재 요청에 progressToken 이 있으면 진행 알림 전송 함수를 반환"""
+    try:
+        ctx = server.request_context
+    except LookupError:
+        return None
+    token = ctx.meta.progressToken if ctx.meta else None
+    if token is None:
+        return None
+
+    async def _send(text: str, progress: float, total: float | None = None):
+        await ctx.session.send_progress_notification(
+            token, progress, total=total, message=text, related_request_id=str(ctx.request_id)
+        )
+    return _send
+
+async def complete(
+    user_content: str, stream: AnalysisStream | None = None, ticket: Ticket | None = None,
+    model: str | None = None,
+) -> str:
+    """
+    LLM 호출(stream=True). stream 이 주어지면 토큰을 구독자에게 전달합니다.
+    스케줄러 자리를 얻은 뒤 실행하며(대기 시간은 ticket.waited), 토큰을 전달하기 전의 실패만 재시도합니다.
+    model 을 생략하면 config.LLM_MODEL 을 사용합니다.
+    """
+    model = model or config.LLM_MODEL
+    published = False
+
+    async def _attempt() -> str:
+        nonlocal published
+        # 모델 시간 (스케줄러 대기 제외)
+        started = time.perf_counter()
+        response = await get_llm_client().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": user_content}
+            ],
+            stream=True,
+        )
+
+        parts = []
+        pending = ""
+        last_sent = 0.0
+        async for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if not parts:
+                LLM_TTFT_SECONDS.observe(time.perf_counter() - started, model=model)
+            parts.append(delta)
+            if stream is None:
+                continue
+            pending += delta
+            # 첫 토큰은 즉시, 이후는 STREAM_PROGRESS_INTERVAL 간격으로 묶어서 전송
+            now = time.monotonic()
+            if now - last_sent >= config.STREAM_PROGRESS_INTERVAL:
+                published = True
+                await stream.publish(pending)
+                pending = ""
+                last_sent = now
+        if pending:
+            published = True
+            await stream.publish(pending)
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=model)
+        return "".join(parts)
+
+    return await llm_scheduler.run(
+        ticket or Ticket(), _attempt,
+        retries=config.LLM_MAX_RETRIES,
+        backoff=config.LLM_RETRY_BACKOFF,
+        # 구독자에게 이미 보낸 토큰이 중복되지 않도록 전송 전 실패만 재시도
+        retryable=lambda e: not published and is_retryable_llm_error(e),
+    )
+
+async def complete_cascade(
+    user_content: str, stream: AnalysisStream | None = None, ticket: Ticket | None = None,
+    trace: list | None = None,
+) -> str:
+    """
+    모델 캐스케이드 (CASCADE_MODELS -> LLM_MODEL).
+    앞 단계 결과는 JSON 이 유효하고 confidence 가 CASCADE_MIN_CONFIDENCE 이상일 때만 채택하고,
+    아니면(호출 실패 포함) 다음 단계 모델로 다시 분석합니다. 마지막 단계 결과는 그대로 채택합니다.
+    trace 가 주어지면 단계별 {"model", "outcome", "confidence"} 를 추가합니다.
+    """
+    for level, model in enumerate(CASCADE_TIERS):
+        final = level == len(CASCADE_TIERS) - 1
+        confidence = None
+        try:
+            text = await complete(user_content, stream, ticket, model)
+        except Exception as e:
+            if final:
+                raise
+            logger.warning(f"[Tool] Cascade tier {model} failed: {e}")
+            outcome = "error"
+        else:
+            result = extract_json(text)
+            confidence = result_confidence(result)
+            if confidence is not None:
+                CASCADE_CONFIDENCE.observe(confidence, tier=model)
+            if final:
+                outcome = "accepted"
+            elif result is None:
+                outcome = "invalid_json"
+            elif confidence is None:
+                outcome = "no_confidence"
+            elif confidence < config.CASCADE_MIN_CONFIDENCE:
+                outcome = "low_confidence"
+            else:
+                outcome = "accepted"
+
+        CASCADE_RESULTS_TOTAL.inc(tier=model, outcome=outcome)
+        if trace is not None:
+            trace.append({"model": model, "outcome": outcome, "confidence": confidence})
+        if outcome == "accepted":
+            return text
+
+        next_model = CASCADE_TIERS[level + 1]
+        logger.info(f"[Tool] Cascade: {model} {outcome} (confidence {confidence}) -> {next_model}")
+        if stream is not None:
+            # 구독자에게 앞 단계 출력이 폐기되었음을 알림
+            await stream.publish(f"\n[{model}: {outcome}, escalating to {next_model}]\n")
+
+def cascade_report(trace: list[dict]) -> dict:
+    """단계별 기록 -> {"accepted": {모델: 채택 수}, "escalations": 재분석 수}"""
+    return {
+        "accepted": dict(Counter(t["model"] for t in trace if t["outcome"] == "accepted")),
+        "escalations": sum(1 for t in trace if t["outcome"] != "accepted"),
+    }
+
+async def request_map_reduce(
+    header: str, windows: list[str], ticket: Ticket | None = None, trace: list | None = None
+) -> str:
+    """긴 자막: 겹치는 시간 창별로 병렬 분석(map) 후 구간을 병합(reduce), 캐스케이드는 창별로 적용"""
+    slots = asyncio.Semaphore(config.ANALYSIS_MAP_CONCURRENCY)
+
+    async def _map(index: int, body: str) -> str:
+        async with slots:
+            try:
+                return await complete_cascade(
+                    f"{header}\n(Part {index + 1}/{len(windows)})\n{body}", ticket=ticket, trace=trace
+                )
+            except Exception as e:
+                # 일부 창 실패는 결과에 failed_windows 로 반영
+                ERRORS_TOTAL.inc(stage="llm_window")
+                logger.warning(f"[Tool] Window {index + 1}/{len(windows)} failed: {e}")
+                return ""
+
+    window_texts = await asyncio.gather(*[_map(i, body) for i, body in enumerate(windows)])
+    if not any(window_texts):
+        raise RuntimeError("All transcript windows failed")
+    return json.dumps(reduce_window_results(window_texts), indent=2, ensure_ascii=False)
+
+async def complete_streamed(
+    cache_key: str, user_content: str, ticket: Ticket | None = None, trace: list | None = None
+) -> str:
+    """단일 분석 (구독 중인 요청들에 토큰 스트리밍)"""
+    stream = analysis_streams.setdefault(cache_key, AnalysisStream())
+    try:
+        return await complete_cascade(user_content, stream, ticket, trace)
+    finally:
+        if analysis_streams.get(cache_key) is stream:
+            del analysis_streams[cache_key]
+
+async def request_analysis(
+    video_id: str, cache_key: str, transcript: str, ticket: Ticket | None = None
+) -> tuple[str, dict]:
+    """
+    로컬 사전 필터 판정 후 LLM 분석을 요청하고 결과를 캐시에 저장합니다.
+      skip        스폰서 문구 없음 -> LLM 생략
+      candidates  후보 구간만 전송 (구간 합이 길면 Map-Reduce)
+      full        전체 자막 전송 (짧은 자막은 스트리밍 단일 호출, 긴 자막은 Map-Reduce)
+    반환: (분석 결과, 사전 필터 판정 요약)
+    """
+    if transcript.startswith("Error:"):
+        # 수집 오류 문자열을 분석하면 LLM 이 지어낸 결과가 분석 캐시에 남음
+        raise ValueError(f"Transcript unavailable for {video_id}: {transcript}")
+    header, store = parse_transcript(transcript)
+    if config.PREFILTER_ENABLED:
+        decision = prefilter.decide(
+            header, store,
+            config.PREFILTER_MIN_SCORE, config.PREFILTER_CONTEXT_SECONDS, config.PREFILTER_MAX_COVERAGE,
+        )
+    else:
+        decision = prefilter.full_decision("disabled")
+    path = decision["path"]
+    logger.info(f"[Tool] Pre-filter: {path} ({decision['reason']}, score {decision['score']:g})")
+    # 모델 캐스케이드 단계별 결과 (사전 필터 skip 은 LLM 단계 없이 종료)
+    trace = []
+
+    if path == "skip":
+        analysis_text, sent = prefilter.skip_result(), 0
+    elif path == "candidates":
+        bodies = prefilter.candidate_bodies(store, decision["spans"], config.ANALYSIS_WINDOW_SECONDS)
+        sent = sum(len(body) for body in bodies)
+        if len(bodies) > 1:
+            analysis_text = await request_map_reduce(header, bodies, ticket, trace)
+        else:
+            analysis_text = await complete_streamed(
+                cache_key, f"{header}\nTranscript (candidate excerpts):\n{bodies[0]}", ticket, trace
+            )
+    else:
+        windows = store.windows(config.ANALYSIS_WINDOW_SECONDS, config.ANALYSIS_WINDOW_OVERLAP)
+        if len(windows) > 1:
+            logger.info(f"[Tool] Map-reduce analysis over {len(windows)} windows")
+            bodies = [store.format_lines(i, j) for _, _, i, j in windows]
+            sent = sum(len(body) for body in bodies)
+            analysis_text = await request_map_reduce(header, bodies, ticket, trace)
+        else:
+            sent = len(transcript)
+            analysis_text = await complete_streamed(cache_key, transcript, ticket, trace)
+
+    PREFILTER_DECISIONS_TOTAL.inc(path=path)
+    LLM_INPUT_CHARS_TOTAL.inc(sent, kind="sent")
+    LLM_INPUT_CHARS_TOTAL.inc(len(transcript), kind="available")
+    await analysis_cache.aset(cache_key, analysis_text)
+    if config.SPONSOR_INDEX_ENABLED and path != "skip":
+        similarity.schedule_index(video_id, transcript, analysis_text)
+    report = prefilter.report(decision, sent, len(transcript))
+    report["queue_wait"] = round(ticket.waited, 4) if ticket else 0.0
+    if len(CASCADE_TIERS) > 1 and trace:
+        report["cascade"] = cascade_report(trace)
+    return analysis_text, report
+
+async def analyze_transcript(
+    video_id: str, transcript: str, force_refresh: bool = False, stream_progress: bool = True,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> tuple[str, dict]:
+    """
+    자막을 LLM 으로 분석합니다 (캐시 우선, 동시 요청은 병합).
+    stream_progress 가 True 이면 LLM 출력 토큰을 현재 요청의 진행 알림으로 전달합니다.
+    priority 는 LLM 스케줄러 우선순위이며, 진행 중인 분석에 더 높은 우선순위로 합류하면 그 분석을 앞당깁니다.
+    LLM 호출 실패 시 예외를 그대로 발생시킵니다.
+    반환: (분석 결과, 사전 필터 판정 요약 - 캐시 적중 시 {"path": "cache"})
+    """
+    if not llm_enabled():
+        # Mock Data Generation
+        return json.dumps({
+            "status": "mock_success",
+            "sponsor": "NordVPN (Simulated)",
+            "segments": ["02:30 - 03:15"],
+            "summary": "This is a simulated analysis because LLM Client is missing."
+        }, indent=2), {"path": "mock"}
+
+    cache_key = analysis_cache_key(video_id, transcript)
+    cached = None if force_refresh else await analysis_cache.aget(cache_key)
+    if cached is not None:
+        logger.info(f"[Tool] Analysis cache hit: {video_id}")
+        return cached, {"path": "cache"}
+
+    # 스트리밍 토큰을 진행 알림으로 받도록 구독 (progressToken 이 있는 요청만)
+    listener = progress_listener() if stream_progress else None
+    stream = analysis_streams.setdefault(cache_key, AnalysisStream())
+    if listener:
+        stream.subscribe(listener)
+    entry = analysis_tickets.setdefault(cache_key, [Ticket(priority), 0])
+    entry[0].promote(priority)
+    entry[1] += 1
+    try:
+        # 같은 키로 진행 중인 분석이 있으면 그 결과를 함께 기다림
+        return await analysis_inflight.run(
+            cache_key, lambda: request_analysis(video_id, cache_key, transcript, entry[0])
+        )
+    finally:
+        entry[1] -= 1
+        if not entry[1] and analysis_tickets.get(cache_key) is entry:
+            del analysis_tickets[cache_key]
+        if listener:
+            stream.unsubscribe(listener)
+        # 마지막 구독자가 떠나면 스트림 등록 해제
+        if not stream.listeners and analysis_streams.get(cache_key) is stream:
+            del analysis_streams[cache_key]
+
+# 선행 수집 작업 관리 (프록시의 /watch 감지 시 호출)
+prefetcher = Prefetcher(config.PREFETCH_CONCURRENCY)
+
+# 사용자 요청으로 보는 Tool 의 마지막 호출 시각 (프록시의 캡처/대기열 전달은 제외)
+BACKGROUND_TOOLS = {"ingest_capture", "queue_watch_next"}
+last_activity = time.monotonic()
+
+def server_idle() -> bool:
+    """사용자 요청 후 WATCH_NEXT_IDLE_SECONDS 가 지났고, 선행 수집/LLM 호출이 없는지"""
+    return (
+        time.monotonic() - last_activity >= config.WATCH_NEXT_IDLE_SECONDS
+        and llm_scheduler.inflight == 0
+        and not prefetcher.tasks
+    )
+
+async def analysis_cached(video_id: str) -> bool:
+    """자막과 그 자막의 분석 결과가 모두 캐시에 있는지"""
+    transcript = await transcript_cache.aget(video_id)
+    if not transcript:
+        return False
+    return await analysis_cache.acontains(analysis_cache_key(video_id, transcript))
+
+async def analyze_upcoming(video_id: str) -> str:
+    """다음 볼 영상 분석 (백그라운드 우선순위). 반환: 결과 (cache / skip / candidates / full / mock / error)"""
+    try:
+        transcript = await load_transcript(video_id)
+        if transcript.startswith("Error:"):
+            result = "error"
+        else:
+            _, report = await analyze_transcript(
+                video_id, transcript, stream_progress=False, priority=PRIORITY_BACKGROUND
+            )
+            result = report["path"]
+    except Exception:
+        WATCH_NEXT_RESULTS_TOTAL.inc(result="error")
+        raise
+    WATCH_NEXT_RESULTS_TOTAL.inc(result=result)
+    return result
+
+# 다음 볼 영상 유휴 시간 분석 대기열 (프록시가 queue_watch_next 로 전달)
+watch_next_queue = WatchNextQueue(
+    config.WATCH_NEXT_PER_PAGE, config.WATCH_NEXT_BUDGET_PER_HOUR,
+    is_idle=server_idle, is_cached=analysis_cached, analyze=analyze_upcoming,
+)
 
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
@@ -13,51 +413,368 @@ async def handle_list_tools() -> list[types.Tool]:
                 "type": "object",
                 "properties": {
                     "video_id": {"type": "string", "description": "Youtube Video ID (e.g. dQw4w9WgXcQ)"},
+                    "force_refresh": {
+                        "type": "boolean",
+                        "description": "캐시를 무시하고 자막 수집과 LLM 분석을 다시 수행합니다.",
+                        "default": False,
+                    },
                 },
                 "required": ["video_id"],
             },
-        )
+        ),
+        types.Tool(
+            name="analyze_sponsor_blocks",
+            description="여러 영상 ID 또는 재생목록 URL을 받아 영상별 스폰서 구간을 일괄 분석합니다.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "video_ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Youtube Video ID 목록",
+                    },
+                    "playlist_url": {"type": "string", "description": "Youtube 재생목록(또는 채널) URL"},
+                    "force_refresh": {
+                        "type": "boolean",
+                        "description": "캐시를 무시하고 자막 수집과 LLM 분석을 다시 수행합니다.",
+                        "default": False,
+                    },
+                },
+            },
+        ),
+        types.Tool(
+            name="prefetch_video",
+            description="영상의 자막(옵션: 분석)을 백그라운드에서 미리 확보합니다. 다른 영상의 선행 수집은 취소됩니다.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "video_id": {"type": "string", "description": "Youtube Video ID"},
+                    "analyze": {
+                        "type": "boolean",
+                        "description": "자막 수집 후 LLM 분석까지 미리 수행",
+                        "default": False,
+                    },
+                },
+                "required": ["video_id"],
+            },
+        ),
+        types.Tool(
+            name="queue_watch_next",
+            description="다음 볼 영상(자동재생/추천) 목록을 유휴 시간 분석 대기열에 등록합니다. 대기열은 새 목록으로 교체됩니다.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "video_id": {"type": "string", "description": "현재 보고 있는 Youtube Video ID"},
+                    "upcoming": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "다음 볼 가능성이 높은 순서의 Video ID 목록",
+                    },
+                },
+                "required": ["video_id", "upcoming"],
+            },
+        ),
+        types.Tool(
+            name="ingest_capture",
+            description="프록시가 가로챈 유튜브 응답에서 추출한 메타데이터/자막을 등록합니다. 이후 자막 수집은 yt-dlp 대신 이 데이터를 사용합니다.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "video_id": {"type": "string", "description": "Youtube Video ID"},
+                    "title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "tracks": {
+                        "type": "array",
+                        "description": "플레이어 응답의 자막 트랙 목록",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "language": {"type": "string"},
+                                "kind": {"type": "string", "description": "asr (자동 생성) / manual"},
+                                "name": {"type": ["string", "null"]},
+                                "url": {"type": "string"},
+                            },
+                            "required": ["language", "kind", "url"],
+                        },
+                    },
+                    "captions": {
+                        "type": "object",
+                        "description": "timedtext 응답 본문",
+                        "properties": {
+                            "language": {"type": "string"},
+                            "kind": {"type": "string"},
+                            "ext": {"type": "string", "description": "json3 / vtt / srv1 / srv3"},
+                            "data": {"type": "string"},
+                        },
+                        "required": ["language", "kind", "ext", "data"],
+                    },
+                },
+                "required": ["video_id"],
+            },
+        ),
+        types.Tool(
+            name="find_similar_sponsors",
+            description="이전에 분석된 영상들에서 주어진 영상 또는 문구와 비슷한 스폰서 광고 멘트를 찾습니다.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "video_id": {
+                        "type": "string",
+                        "description": "Youtube Video ID (분석된 영상은 스폰서 구간, 아니면 자막의 광고 문구 후보 구간으로 검색)",
+                    },
+                    "text": {"type": "string", "description": "광고 멘트 등 검색할 문구"},
+                    "top_k": {"type": "integer", "description": "질의별 최대 결과 수", "default": 5},
+                },
+            },
+        ),
     ]
 
 @server.call_tool()
 async def handle_call_tool(
     name: str, arguments: dict | None
-) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-    if name != "analyze_sponsor_block":
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource] | types.CallToolResult:
+    global last_activity
+    arguments = arguments or {}
+    handlers = {
+        "analyze_sponsor_block": call_analyze_single,
+        "analyze_sponsor_blocks": call_analyze_batch,
+        "prefetch_video": call_prefetch,
+        "find_similar_sponsors": call_find_similar,
+        "ingest_capture": call_ingest_capture,
+        "queue_watch_next": call_queue_watch_next,
+    }
+    if name not in handlers:
         raise ValueError(f"Unknown tool: {name}")
+    if name not in BACKGROUND_TOOLS:
+        last_activity = time.monotonic()
 
+    with TOOL_CALL_SECONDS.time(tool=name):
+        try:
+            return await handlers[name](arguments)
+        except Exception:
+            ERRORS_TOTAL.inc(stage="tool")
+            raise
+        finally:
+            # 유휴 판단은 요청이 끝난 시점부터 (긴 요청 직후 바로 백그라운드 분석이 시작되지 않도록)
+            if name not in BACKGROUND_TOOLS:
+                last_activity = time.monotonic()
+
+async def call_analyze_single(arguments: dict) -> types.CallToolResult:
     video_id = arguments.get("video_id")
     if not video_id:
         raise ValueError("video_id is required")
+    force_refresh = bool(arguments.get("force_refresh", False))
 
     logger.info(f"[Tool] Analyzing video: {video_id}")
+    started = time.perf_counter()
 
-    # 1. 자막 데이터 확보
-    transcript = await fetch_transcript(video_id)
-    transcript_cache[video_id] = transcript  # Resource 조회를 위해 캐싱
+    # 1. 자막 데이터 확보 (캐시 우선, 동시 요청은 병합)
+    transcript = await load_transcript(video_id, force_refresh)
+    fetched = time.perf_counter()
 
     # 2. AI 분석 (OpenAI or Ollama)
-    analysis_text = ""
-    if openai_client:
+    # 수집 실패는 LLM 에 보내지 않고 오류를 그대로 반환 (분석 캐시에도 저장하지 않음)
+    # 수집/분석 실패 모두 isError 로 표시 (클라이언트가 실제 분석 결과와 구분할 수 있도록)
+    prefilter_report = None
+    failed = transcript.startswith("Error:")
+    if failed:
+        analysis_text = transcript
+    else:
         try:
-            # [수정] 설정된 모델(config.LLM_MODEL)을 사용하도록 변경
-            response = await openai_client.chat.completions.create(
-                model=config.LLM_MODEL, 
-                messages=[
-                    {"role": "system", "content": "Analyze for sponsors. Return JSON summary."},
-                    {"role": "user", "content": transcript}
-                ]
-            )
-            analysis_text = response.choices[0].message.content
+            analysis_text, prefilter_report = await analyze_transcript(video_id, transcript, force_refresh)
         except Exception as e:
+            ERRORS_TOTAL.inc(stage="llm")
             analysis_text = f"LLM API Error: {str(e)}"
+            failed = True
+    finished = time.perf_counter()
+
+    # 단계별 소요 시간(초)과 사전 필터 경로는 _meta 로 전달 (본문 결과는 그대로)
+    # llm_queue: LLM 스케줄러 대기 시간 (llm 에 포함)
+    report = dict(prefilter_report or {})
+    queue_wait = report.pop("queue_wait", 0.0)
+    cascade = report.pop("cascade", None)
+    return types.CallToolResult(
+        content=[types.TextContent(type="text", text=analysis_text)],
+        isError=failed,
+        _meta={
+            "timings": {
+                "fetch": fetched - started,
+                "llm_queue": queue_wait,
+                "llm": finished - fetched,
+                "handler": finished - started,
+            },
+            "prefilter": report or None,
+            # 캐스케이드 사용 시 단계별 채택 수 / 재분석 수
+            "cascade": cascade,
+        },
+    )
+
+async def call_analyze_batch(arguments: dict) -> list[types.TextContent]:
+    """
+    자막 수집 -> LLM 분석 2단계 파이프라인.
+    단계별 세마포어로 동시 실행 수를 따로 제한하므로, 전체 처리량은
+    왕복 시간의 합이 아니라 가장 느린 단계에 의해 결정됩니다.
+    """
+    force_refresh = bool(arguments.get("force_refresh", False))
+    video_ids = list(arguments.get("video_ids") or [])
+    playlist_url = arguments.get("playlist_url")
+    if playlist_url:
+        video_ids += await fetch_playlist_ids(playlist_url, config.BATCH_MAX_VIDEOS)
+    # 중복 제거 (순서 유지)
+    video_ids = list(dict.fromkeys(video_ids))[:config.BATCH_MAX_VIDEOS]
+    if not video_ids:
+        raise ValueError("video_ids or playlist_url is required")
+
+    logger.info(f"[Tool] Batch analyzing {len(video_ids)} videos")
+
+    # 배치 단위 진행 알림 (영상 하나가 끝날 때마다)
+    report = progress_listener()
+    completed = 0
+
+    fetch_slots = asyncio.Semaphore(config.BATCH_FETCH_CONCURRENCY)
+    llm_slots = asyncio.Semaphore(config.BATCH_LLM_CONCURRENCY)
+
+    async def _process(video_id: str) -> dict:
+        async with fetch_slots:
+            transcript = await load_transcript(video_id, force_refresh)
+        if transcript.startswith("Error:"):
+            return {"video_id": video_id, "status": "error", "stage": "fetch", "error": transcript}
+
+        async with llm_slots:
+            try:
+                # 배치는 영상 단위 진행 알림만 보냄 (토큰 스트림 제외)
+                analysis_text, prefilter_report = await analyze_transcript(
+                    video_id, transcript, force_refresh, stream_progress=False, priority=PRIORITY_BATCH
+                )
+            except Exception as e:
+                ERRORS_TOTAL.inc(stage="llm")
+                return {"video_id": video_id, "status": "error", "stage": "llm", "error": f"LLM API Error: {str(e)}"}
+        result = {"video_id": video_id, "status": "ok", "path": prefilter_report["path"], "analysis": analysis_text}
+        if "cascade" in prefilter_report:
+            result["cascade"] = prefilter_report["cascade"]
+        return result
+
+    async def _process_and_report(video_id: str) -> dict:
+        nonlocal completed
+        result = await _process(video_id)
+        completed += 1
+        if report:
+            try:
+                await report(f"{video_id}: {result['status']}", completed, len(video_ids))
+            except Exception as e:
+                logger.debug(f"[Tool] Progress notification failed: {e}")
+        return result
+
+    results = await asyncio.gather(*[_process_and_report(vid) for vid in video_ids])
+    summary = {
+        "total": len(results),
+        "succeeded": sum(1 for r in results if r["status"] == "ok"),
+        "failed": sum(1 for r in results if r["status"] != "ok"),
+        # 사전 필터 경로별 영상 수 (skip / candidates / full / cache)
+        "paths": dict(Counter(r["path"] for r in results if r["status"] == "ok")),
+    }
+    if len(CASCADE_TIERS) > 1:
+        # 캐스케이드 단계별 채택 수 (임계값 조정용)
+        accepted = Counter()
+        for r in results:
+            accepted.update(r.get("cascade", {}).get("accepted", {}))
+        summary["tiers"] = dict(accepted)
+    summary["results"] = results
+    return [types.TextContent(type="text", text=json.dumps(summary, indent=2, ensure_ascii=False))]
+
+async def call_prefetch(arguments: dict) -> list[types.TextContent]:
+    """선행 수집 예약 후 즉시 반환 (작업은 백그라운드에서 진행)"""
+    video_id = arguments.get("video_id")
+    if not video_id:
+        raise ValueError("video_id is required")
+    analyze = bool(arguments.get("analyze", False))
+
+    async def _job():
+        transcript = await load_transcript(video_id)
+        if analyze and not transcript.startswith("Error:"):
+            await analyze_transcript(video_id, transcript, stream_progress=False, priority=PRIORITY_BACKGROUND)
+
+    # 이 세션의 사용자가 떠난 영상의 선행 수집만 취소 (SSE 의 다른 세션 작업은 유지)
+    session = server.request_context.session
+    cancelled = prefetcher.cancel_except({video_id}, owner=session)
+    state = prefetcher.schedule(video_id, _job, owner=session)
+    logger.info(f"[Prefetch] {video_id}: {state} (cancelled: {cancelled})")
+    return [types.TextContent(type="text", text=json.dumps({
+        "video_id": video_id,
+        "state": state,
+        "analyze": analyze,
+        "cancelled": cancelled,
+    }))]
+
+async def call_find_similar(arguments: dict) -> list[types.TextContent]:
+    """스폰서 유사도 인덱스 검색 (같은 영상의 항목은 제외)"""
+    if not config.SPONSOR_INDEX_ENABLED:
+        raise ValueError("Sponsor index is disabled (SPONSOR_INDEX_ENABLED=false)")
+    video_id = arguments.get("video_id")
+    text = arguments.get("text")
+    if not video_id and not text:
+        raise ValueError("video_id or text is required")
+    top_k = max(1, min(int(arguments.get("top_k", 5)), 50))
+
+    if text:
+        results = await similarity.search_text(text, top_k)
     else:
-        # Mock Data Generation
-        analysis_text = json.dumps({
-            "status": "mock_success",
-            "sponsor": "NordVPN (Simulated)",
-            "segments": ["02:30 - 03:15"],
-            "summary": "This is a simulated analysis because LLM Client is missing."
-        }, indent=2)
+        # 인덱스에 없는 영상만 자막이 필요 (캐시 우선)
+        queries = await similarity.queries_for_video(video_id, None)
+        if not queries:
+            queries = await similarity.queries_for_video(video_id, await load_transcript(video_id))
+        results = await similarity.search(queries, top_k, exclude_video=video_id)
+    return [types.TextContent(type="text", text=json.dumps({
+        "video_id": video_id,
+        "queries": len(results),
+        "results": results,
+    }, indent=2, ensure_ascii=False))]
 
-    return [types.TextContent(type="text", text=analysis_text)]
\ No newline at end of file
+async def call_ingest_capture(arguments: dict) -> list[types.TextContent]:
+    """
+    프록시 캡처 등록. 메타데이터와 자막 본문이 모두 모이면 바로 자막 캐시에 저장하여
+    Resource 구독자(선행 수집)에게 알리고, 이후 분석 요청은 네트워크 없이 캐시를 사용합니다.
+    """
+    # SSE 요청에는 HTTP 요청 정보가 붙음 (stdio 는 None)
+    # 캡처는 모든 세션이 공유하는 자막 캐시에 들어가므로 프록시가 띄운 stdio 세션에서만 받음
+    if server.request_context.request is not None and not config.CAPTURE_ALLOW_SSE:
+        raise ValueError("ingest_capture is only accepted over stdio (set CAPTURE_ALLOW_SSE=true to allow SSE)")
+    video_id = arguments.get("video_id")
+    if not video_id:
+        raise ValueError("video_id is required")
+    # 트랙 URL 은 서버가 직접 요청하므로 유튜브 자막 URL 만 남김
+    if arguments.get("tracks") is not None:
+        arguments["tracks"] = [
+            track for track in arguments["tracks"]
+            if isinstance(track, dict) and youtube_capture.is_caption_url(track.get("url"))
+        ]
+    record = await store_capture(video_id, arguments)
+
+    if await transcript_cache.acontains(video_id):
+        state = "cached"
+    elif "title" in record and record.get("captions"):
+        # 오류 결과는 캐시에 남지 않으므로 그대로 호출
+        transcript = await load_transcript(video_id)
+        state = "error" if transcript.startswith("Error:") else "stored"
+    else:
+        state = "pending"
+    logger.info(f"[Capture] {video_id}: tracks={len(record.get('tracks') or [])}, "
+                f"captions={'yes' if record.get('captions') else 'no'}, transcript={state}")
+    return [types.TextContent(type="text", text=json.dumps({
+        "video_id": video_id,
+        "metadata": "title" in record,
+        "tracks": len(record.get("tracks") or []),
+        "captions": (record.get("captions") or {}).get("language"),
+        "transcript": state,
+    }))]
+
+async def call_queue_watch_next(arguments: dict) -> list[types.TextContent]:
+    """다음 볼 영상 대기열 교체 후 대기열 상태 반환 (분석은 서버가 유휴 상태일 때 진행)"""
+    if not config.WATCH_NEXT_ENABLED:
+        raise ValueError("Watch-next analysis is disabled (WATCH_NEXT_ENABLED=false)")
+    video_id = arguments.get("video_id")
+    if not video_id:
+        raise ValueError("video_id is required")
+    state = await watch_next_queue.update(video_id, list(arguments.get("upcoming") or []))
+    logger.info(f"[WatchNext] Watching {video_id}, queued {state['pending']}")
+    return [types.TextContent(type="text", text=json.dumps(state))]
@@ -0,0 +1,397 @@
+import asyncio
+import atexit
+import glob
+import mmap
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+# format_transcript 의 본문 시작 표시 (이후 줄은 "[start-end] text")
+_BODY_MARKER = b"\nTranscript:\n"
+
+
+def line_index(data: bytes) -> tuple[array, array, array]:
+    """
+    자막 텍스트(UTF-8)의 줄 색인.
+    반환: (시작 시각 array('d'), 종료 시각 array('d'), 줄 시작 바이트 위치 array('Q') + 끝 위치)
+    """
+    starts, ends, offsets = array("d"), array("d"), array("Q")
+    marker = data.find(_BODY_MARKER)
+    if marker < 0:
+        return starts, ends, offsets
+    pos = marker + len(_BODY_MARKER)
+    size = len(data)
+    while pos < size:
+        newline = data.find(b"\n", pos)
+        if newline < 0:
+            newline = size
+        close = data.find(b"] ", pos, newline)
+        dash = data.find(b"-", pos, close)
+        if data[pos:pos + 1] == b"[" and 0 < dash < close:
+            try:
+                start, end = float(data[pos + 1:dash]), float(data[dash + 1:close])
+            except ValueError:
+                pass
+            else:
+                starts.append(start)
+                ends.append(end)
+                offsets.append(pos)
+        pos = newline + 1
+    offsets.append(size)
+    return starts, ends, offsets
+
+
+class TranscriptStore:
+    """
+    자막 저장소: 추가 전용(append-only) 데이터 파일 + 메모리 매핑 + 영상별 오프셋 색인(SQLite).
+
+    - 자막 본문은 데이터 파일에 덧붙여 쓰고, 색인에는 (오프셋, 길이, 줄별 시각/위치)만 저장합니다.
+    - 조회는 mmap 에서 필요한 구간만 잘라 읽으므로 프로세스 메모리에 자막 전체를 보관하지 않습니다.
+      (페이지 캐시는 OS 가 관리 -> 자막 수가 늘어도 프로세스 상주 메모리는 일정)
+    - read_range()/read_bytes() 는 시간/바이트 구간만 복사합니다 (Resource 범위 URI).
+    - 쓰기는 SQLite 쓰기 잠금(BEGIN IMMEDIATE) 안에서 하므로 여러 프로세스(SSE 멀티 워커)가 같은 디렉터리를 공유합니다.
+    - 교체/삭제로 쓰레기 바이트가 쌓이면 새 세대(generation) 파일로 압축합니다.
+      다른 프로세스는 색인의 세대 번호가 바뀐 것을 보고 새 파일을 다시 매핑합니다.
+
+    TTLCache 와 같은 공개 API(get/set/page/stats 등)를 제공합니다.
+    만료는 저장 시각 기준이고, 개수 초과 항목은 마지막 사용 시각(accessed_at) 순으로 정리하며(LRU),
+    조회 시각은 모아 두었다가 쓰기 때(또는 TRIM_INTERVAL 개가 쌓이면) 반영합니다.
+    이벤트 루프에서는 aget / aset / aread_range / aread_bytes / acontains 를 사용하면 디스크 작업이 스레드에서 실행됩니다.
+    directory 가 None 이면 임시 디렉터리를 사용합니다 (종료 시 삭제).
+    """
+
+    # 디스크 항목 정리 / 압축 검사 주기 (쓰기 횟수)
+    TRIM_INTERVAL = 32
+    # 색인 행을 읽은 뒤 다른 프로세스가 압축하여 이전 세대 파일을 지웠을 때 색인을 다시 읽는 횟수
+    STALE_RETRIES = 3
+
+    def __init__(self, name: str, directory: str | None, max_size: int = 512, ttl: float = 0,
+                 compact_bytes: int = 64 * 1024 * 1024):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.compact_bytes = compact_bytes
+        self.persistent = directory is not None
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix=f"mcp_{name}_")
+            atexit.register(shutil.rmtree, directory, True)
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._touched: dict[str, float] = {}  # 색인에 아직 반영하지 않은 조회 시각
+        # 현재 매핑: (세대, mmap)
+        self._generation = None
+        self._map = None
+
+        # 통계 카운터
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.compactions = 0
+
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite3"), timeout=10, check_same_thread=False, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, accessed_at REAL NOT NULL, generation INTEGER NOT NULL, "
+            "offset INTEGER NOT NULL, length INTEGER NOT NULL, "
+            "starts BLOB NOT NULL, ends BLOB NOT NULL, offsets BLOB NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS transcripts_stored_at ON transcripts (stored_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS transcripts_accessed_at ON transcripts (accessed_at)")
+
+    # ------------------------------------------------------------------
+    # 데이터 파일 / 매핑
+    # ------------------------------------------------------------------
+    def _data_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"transcripts.{generation}.dat")
+
+    def _current_generation(self) -> int:
+        return self._db.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def _view(self, generation: int, needed: int) -> mmap.mmap:
+        """needed 바이트까지 읽을 수 있는 매핑 (파일이 커졌거나 세대가 바뀌면 다시 매핑)"""
+        if self._map is None or self._generation != generation or len(self._map) < needed:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            with open(self._data_path(generation), "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._generation = generation
+        return self._map
+
+    def _row(self, key: str, columns: str = "stored_at, generation, offset, length"):
+        """유효한 색인 행 (없거나 만료면 None, 통계 반영)"""
+        row = self._db.execute(f"SELECT {columns} FROM transcripts WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        now = time.time()
+        if self._is_expired(row[0], now):
+            self._db.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+            self._touched.pop(key, None)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touched[key] = now
+        # 쓰기가 없는 프로세스(SSE 멀티 워커)의 조회도 다른 프로세스의 정리 순서에 반영되도록
+        if len(self._touched) >= self.TRIM_INTERVAL:
+            self._flush_touched()
+        return row
+
+    def _locate(self, key: str, columns: str = "stored_at, generation, offset, length"):
+        """
+        유효한 색인 행과 그 세대의 매핑. 반환: (행, mmap) / 없으면 (None, None)
+        색인 조회와 매핑 사이에 다른 프로세스(SSE 멀티 워커)가 압축하여 이전 세대 파일을 지웠으면
+        (FileNotFoundError, 비어 있는 파일이면 ValueError) 새 세대를 가리키는 색인 행을 다시 읽습니다.
+        """
+        for attempt in range(self.STALE_RETRIES):
+            row = self._row(key, columns)
+            if row is None:
+                return None, None
+            _, generation, offset, length = row[:4]
+            if not length:
+                return row, None
+            try:
+                return row, self._view(generation, offset + length)
+            except (FileNotFoundError, ValueError):
+                if attempt == self.STALE_RETRIES - 1:
+                    raise
+                self.hits -= 1  # 재시도는 조회 통계에 한 번만 반영
+
+    def _is_expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl > 0 and now - stored_at > self.ttl
+
+    # ------------------------------------------------------------------
+    # 쓰기 / 정리
+    # ------------------------------------------------------------------
+    def set(self, key: str, value: str):
+        data = value.encode("utf-8")
+        starts, ends, offsets = line_index(data)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                generation = self._current_generation()
+                with open(self._data_path(generation), "ab") as f:
+                    offset = f.seek(0, os.SEEK_END)
+                    f.write(data)
+                now = time.time()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO transcripts "
+                    "(key, stored_at, accessed_at, generation, offset, length, starts, ends, offsets) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, now, now, generation, offset, len(data),
+                     starts.tobytes(), ends.tobytes(), offsets.tobytes()),
+                )
+                self._touched.pop(key, None)
+                self._flush_touched()
+                compacted = None
+                self._writes += 1
+                if self._writes % self.TRIM_INTERVAL == 0:
+                    self._trim()
+                    compacted = self._maybe_compact(generation)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            # 색인이 새 세대를 가리키도록 커밋된 뒤에 이전 파일 삭제
+            if compacted is not None:
+                self._remove_stale(compacted)
+
+    def _flush_touched(self):
+        """모아 둔 조회 시각을 색인에 반영 (다른 프로세스의 정리 순서에도 사용)"""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE transcripts SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(at, key) for key, at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _trim(self):
+        """만료 항목과 최근 사용 순으로 max_size 를 넘는 항목 삭제 (LRU, 본문 바이트는 압축 시 회수)"""
+        if self.ttl > 0:
+            self.expirations += self._db.execute(
+                "DELETE FROM transcripts WHERE stored_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+        self.evictions += self._db.execute(
+            "DELETE FROM transcripts WHERE key IN ("
+            "SELECT key FROM transcripts ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,),
+        ).rowcount
+
+    def _maybe_compact(self, generation: int) -> int | None:
+        """
+        쓰레기 바이트가 살아있는 바이트보다 많고 파일이 compact_bytes 이상이면 새 세대로 복사.
+        반환: 새 세대 번호 (압축하지 않으면 None)
+        """
+        size = os.path.getsize(self._data_path(generation))
+        live = self._db.execute("SELECT COALESCE(SUM(length), 0) FROM transcripts").fetchone()[0]
+        if size < self.compact_bytes or size - live <= live:
+            return None
+        source = self._view(generation, size)
+        target = generation + 1
+        moved = []
+        with open(self._data_path(target), "wb") as f:
+            for key, offset, length in self._db.execute(
+                "SELECT key, offset, length FROM transcripts ORDER BY stored_at"
+            ).fetchall():
+                moved.append((target, f.tell(), key))
+                f.write(source[offset:offset + length])
+        self._db.executemany("UPDATE transcripts SET generation = ?, offset = ? WHERE key = ?", moved)
+        self._db.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (target,))
+        self.compactions += 1
+        return target
+
+    def _remove_stale(self, generation: int):
+        """이전 세대 파일 삭제 (다른 프로세스가 매핑 중이라 실패하면 다음 압축 때 다시 시도)"""
+        if self._map is not None and self._generation != generation:
+            self._map.close()
+            self._map = None
+        for path in glob.glob(os.path.join(self.directory, "transcripts.*.dat")):
+            try:
+                if int(path.rsplit(".", 2)[1]) < generation:
+                    os.remove(path)
+            except (ValueError, OSError):
+                pass
+
+    # ------------------------------------------------------------------
+    # 공개 API (TTLCache 호환)
+    # ------------------------------------------------------------------
+    def get(self, key: str, default=None):
+        with self._lock:
+            row, view = self._locate(key)
+            if row is None:
+                return default
+            _, _, offset, length = row
+            if not length:
+                return ""
+            return view[offset:offset + length].decode("utf-8")
+
+    def read_bytes(self, key: str, first: int, last: int | None = None) -> bytes | None:
+        """first ~ last(포함) 바이트 구간 (last 가 None 이면 끝까지)"""
+        with self._lock:
+            row, view = self._locate(key)
+            if row is None:
+                return None
+            _, _, offset, length = row
+            first = min(max(first, 0), length)
+            stop = length if last is None else min(max(last + 1, first), length)
+            if first >= stop:
+                return b""
+            return view[offset + first:offset + stop]
+
+    def read_range(self, key: str, start: float = 0.0, end: float = float("inf")) -> str | None:
+        """start ~ end 초와 겹치는 자막 줄만 ([start-end] text 형식)"""
+        with self._lock:
+            row, view = self._locate(key, "stored_at, generation, offset, length, starts, ends, offsets")
+            if row is None:
+                return None
+            _, _, offset, length, starts_blob, ends_blob, offsets_blob = row
+            starts, ends, offsets = array("d"), array("d"), array("Q")
+            starts.frombytes(starts_blob)
+            ends.frombytes(ends_blob)
+            offsets.frombytes(offsets_blob)
+            i = bisect_left(starts, start)
+            # start 이전에 시작해서 걸쳐 있는 줄 포함
+            while i > 0 and ends[i - 1] > start:
+                i -= 1
+            j = bisect_left(starts, end)
+            if i >= j:
+                return ""
+            return view[offset + offsets[i]:offset + offsets[j]].decode("utf-8").rstrip("\n")
+
+    async def aget(self, key: str, default=None):
+        """get 의 비동기 버전 (색인 조회/매핑을 스레드에서 실행)"""
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def aset(self, key: str, value: str):
+        """set 의 비동기 버전 (쓰기/정리/압축을 스레드에서 실행)"""
+        await asyncio.to_thread(self.set, key, value)
+
+    async def aread_bytes(self, key: str, first: int, last: int | None = None) -> bytes | None:
+        """read_bytes 의 비동기 버전"""
+        return await asyncio.to_thread(self.read_bytes, key, first, last)
+
+    async def aread_range(self, key: str, start: float = 0.0, end: float = float("inf")) -> str | None:
+        """read_range 의 비동기 버전"""
+        return await asyncio.to_thread(self.read_range, key, start, end)
+
+    async def acontains(self, key: str) -> bool:
+        """in 연산의 비동기 버전"""
+        return await asyncio.to_thread(self.__contains__, key)
+
+    def __setitem__(self, key: str, value: str):
+        self.set(key, value)
+
+    def pop(self, key: str, default=None):
+        value = self.get(key, default)
+        with self._lock:
+            self._db.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+            self._touched.pop(key, None)
+        return value
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            cutoff = time.time() - self.ttl if self.ttl > 0 else float("-inf")
+            rows = self._db.execute(
+                "SELECT key FROM transcripts WHERE stored_at >= ? ORDER BY stored_at", (cutoff,)
+            ).fetchall()
+            return [key for (key,) in rows]
+
+    def page(self, after: tuple[float, str] | None = None, limit: int = 100) -> list[tuple[float, str]]:
+        """저장 시각 순 키 목록의 한 페이지 (TTLCache.page 와 동일한 커서 의미)"""
+        with self._lock:
+            cutoff = time.time() - self.ttl if self.ttl > 0 else float("-inf")
+            after = after or (float("-inf"), "")
+            rows = self._db.execute(
+                "SELECT stored_at, key FROM transcripts "
+                "WHERE stored_at >= ? AND (stored_at, key) > (?, ?) ORDER BY stored_at, key LIMIT ?",
+                (cutoff, after[0], after[1], limit),
+            ).fetchall()
+            return [tuple(row) for row in rows]
+
+    def clear(self):
+        with self._lock:
+            self._touched.clear()
+            self._db.execute("DELETE FROM transcripts")
+
+    def stats(self) -> dict:
+        with self._lock:
+            size, live = self._db.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM transcripts").fetchone()
+            path = self._data_path(self._current_generation())
+            return {
+                "name": self.name,
+                "size": size,
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "persistent": self.persistent,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "live_bytes": live,
+                "file_bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+                "compactions": self.compactions,
+            }
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT stored_at FROM transcripts WHERE key = ?", (key,)).fetchone()
+            return row is not None and not self._is_expired(row[0], time.time())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
@@ -0,0 +1,192 @@
+import glob
+import json
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+
+class HashingEmbedder:
+    """
+    문자 n-gram 해싱 임베딩 (외부 모델 없음, 한국어/영어 공통).
+    광고 멘트는 영상마다 거의 같은 문구를 반복하므로 n-gram 겹침만으로도 유사도가 잘 드러납니다.
+    해시는 프로세스와 무관하게 같은 값이 나오도록 crc32 를 사용합니다.
+    """
+
+    def __init__(self, dim: int = 512, n: int = 3):
+        self.dim = dim
+        self.n = n
+        self.signature = f"hash{n}"
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        text = " ".join(text.lower().split())
+        for i in range(max(len(text) - self.n + 1, 1)):
+            h = zlib.crc32(text[i:i + self.n].encode("utf-8"))
+            # 부호 해싱으로 충돌 편향 완화
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return vector
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        return normalize(np.stack([self._embed_one(t) for t in texts]))
+
+    async def dimension(self) -> int:
+        return self.dim
+
+
+class OllamaEmbedder:
+    """기존 OpenAI 호환 엔드포인트(Ollama)의 임베딩 모델 사용"""
+
+    def __init__(self, client, model: str):
+        self.client = client
+        self.model = model
+        self.signature = "ollama-" + "".join(c if c.isalnum() else "_" for c in model)
+        self.dim = None
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        response = await self.client.embeddings.create(model=self.model, input=texts)
+        vectors = normalize(np.array([item.embedding for item in response.data], dtype=np.float32))
+        self.dim = vectors.shape[1]
+        return vectors
+
+    async def dimension(self) -> int:
+        """모델 출력 차원 (처음 한 번 임베딩하여 확인)"""
+        if self.dim is None:
+            await self.embed(["dimension probe"])
+        return self.dim
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class _Segment:
+    """벡터 파일(.f32, float32 행 연속) + 메타데이터 파일(.jsonl) 한 쌍"""
+
+    def __init__(self, base: str, dim: int):
+        self.base = base
+        self.dim = dim
+        self.vectors = None          # np.memmap (읽기 전용)
+        self.meta: list[dict] = []
+        self._meta_offset = 0
+
+    def refresh(self):
+        """다른 프로세스가 추가한 행까지 반영 (메타데이터는 이어서 읽고, 벡터는 다시 매핑)"""
+        with open(self.base + ".jsonl", "rb") as f:
+            f.seek(self._meta_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # 기록 중인 줄
+                self.meta.append(json.loads(line))
+                self._meta_offset += len(line)
+        rows = os.path.getsize(self.base + ".f32") // (self.dim * 4)
+        count = min(rows, len(self.meta))
+        if self.vectors is None or len(self.vectors) != count:
+            self.vectors = np.memmap(self.base + ".f32", dtype=np.float32, mode="r", shape=(count, self.dim)) \
+                if count else None
+
+    def __len__(self) -> int:
+        return 0 if self.vectors is None else len(self.vectors)
+
+
+class VectorIndex:
+    """
+    증분 추가 + 메모리 매핑 영속화를 지원하는 벡터 인덱스 (코사인 유사도, 전수 탐색).
+
+    - 프로세스마다 자기 세그먼트 파일에만 덧붙여 쓰므로 SSE 멀티 워커에서도 잠금이 필요 없습니다.
+    - 검색 시 디렉터리의 모든 세그먼트를 np.memmap 으로 읽어 한 번의 행렬곱으로 점수를 계산합니다.
+      (광고 멘트 수만 건 규모에서는 IVF 없이도 수 ms 수준)
+    - path 가 None 이면 메모리 전용입니다.
+    """
+
+    def __init__(self, path: str | None, dim: int):
+        self.path = path
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._segments: dict[str, _Segment] = {}
+        self._writer = None
+        # 메모리 전용 모드
+        self._memory_vectors: list[np.ndarray] = []
+        self._memory_meta: list[dict] = []
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def _writer_base(self) -> str:
+        if self._writer is None:
+            self._writer = os.path.join(self.path, f"seg-{int(time.time())}-{os.getpid()}")
+        return self._writer
+
+    def add(self, vectors: np.ndarray, metadata: list[dict]):
+        """행 단위 추가 (메타데이터를 나중에 기록하여, 읽는 쪽은 메타데이터가 있는 행만 사용)"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if not self.path:
+                self._memory_vectors.extend(vectors)
+                self._memory_meta.extend(metadata)
+                return
+            base = self._writer_base()
+            with open(base + ".f32", "ab") as f:
+                f.write(vectors.tobytes())
+            with open(base + ".jsonl", "ab") as f:
+                f.write(b"".join(json.dumps(m, ensure_ascii=False).encode("utf-8") + b"\n" for m in metadata))
+
+    def _refresh(self):
+        for vector_file in glob.glob(os.path.join(self.path, "seg-*.f32")):
+            base = vector_file[:-4]
+            if not os.path.exists(base + ".jsonl"):
+                continue
+            segment = self._segments.get(base)
+            if segment is None:
+                segment = self._segments[base] = _Segment(base, self.dim)
+            segment.refresh()
+
+    def _blocks(self):
+        """[(벡터 행렬, 메타데이터 목록), ...]"""
+        if not self.path:
+            if self._memory_vectors:
+                yield np.stack(self._memory_vectors), self._memory_meta
+            return
+        self._refresh()
+        for segment in self._segments.values():
+            if len(segment):
+                yield segment.vectors, segment.meta
+
+    def search(self, query: np.ndarray, k: int = 5, min_score: float = 0.0, exclude=None) -> list[dict]:
+        """
+        query 와 코사인 유사도가 높은 항목 k 개 (점수 내림차순).
+        exclude(meta) 가 True 인 항목은 제외합니다.
+        """
+        candidates = []
+        with self._lock:
+            for vectors, meta in self._blocks():
+                scores = np.asarray(vectors @ query)
+                if exclude:
+                    # 제외 항목을 먼저 -inf 로 가림 (같은 영상의 비슷한 구간이 많아도 다른 영상 결과가 밀려나지 않도록)
+                    # min_score 미만인 행은 어차피 결과에 없으므로 판정하지 않음
+                    for i in np.flatnonzero(scores >= min_score):
+                        if exclude(meta[i]):
+                            scores[i] = -np.inf
+                take = min(len(scores), k)
+                top = np.argpartition(-scores, take - 1)[:take]
+                for i in top:
+                    score = float(scores[i])
+                    if score >= min_score:
+                        candidates.append((score, meta[i]))
+        candidates.sort(key=lambda c: -c[0])
+        return [dict(meta, score=round(score, 4)) for score, meta in candidates[:k]]
+
+    def entries(self, predicate) -> list[tuple[np.ndarray, dict]]:
+        """조건에 맞는 항목 (벡터, 메타데이터) 목록"""
+        with self._lock:
+            return [
+                (np.array(vectors[i]), meta[i])
+                for vectors, meta in self._blocks()
+                for i in range(len(vectors)) if predicate(meta[i])
+            ]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(meta) if not self.path else len(vectors) for vectors, meta in self._blocks())
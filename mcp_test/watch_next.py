@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("mcp_server")
+
+
+class WatchNextQueue:
+    """
+    다음 볼 영상(자동재생/추천) 유휴 시간 분석 대기열.
+
+    - 프록시가 새 페이지의 목록을 보낼 때마다 대기열을 교체합니다 (이전 페이지의 추천은 볼 가능성이 낮음).
+    - is_idle() 이 참일 때만(사용자 요청/LLM 작업이 없을 때) 한 번에 하나씩 analyze(video_id) 를 실행합니다.
+    - 시간당 budget 개까지만 분석하며, 캐시 적중(analyze 가 "cache" 반환)은 예산을 쓰지 않습니다.
+    - 이미 분석한 영상(is_cached / 최근 완료)은 대기열에 넣지 않습니다.
+    - 상태가 바뀌면 listeners 를 호출합니다 (Resource 갱신 알림 -> GUI).
+    """
+    POLL_INTERVAL = 1.0
+    BUDGET_WINDOW = 3600.0
+    RECENT_SIZE = 10
+    DONE_SIZE = 500
+
+    def __init__(
+        self,
+        per_page: int,
+        budget_per_hour: int,
+        is_idle: Callable[[], bool],
+        is_cached: Callable[[str], Awaitable[bool]],
+        analyze: Callable[[str], Awaitable[str]],
+    ):
+        self.per_page = per_page
+        self.budget_per_hour = budget_per_hour
+        self.is_idle = is_idle
+        self.is_cached = is_cached
+        self.analyze = analyze
+        self.listeners: list[Callable[[], None]] = []
+
+        self.watching = None   # 사용자가 보고 있는 영상
+        self.pending: list[str] = []
+        self.running = None    # 분석 중인 영상
+        self.recent: deque[dict] = deque(maxlen=self.RECENT_SIZE)
+        self._done: OrderedDict[str, None] = OrderedDict()
+        self._spent: deque[float] = deque()  # 예산을 사용한 시각
+        self._updates = 0  # update 호출 순번 (캐시 확인 중 더 새로운 목록이 들어왔는지 판단)
+        self._wake = None
+        self._task = None
+
+    async def update(self, video_id: str, upcoming: list[str]) -> dict:
+        """현재 영상과 다음 볼 영상 목록 등록 (대기열 교체). 반환: 상태"""
+        self.watching = video_id
+        self._updates += 1
+        update = self._updates
+        queue = []
+        for vid in dict.fromkeys(upcoming):
+            if vid in (video_id, self.running) or vid in self._done:
+                continue
+            if await self.is_cached(vid):
+                self._mark_done(vid)
+                continue
+            queue.append(vid)
+            if len(queue) >= self.per_page:
+                break
+        if update != self._updates:
+            # 캐시를 확인하는 동안 더 새로운 목록이 등록됨 -> 그 목록을 유지
+            return self.stats()
+        self.pending = queue
+
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._worker())
+        self._wake.set()
+        self._changed()
+        return self.stats()
+
+    def budget_used(self) -> int:
+        cutoff = time.time() - self.BUDGET_WINDOW
+        while self._spent and self._spent[0] <= cutoff:
+            self._spent.popleft()
+        return len(self._spent)
+
+    async def _worker(self):
+        while True:
+            if not self.pending:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            if self.budget_used() >= self.budget_per_hour:
+                # 가장 오래된 사용 기록이 만료될 때까지 대기 (새 목록이 와도 예산은 그대로)
+                await asyncio.sleep(self._spent[0] + self.BUDGET_WINDOW - time.time())
+                continue
+            if not self.is_idle():
+                await asyncio.sleep(self.POLL_INTERVAL)
+                continue
+
+            video_id = self.running = self.pending.pop(0)
+            self._changed()
+            try:
+                result = await self.analyze(video_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[WatchNext] {video_id} failed: {e}")
+                result = "error"
+            finally:
+                self.running = None
+            if result != "cache":
+                self._spent.append(time.time())
+            self._mark_done(video_id)
+            self.recent.appendleft({"video_id": video_id, "result": result, "at": round(time.time(), 3)})
+            logger.info(f"[WatchNext] {video_id}: {result} (budget {self.budget_used()}/{self.budget_per_hour})")
+            self._changed()
+
+    def _mark_done(self, video_id: str):
+        self._done[video_id] = None
+        self._done.move_to_end(video_id)
+        while len(self._done) > self.DONE_SIZE:
+            self._done.popitem(last=False)
+
+    def _changed(self):
+        for listener in self.listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.debug(f"[WatchNext] Listener failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "watching": self.watching,
+            "running": self.running,
+            "pending": list(self.pending),
+            "recent": list(self.recent),
+            "budget": {"used": self.budget_used(), "per_hour": self.budget_per_hour},
+            "idle": self.is_idle(),
+        }
@@ -0,0 +1,237 @@
+import json
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+from .domains import DomainMatcher
+
+# 프록시가 본문을 확인할 유튜브 응답 종류 (경로 접두사)
+CAPTURE_PATHS = (
+    ("/watch", "watch"),                  # 시청 페이지 HTML (ytInitialPlayerResponse 포함)
+    ("/youtubei/v1/player", "player"),    # SPA 이동 시 플레이어 API (JSON)
+    ("/api/timedtext", "timedtext"),      # 자막 본문 (플레이어에서 자막을 켠 경우)
+    ("/youtubei/v1/next", "next"),        # SPA 이동 시 다음 볼 영상(자동재생/추천) API (JSON)
+)
+
+_PLAYER_MARKER = "ytInitialPlayerResponse"
+# 시청 페이지의 다음 볼 영상 데이터 (next API 응답과 같은 구조)
+_DATA_MARKER = "ytInitialData"
+# 마커와 JSON 시작 사이에 올 수 있는 문자 (ytInitialPlayerResponse = { / window["ytInitialPlayerResponse"] = {)
+_ASSIGNMENT_CHARS = frozenset(' "\']=')
+_decoder = json.JSONDecoder()
+# 자막 트랙 URL 로 허용하는 호스트 (서버가 이 URL 을 직접 요청하므로 임의 주소는 받지 않음)
+CAPTION_HOSTS = DomainMatcher(["youtube.com"])
+
+
+def classify(path: str) -> str | None:
+    """요청 경로 -> watch / player / timedtext (대상이 아니면 None)"""
+    for prefix, kind in CAPTURE_PATHS:
+        if path.startswith(prefix):
+            return kind
+    return None
+
+
+def find_assigned_json(page: str, marker: str) -> dict | None:
+    """
+    HTML 에서 marker = {...} 로 대입된 JSON 객체 추출.
+    페이지 전체를 정규식으로 훑지 않고 마커 위치에서 raw_decode 로 객체 하나만 파싱합니다.
+    """
+    index = page.find(marker)
+    while index >= 0:
+        start = index + len(marker)
+        brace = page.find("{", start)
+        if brace >= 0 and set(page[start:brace]) <= _ASSIGNMENT_CHARS:
+            try:
+                value, _ = _decoder.raw_decode(page, brace)
+                if isinstance(value, dict):
+                    return value
+            except ValueError:
+                pass
+        index = page.find(marker, start)
+    return None
+
+
+def find_player_response(page: str) -> dict | None:
+    """시청 페이지 HTML 에서 ytInitialPlayerResponse JSON 추출"""
+    return find_assigned_json(page, _PLAYER_MARKER)
+
+
+def _track_name(track: dict) -> str | None:
+    name = track.get("name") or {}
+    if "simpleText" in name:
+        return name["simpleText"]
+    runs = name.get("runs") or []
+    return "".join(run.get("text", "") for run in runs) or None
+
+
+def is_caption_url(url) -> bool:
+    """https 이고 유튜브 호스트의 /api/timedtext 경로인 자막 트랙 URL 인지"""
+    if not isinstance(url, str):
+        return False
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return False
+    return (
+        parts.scheme == "https"
+        and port in (None, 443)
+        and parts.hostname is not None
+        and parts.hostname in CAPTION_HOSTS
+        and parts.path == "/api/timedtext"
+    )
+
+
+def summarize_player_response(data: dict) -> dict | None:
+    """
+    플레이어 응답에서 서버로 보낼 메타데이터와 자막 트랙 목록만 추출.
+    반환: {"video_id", "title", "description", "tracks": [{"language", "kind", "name", "url"}]}
+    """
+    details = data.get("videoDetails") or {}
+    video_id = details.get("videoId")
+    if not video_id:
+        return None
+    renderer = (data.get("captions") or {}).get("playerCaptionsTracklistRenderer") or {}
+    tracks = [
+        {
+            "language": track.get("languageCode"),
+            # 자동 생성 자막은 kind == "asr"
+            "kind": track.get("kind") or "manual",
+            "name": _track_name(track),
+            "url": track["baseUrl"],
+        }
+        for track in renderer.get("captionTracks") or []
+        if is_caption_url(track.get("baseUrl")) and track.get("languageCode")
+    ]
+    return {
+        "video_id": video_id,
+        "title": details.get("title"),
+        "description": details.get("shortDescription"),
+        "tracks": tracks,
+    }
+
+
+def timedtext_info(url: str) -> dict | None:
+    """timedtext 요청 URL 의 영상 ID / 언어 / 포맷 (번역 자막은 원문이 아니므로 제외)"""
+    query = parse_qs(urlsplit(url).query)
+    video_id = (query.get("v") or [None])[0]
+    language = (query.get("lang") or [None])[0]
+    if not video_id or not language or query.get("tlang"):
+        return None
+    return {
+        "video_id": video_id,
+        "language": language,
+        "kind": (query.get("kind") or ["manual"])[0],
+        # fmt 미지정 시 XML(srv1) 응답
+        "ext": (query.get("fmt") or ["srv1"])[0],
+    }
+
+
+def extract_capture(kind: str, url: str, body: bytes) -> dict | None:
+    """
+    응답 본문 -> ingest_capture Tool 인자 (추출할 내용이 없으면 None).
+    시청 페이지/플레이어 API 는 메타데이터와 트랙 목록, timedtext 는 자막 본문을 담습니다.
+    """
+    if kind == "timedtext":
+        info = timedtext_info(url)
+        if info is None or not body.strip():
+            return None
+        return {
+            "video_id": info.pop("video_id"),
+            "captions": dict(info, data=body.decode("utf-8", errors="replace")),
+        }
+
+    text = body.decode("utf-8", errors="replace")
+    if kind == "watch":
+        data = find_player_response(text)
+    elif kind == "player":
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+    else:
+        return None
+    return summarize_player_response(data) if isinstance(data, dict) else None
+
+
+def _walk(value, key: str):
+    """중첩된 JSON 에서 key 에 해당하는 값을 문서 순서대로 나열"""
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if key in node:
+                yield node[key]
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def _video_ids(section, renderers: tuple[str, ...]) -> list[str]:
+    ids = []
+    for renderer in renderers:
+        for item in _walk(section, renderer):
+            if isinstance(item, dict) and item.get("videoId"):
+                ids.append(item["videoId"])
+    return ids
+
+
+def summarize_next_response(data: dict, limit: int = 10) -> dict | None:
+    """
+    다음 볼 영상 데이터(ytInitialData / next API) -> {"video_id", "upcoming": [...]}.
+    순서: 자동재생 다음 영상 > 재생목록의 다음 항목 > 추천 영상 (중복/현재 영상 제외, 최대 limit 개)
+    """
+    video_id = ((data.get("currentVideoEndpoint") or {}).get("watchEndpoint") or {}).get("videoId")
+    results = (data.get("contents") or {}).get("twoColumnWatchNextResults") or {}
+    if not video_id or not results:
+        return None
+
+    # sets 에는 재생목록 이전/다음 버튼 영상도 있으므로 autoplayVideo 만 사용
+    autoplay = [
+        video["watchEndpoint"]["videoId"]
+        for video in _walk(results.get("autoplay") or {}, "autoplayVideo")
+        if isinstance(video, dict) and (video.get("watchEndpoint") or {}).get("videoId")
+    ]
+    playlist = _video_ids(results.get("playlist") or {}, ("playlistPanelVideoRenderer",))
+    if video_id in playlist:
+        playlist = playlist[playlist.index(video_id) + 1:]
+    secondary = results.get("secondaryResults") or {}
+    recommended = _video_ids(secondary, ("compactVideoRenderer",)) + [
+        lockup["contentId"]
+        for lockup in _walk(secondary, "lockupViewModel")
+        if isinstance(lockup, dict) and lockup.get("contentType") == "LOCKUP_CONTENT_TYPE_VIDEO"
+        and lockup.get("contentId")
+    ]
+
+    upcoming = [v for v in dict.fromkeys(autoplay[:1] + playlist + recommended) if v != video_id]
+    return {"video_id": video_id, "upcoming": upcoming[:limit]} if upcoming else None
+
+
+def extract_watch_next(kind: str, body: bytes, limit: int = 10) -> dict | None:
+    """시청 페이지 / next API 응답 -> queue_watch_next Tool 인자 (없으면 None)"""
+    text = body.decode("utf-8", errors="replace")
+    if kind == "watch":
+        data = find_assigned_json(text, _DATA_MARKER)
+    elif kind == "next":
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+    else:
+        return None
+    return summarize_next_response(data, limit) if isinstance(data, dict) else None
+
+
+def pick_track(tracks: list[dict], languages: list[str]) -> dict | None:
+    """수동 자막 > 자동 자막, 언어는 languages 순서 (captions.pick_caption_track 과 같은 기준)"""
+    for manual in (True, False):
+        for lang in languages:
+            for track in tracks:
+                if track["language"] == lang and (track["kind"] != "asr") == manual:
+                    return track
+    return None
+
+
+def track_url(track: dict, ext: str = "json3") -> str:
+    """트랙 baseUrl 에 응답 포맷(fmt) 지정"""
+    parts = urlsplit(track["url"])
+    query = parse_qs(parts.query, keep_blank_values=True)
+    query["fmt"] = [ext]
+    return urlunsplit(parts._replace(query=urlencode(query, doseq=True)))
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturatedError(RuntimeError):
+    """대기열이 가득 차서 작업을 받을 수 없음 (Backpressure)"""
+
+
+class PoolTimeoutError(TimeoutError):
+    """대기 + 실행 시간이 제한을 초과함"""
+
+
+class YtDlpPool:
+    """
+    yt-dlp 전용 워커 풀.
+
+    - 이벤트 루프의 기본 Executor 와 분리된 고정 크기 스레드 풀을 사용합니다.
+    - 워커 스레드마다 YoutubeDL 인스턴스를 한 번만 만들고(추출기 미리 로드) 재사용합니다.
+    - 실행 중 + 대기 중 작업 수가 workers + queue_size 를 넘으면 즉시 거절합니다.
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 16, timeout: float = 60.0, ydl_opts: dict | None = None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.ydl_opts = ydl_opts or {}
+        self._local = threading.local()
+        self._executor = None
+        self._lock = threading.Lock()
+
+        # 상태 / 통계
+        self.pending = 0      # 대기 + 실행 중
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        # 대기 시간 관측 콜백 (메트릭 히스토그램 연결용, 워커 스레드에서 호출됨)
+        self.wait_observer = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="ytdlp",
+                initializer=self._init_worker,
+            )
+        return self._executor
+
+    def _init_worker(self):
+        """워커 스레드 시작 시 YoutubeDL 준비 (YouTube 추출기 사전 로드)"""
+        # yt_dlp 는 첫 작업 제출 시점에 로드 (서버 기동 시간 단축)
+        import yt_dlp
+
+        ydl = yt_dlp.YoutubeDL(self.ydl_opts)
+        ydl.get_info_extractor("Youtube")
+        self._local.ydl = ydl
+
+    def _run(self, func, submitted_at: float):
+        waited = time.perf_counter() - submitted_at
+        with self._lock:
+            self.running += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        if self.wait_observer:
+            self.wait_observer(waited)
+        try:
+            return func(self._local.ydl)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    async def submit(self, func):
+        """
+        func(ydl) 를 워커 스레드에서 실행하고 결과를 반환합니다.
+        풀이 포화 상태면 PoolSaturatedError, 제한 시간 초과 시 PoolTimeoutError 를 발생시킵니다.
+        """
+        with self._lock:
+            if self.pending >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise PoolSaturatedError(
+                    f"yt-dlp pool saturated ({self.pending} pending, limit {self.workers + self.queue_size})"
+                )
+            self.pending += 1
+
+        # 스레드 작업이 실제로 끝나는 시점에 pending 감소 (타임아웃 후에도 스레드는 점유 중일 수 있음)
+        job = self._get_executor().submit(self._run, func, time.perf_counter())
+        job.add_done_callback(self._release)
+        ok = False
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+            ok = True
+            return result
+        except asyncio.TimeoutError:
+            # 아직 시작 전이면 대기열에서 제거됨 (실행 중인 yt-dlp 는 중단할 수 없음)
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeoutError(f"yt-dlp job exceeded {self.timeout:g}s")
+        finally:
+            with self._lock:
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def _release(self, _job):
+        with self._lock:
+            self.pending -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_size,
+                "queue_depth": max(self.pending - self.running, 0),
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "avg_wait": self.total_wait / finished if finished else 0.0,
+                "max_wait": self.max_wait,
+            }
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,38 +1,52 @@
 import sys
 import os
+import json
 import threading
 import queue
 import asyncio
+import concurrent.futures
 import tkinter as tk
 from tkinter import scrolledtext
 
 # Mitmproxy Imports
 from mitmproxy import http, ctx, tls
+from mitmproxy.net.encoding import decode as decode_content
 
 # MCP Client Imports
+import anyio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, AnyUrl, ResourceUpdatedNotification, ServerNotification
 
 # Config Import
 # Mitmdump 실행 시 현재 폴더가 경로에 포함되므로 바로 import 가능
 try:
     from mcp_test.config import config
+    from mcp_test.domains import DomainMatcher
+    from mcp_test import youtube_capture
 except ImportError:
     # 경로 문제 발생 시 대비
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from mcp_test.config import config
+    from mcp_test.domains import DomainMatcher
+    from mcp_test import youtube_capture
 
 # ==============================================================================
 # Shared State (Bridge between Mitmproxy and Tkinter)
 # ==============================================================================
 GUI_QUEUE = queue.Queue()
+WATCH_NEXT_URI = "youtube://watch-next"
+
+# 도메인 매처 (설정에서 한 번만 생성, 호스트별 판정은 LRU 캐시)
+ALLOWED_HOSTS = DomainMatcher(config.ALLOWED_DOMAINS, config.DOMAIN_DECISION_CACHE_SIZE)
+WATCH_HOSTS = DomainMatcher(["youtube.com"])
 
 # ==============================================================================
 # 1. MCP Client Logic (Execution Layer)
 # ==============================================================================
-async def mcp_client_task(video_id: str, log_callback):
-    """MCP 서버와 연결하고 Tool을 호출하는 비동기 작업"""
-    
+def build_server_params() -> StdioServerParameters:
+    """MCP 서버(stdio) 실행 파라미터 구성"""
     current_dir = os.path.dirname(os.path.abspath(__file__))
     
     # 서버 환경 변수 설정
@@ -44,34 +58,317 @@ async def mcp_client_task(video_id: str, log_callback):
     env["NO_PROXY"] = "*"
     env["no_proxy"] = "*"
 
-    server_params = StdioServerParameters(
+    return StdioServerParameters(
         command=sys.executable,
         args=["-m", "mcp_test.server"], 
         env=env
     )
 
-    log_callback(f"Connecting to MCP Server... (Target: {video_id})")
-    
+class MCPConnection:
+    """
+    백그라운드 이벤트 루프 하나에서 MCP 서버 세션을 계속 유지합니다.
+    서버 프로세스 기동/initialize 핸드셰이크는 최초 1회만 수행하고,
+    프로세스가 죽으면 자동으로 재연결합니다.
+    GUI 스레드는 submit()으로 코루틴을 이 루프에 넘기기만 하면 됩니다.
+    """
+    CONNECT_TIMEOUT = 30.0
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self):
+        self.loop = None
+        self._thread = None
+        self._session = None
+        self._ready = None
+        self._reset = None
+        # Resource URI -> 갱신 알림 콜백 (재연결 시 다시 구독)
+        self._subscriptions = {}
+        self.log = lambda msg: None
+
+    def start(self, log_callback=None):
+        """전용 이벤트 루프 스레드를 시작하고 서버 연결을 미리 맺어 둡니다."""
+        if self._thread:
+            return
+        if log_callback:
+            self.log = log_callback
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self._ready = asyncio.Event()
+        self._reset = asyncio.Event()
+        self.loop.create_task(self._maintain())
+        self.loop.run_forever()
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """다른 스레드(GUI)에서 코루틴을 백그라운드 루프로 전달"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _maintain(self):
+        """세션 수명 관리 루프 (연결 -> 대기 -> 끊기면 재연결)"""
+        # stdio_client / ClientSession 은 anyio TaskGroup 을 쓰므로
+        # 진입과 종료가 반드시 같은 Task 안에서 일어나야 합니다.
+        while True:
+            try:
+                async with stdio_client(build_server_params()) as (read, write):
+                    # 유휴 상태에서 서버 프로세스가 죽어도(stdout EOF) 바로 재연결 + 재구독
+                    read = ClosingStream(read, self._on_closed)
+                    async with ClientSession(read, write, message_handler=self._on_message) as session:
+                        await session.initialize()
+                        for uri in list(self._subscriptions):
+                            await session.subscribe_resource(AnyUrl(uri))
+                        self._session = session
+                        self._ready.set()
+                        self.log("[MCP] Session established.")
+                        await self._reset.wait()
+            except Exception as e:
+                self.log(f"[MCP] Connection lost: {e}")
+            finally:
+                self._session = None
+                self._ready.clear()
+                self._reset.clear()
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    def _on_closed(self):
+        if self._session is not None and not self._reset.is_set():
+            self.log("[MCP] Server process exited. Reconnecting...")
+            self._reset.set()
+
+    async def _on_message(self, message):
+        """서버 알림 처리 (notifications/resources/updated -> 구독 콜백)"""
+        if isinstance(message, ServerNotification) and isinstance(message.root, ResourceUpdatedNotification):
+            uri = str(message.root.params.uri)
+            callback = self._subscriptions.get(uri)
+            if callback:
+                # 콜백이 다시 요청을 보낼 수 있으므로 수신 루프 밖에서 실행
+                asyncio.ensure_future(callback(uri))
+
+    async def subscribe(self, uri: str, callback):
+        """Resource 갱신 알림 구독 (폴링 대신 서버가 자막 저장 시 알려줌)"""
+        self._subscriptions[uri] = callback
+        await self.call(lambda session: session.subscribe_resource(AnyUrl(uri)))
+
+    async def unsubscribe(self, uri: str):
+        if self._subscriptions.pop(uri, None):
+            await self.call(lambda session: session.unsubscribe_resource(AnyUrl(uri)))
+
+    async def get_session(self) -> ClientSession:
+        await asyncio.wait_for(self._ready.wait(), self.CONNECT_TIMEOUT)
+        return self._session
+
+    async def call(self, func):
+        """
+        func(session) 코루틴을 실행합니다.
+        서버 프로세스가 죽어 연결이 끊긴 경우에는 재연결 후 1회 재시도합니다.
+        """
+        for attempt in range(2):
+            session = await self.get_session()
+            try:
+                return await func(session)
+            except Exception as e:
+                if not is_connection_error(e) or attempt:
+                    raise
+                self.log("[MCP] Server process gone. Reconnecting...")
+                if self._session is session:
+                    self._reset.set()
+                    self._ready.clear()
+
+class ClosingStream:
+    """읽기 스트림 래퍼: 스트림이 끝나면(서버 프로세스 종료) on_close 를 호출합니다."""
+
+    def __init__(self, stream, on_close):
+        self.stream = stream
+        self.on_close = on_close
+
+    async def __aenter__(self):
+        await self.stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self.stream.__aexit__(*exc_info)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.stream.__anext__()
+        except (StopAsyncIteration, anyio.ClosedResourceError, anyio.BrokenResourceError):
+            self.on_close()
+            raise
+
+def is_connection_error(e: Exception) -> bool:
+    """서버 프로세스 종료로 인한 전송 계층 오류인지 판별"""
+    if isinstance(e, McpError):
+        return e.error.code == CONNECTION_CLOSED
+    return isinstance(e, (anyio.ClosedResourceError, anyio.BrokenResourceError, ConnectionError))
+
+mcp_connection = MCPConnection()
+
+class PrefetchScheduler:
+    """
+    /watch 감지 시 클릭을 기다리지 않고 서버에 선행 수집(prefetch_video)을 요청합니다. (PREFETCH_ENABLED)
+    빠르게 영상을 넘기는 경우를 위해 PREFETCH_DEBOUNCE 동안 추가 감지가 없을 때만 요청하며,
+    서버는 새 요청을 받으면 이전 영상의 선행 수집을 취소합니다.
+    """
+
+    def __init__(self, connection: MCPConnection):
+        self.connection = connection
+        self._pending = None
+        self._last_video_id = None
+        self._watching = None  # 자막 준비 알림을 기다리는 Resource URI
+
+    def detect(self, video_id: str):
+        """Mitmproxy 스레드에서 호출 (MCP 백그라운드 루프로 전달)"""
+        if not config.PREFETCH_ENABLED or self.connection.loop is None:
+            return
+        self.connection.loop.call_soon_threadsafe(self._reschedule, video_id)
+
+    def _reschedule(self, video_id: str):
+        if self._pending and not self._pending.done():
+            self._pending.cancel()
+        if video_id == self._last_video_id:
+            return
+        self._pending = asyncio.ensure_future(self._fire(video_id))
+
+    async def _fire(self, video_id: str):
+        await asyncio.sleep(config.PREFETCH_DEBOUNCE)
+        self._last_video_id = video_id
+
+        async def _prefetch(session: ClientSession):
+            return await session.call_tool(
+                "prefetch_video",
+                arguments={"video_id": video_id, "analyze": config.PREFETCH_ANALYSIS},
+            )
+
+        async def _on_ready(uri: str):
+            self.connection.log(f"[Prefetch] Transcript ready: {video_id}")
+            if self._watching == uri:
+                self._watching = None
+            await self.connection.unsubscribe(uri)
+
+        try:
+            # 이전 영상의 알림은 더 이상 필요 없음
+            if self._watching:
+                await self.connection.unsubscribe(self._watching)
+            self._watching = f"youtube://transcript/{video_id}"
+            await self.connection.subscribe(self._watching, _on_ready)
+            result = await self.connection.call(_prefetch)
+            self.connection.log(f"[Prefetch] {result.content[0].text}")
+        except Exception as e:
+            self.connection.log(f"[Prefetch Error]: {e}")
+
+prefetch_scheduler = PrefetchScheduler(mcp_connection)
+
+class CaptureForwarder:
+    """
+    브라우저가 받은 유튜브 응답(시청 페이지 / 플레이어 API / timedtext)에서 메타데이터와 자막을 추출하여
+    서버의 ingest_capture Tool 로 전달합니다. 서버는 yt-dlp 로 같은 페이지를 다시 받지 않습니다. (CAPTURE_ENABLED)
+    시청 페이지 / next API 응답의 다음 볼 영상 목록은 queue_watch_next 로 전달합니다. (WATCH_NEXT_ENABLED)
+
+    압축 해제와 파싱(수 MB 의 HTML)은 전용 스레드에서 수행하므로 mitmproxy 이벤트 루프(브라우징)를 막지 않으며,
+    처리가 밀리면 새 응답은 버립니다 (캡처가 없으면 서버가 yt-dlp 로 수집).
+    """
+    MAX_PENDING = 8
+
+    def __init__(self, connection: MCPConnection):
+        self.connection = connection
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="capture")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, url: str, raw: bytes, encoding: str):
+        """Mitmproxy 스레드에서 호출 (본문 참조만 넘기고 즉시 반환)"""
+        if self.connection.loop is None:
+            return
+        with self._lock:
+            if self._pending >= self.MAX_PENDING:
+                return
+            self._pending += 1
+        self._executor.submit(self._process, kind, url, raw, encoding)
+
+    def _process(self, kind: str, url: str, raw: bytes, encoding: str):
+        try:
+            body = decode_content(raw, encoding) if encoding else raw
+            if config.CAPTURE_ENABLED:
+                payload = youtube_capture.extract_capture(kind, url, body)
+                if payload:
+                    self.connection.submit(self._send("ingest_capture", payload))
+            if config.WATCH_NEXT_ENABLED:
+                payload = youtube_capture.extract_watch_next(kind, body)
+                if payload:
+                    self.connection.submit(self._send("queue_watch_next", payload))
+        except Exception as e:
+            self.connection.log(f"[Capture Error] {kind}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def _send(self, tool: str, payload: dict):
+        async def _call(session: ClientSession):
+            return await session.call_tool(tool, arguments=payload)
+
+        try:
+            await self.connection.call(_call)
+        except Exception as e:
+            self.connection.log(f"[Capture Error]: {e}")
+
+capture_forwarder = CaptureForwarder(mcp_connection)
+
+def capture_wanted(kind: str | None) -> bool:
+    """응답 종류별 전달 여부 (시청 페이지/next API 는 다음 볼 영상 목록, 그 외는 캡처)"""
+    if kind in ("watch", "next") and config.WATCH_NEXT_ENABLED:
+        return True
+    return kind not in (None, "next") and config.CAPTURE_ENABLED
+
+async def mcp_client_task(video_id: str, log_callback, stream_callback=None):
+    """
+    유지 중인 MCP 세션으로 Tool을 호출하는 비동기 작업.
+    stream_callback 이 주어지면 서버의 진행 알림(LLM 스트리밍 토큰)을 줄바꿈 없이 실시간 출력합니다.
+    """
+    log_callback(f"Requesting analysis... (Target: {video_id})")
+    streamed = []
+
+    async def _on_progress(progress: float, total: float | None, message: str | None):
+        if not message or not stream_callback:
+            return
+        if not streamed:
+            log_callback("\n[Analysis Result]")
+        streamed.append(message)
+        stream_callback(message)
+
+    async def _analyze(session: ClientSession):
+        log_callback(">> Calling Tool: analyze_sponsor_block")
+        return await session.call_tool(
+            "analyze_sponsor_block",
+            arguments={"video_id": video_id},
+            progress_callback=_on_progress,
+        )
+
+    async def _read_transcript(session: ClientSession):
+        # 미리보기용 앞부분만 요청 (전체 자막을 전송하지 않음)
+        return await session.read_resource(f"youtube://transcript/{video_id}?bytes=0-1023")
+
     try:
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                
-                log_callback(">> Calling Tool: analyze_sponsor_block")
-                result = await session.call_tool(
-                    "analyze_sponsor_block",
-                    arguments={"video_id": video_id}
-                )
-                
-                content = result.content[0].text
-                log_callback(f"\n[Analysis Result]\n{content}\n")
-                
-                log_callback(">> Reading Resource: youtube://transcript/...")
-                try:
-                    res = await session.read_resource(f"youtube://transcript/{video_id}")
-                    log_callback(f"[Resource Content Preview]: {str(res.contents[0].text)[:100]}...\n")
-                except Exception as e:
-                    log_callback(f"[Resource Error]: {e}")
+        result = await mcp_connection.call(_analyze)
+        content = result.content[0].text
+        if result.isError:
+            # 자막 수집 / LLM 분석 실패 (결과가 아니므로 자막 미리보기도 생략)
+            log_callback(f"\n[Analysis Error]\n{content}\n")
+            return
+        if "".join(streamed) == content:
+            # 이미 실시간으로 출력됨
+            log_callback("\n")
+        else:
+            log_callback(f"\n[Analysis Result]\n{content}\n")
+        
+        log_callback(">> Reading Resource: youtube://transcript/...")
+        try:
+            res = await mcp_connection.call(_read_transcript)
+            log_callback(f"[Resource Content Preview]: {str(res.contents[0].text)[:100]}...\n")
+        except Exception as e:
+            log_callback(f"[Resource Error]: {e}")
 
     except Exception as e:
         log_callback(f"[MCP Error]: {str(e)}")
@@ -83,6 +380,8 @@ class InspectorGUI:
     def __init__(self):
         self.root = None
         self.current_video_id = None
+        # 다음 볼 영상 대기열에서 분석을 마친 영상 ID
+        self.pre_analyzed = set()
         
     def start(self):
         """GUI 메인 루프 실행"""
@@ -93,6 +392,9 @@ class InspectorGUI:
         tk.Label(self.root, text="Waiting for YouTube Video...", font=("Arial", 12, "bold")).pack(pady=10)
         self.status_lbl = tk.Label(self.root, text="Status: Idle", fg="gray")
         self.status_lbl.pack()
+        self.queue_lbl = tk.Label(self.root, text="", fg="gray", justify=tk.LEFT)
+        if config.WATCH_NEXT_ENABLED:
+            self.queue_lbl.pack()
         
         self.btn_analyze = tk.Button(self.root, text="Analyze via MCP", state=tk.DISABLED, 
                                      command=self.on_analyze, bg="#dddddd", height=2)
@@ -101,6 +403,11 @@ class InspectorGUI:
         self.log_area = scrolledtext.ScrolledText(self.root, height=20)
         self.log_area.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
         
+        # MCP 서버 세션을 미리 띄워 두어 클릭 시에는 Tool 호출 비용만 들도록 함
+        mcp_connection.start(self.safe_log)
+        if config.WATCH_NEXT_ENABLED:
+            mcp_connection.submit(self.watch_queue())
+        
         self.check_queue()
         self.root.mainloop()
 
@@ -116,12 +423,44 @@ class InspectorGUI:
 
     def handle_detection(self, video_id):
         self.current_video_id = video_id
-        self.status_lbl.config(text=f"Detected: {video_id}", fg="blue")
+        if video_id in self.pre_analyzed:
+            self.status_lbl.config(text=f"Detected: {video_id} (pre-analyzed)", fg="green")
+        else:
+            self.status_lbl.config(text=f"Detected: {video_id}", fg="blue")
         self.btn_analyze.config(state=tk.NORMAL, bg="#4CAF50", fg="white")
         self.log(f"Captured Video ID: {video_id}")
         self.root.deiconify()
         self.root.lift()
 
+    async def watch_queue(self):
+        """다음 볼 영상 대기열 Resource 구독 (서버가 상태를 바꿀 때마다 상태 줄 갱신)"""
+        async def _on_update(uri: str):
+            try:
+                res = await mcp_connection.call(lambda session: session.read_resource(uri))
+                state = json.loads(res.contents[0].text)
+                self.root.after(0, lambda: self.show_queue(state))
+            except Exception as e:
+                self.safe_log(f"[WatchNext Error]: {e}")
+
+        try:
+            await mcp_connection.subscribe(WATCH_NEXT_URI, _on_update)
+        except Exception as e:
+            self.safe_log(f"[WatchNext Error]: {e}")
+            return
+        await _on_update(WATCH_NEXT_URI)
+
+    def show_queue(self, state: dict):
+        ready = [r["video_id"] for r in state["recent"] if r["result"] != "error"]
+        self.pre_analyzed.update(ready)
+        budget = state["budget"]
+        parts = [f"queued {len(state['pending'])}", f"budget {budget['used']}/{budget['per_hour']} per hour"]
+        if state["running"]:
+            parts.insert(0, f"analyzing {state['running']}")
+        text = "Watch-next: " + " | ".join(parts)
+        if ready:
+            text += f"\nReady: {', '.join(ready[:3])}"
+        self.queue_lbl.config(text=text)
+
     def log(self, msg):
         self.log_area.insert(tk.END, msg + "\n")
         self.log_area.see(tk.END)
@@ -129,15 +468,28 @@ class InspectorGUI:
     def on_analyze(self):
         if not self.current_video_id: return
         self.btn_analyze.config(state=tk.DISABLED)
-        threading.Thread(target=self.run_async_bridge, daemon=True).start()
+        self.run_async_bridge()
 
     def run_async_bridge(self):
-        asyncio.run(mcp_client_task(self.current_video_id, self.safe_log))
-        self.root.after(0, lambda: self.btn_analyze.config(state=tk.NORMAL))
+        """GUI 스레드 -> MCP 백그라운드 루프로 작업 전달 (블로킹 없음)"""
+        future = mcp_connection.submit(
+            mcp_client_task(self.current_video_id, self.safe_log, self.safe_stream)
+        )
+        future.add_done_callback(
+            lambda _: self.root.after(0, lambda: self.btn_analyze.config(state=tk.NORMAL))
+        )
 
     def safe_log(self, msg):
         self.root.after(0, lambda: self.log(msg))
 
+    def stream(self, text):
+        """스트리밍 토큰 출력 (줄바꿈 없이 이어 붙임)"""
+        self.log_area.insert(tk.END, text)
+        self.log_area.see(tk.END)
+
+    def safe_stream(self, text):
+        self.root.after(0, lambda: self.stream(text))
+
 gui_app = InspectorGUI()
 
 # ==============================================================================
@@ -163,26 +515,43 @@ class SponsorDetector:
         if not sni:
             return
 
-        # SNI(접속 도메인)가 허용 목록에 포함되는지 확인
-        is_allowed = any(domain in sni for domain in config.ALLOWED_DOMAINS)
-
-        if not is_allowed:
+        # SNI(접속 도메인)가 허용 도메인(또는 하위 도메인)인지 확인
+        if not ALLOWED_HOSTS.matches(sni):
             # 허용되지 않은 도메인은 인터셉트하지 않음 (Pass-through)
             data.ignore_connection = True
 
     def request(self, flow: http.HTTPFlow):
         """HTTP 요청 단계 분석"""
         # 혹시 인터셉트된 트래픽 중에서도 한 번 더 필터링
-        if not any(d in flow.request.pretty_host for d in config.ALLOWED_DOMAINS):
+        host = flow.request.pretty_host
+        if not ALLOWED_HOSTS.matches(host):
             return
 
-        if "youtube.com" in flow.request.pretty_host and "/watch" in flow.request.path:
+        if WATCH_HOSTS.matches(host) and "/watch" in flow.request.path:
             query = flow.request.query
             if "v" in query:
                 video_id = query["v"]
                 GUI_QUEUE.put(video_id)
+                prefetch_scheduler.detect(video_id)
                 ctx.log.info(f"YouTube Video Detected: {video_id}")
 
+    def response(self, flow: http.HTTPFlow):
+        """HTTP 응답 단계: 메타데이터/자막/다음 볼 영상이 담긴 유튜브 응답을 캡처 스레드로 전달"""
+        if flow.response is None or flow.response.status_code != 200:
+            return
+        if not WATCH_HOSTS.matches(flow.request.pretty_host):
+            return
+        kind = youtube_capture.classify(flow.request.path)
+        if not capture_wanted(kind):
+            return
+        raw = flow.response.raw_content
+        if not raw or len(raw) > config.CAPTURE_MAX_BODY:
+            return
+        # 압축 해제(.content)도 이벤트 루프 밖에서 하도록 원본 바이트와 인코딩만 넘김
+        capture_forwarder.submit(
+            kind, flow.request.pretty_url, raw, flow.response.headers.get("content-encoding", "")
+        )
+
 addons = [
     SponsorDetector()
 ]
\ No newline at end of file
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# 저장소 루트를 import 경로에 추가 (pytest 를 어느 위치에서 실행해도 mcp_test 를 찾도록)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURE_DIR = os.path.join(ROOT, "benchmarks", "fixtures")
+FLOW_DIR = os.path.join(ROOT, "benchmarks", "flows")
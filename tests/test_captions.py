@@ -0,0 +1,81 @@
+import json
+import os
+
+from conftest import FIXTURE_DIR
+from mcp_test import captions
+from mcp_test.analysis import reduce_window_results
+
+
+def load(name: str) -> captions.SegmentStore:
+    return captions.load_caption_file(os.path.join(FIXTURE_DIR, name))
+
+
+def segments(store: captions.SegmentStore) -> list[tuple[float, float, str]]:
+    return [(store.starts[i], store.ends[i], store.segment_text(i)) for i in range(len(store))]
+
+
+def test_parse_json3_fixture():
+    store = load("bench_ko.json3")
+    # 줄바꿈만 있는 이벤트는 건너뛰고, 한 이벤트의 segs 는 이어 붙임
+    assert segments(store) == [
+        (0.0, 4.0, "안녕하세요 여러분"),
+        (4.0, 9.0, "오늘은 캠핑 장비를 소개합니다"),
+        (20.0, 26.0, "이 영상은 벤치VPN의 유료 광고를 포함하고 있습니다"),
+        (26.0, 34.0, "설명란 링크에서 할인 코드 CAMP 를 입력하세요"),
+        (40.0, 45.0, "그럼 바로 시작해 볼게요"),
+    ]
+    assert store.duration == 45.0
+
+
+def test_parse_vtt_fixture_drops_rolling_duplicates():
+    store = load("bench_short.vtt")
+    # 자동 자막의 롤링 표시(이전 줄 반복)는 한 번만 남음
+    assert segments(store) == [
+        (0.0, 4.0, "hey everyone welcome back to the channel"),
+        (4.0, 9.0, "today we're looking at a budget mechanical keyboard"),
+        (30.0, 36.0, "but first this video is sponsored by BenchVPN"),
+        (36.0, 44.0, "go to benchvpn.com slash keys and use code KEYS for 70% off"),
+        (62.5, 68.0, "okay let's unbox this thing"),
+    ]
+
+
+def test_transcript_round_trip():
+    store = load("bench_short.vtt")
+    transcript = captions.format_transcript("Title", "Description", store)
+    header, parsed = captions.parse_transcript(transcript)
+    assert header.startswith("Title: Title")
+    assert parsed.format_lines() == store.format_lines()
+
+
+def test_windows_overlap():
+    store = load("bench_short.vtt")
+    # 30초 창, 10초 겹침 -> 20초 간격, 창 경계의 구간은 양쪽 창에 모두 포함될 수 있음
+    assert store.windows(30, 10) == [(0.0, 30.0, 0, 2), (20.0, 50.0, 2, 4), (40.0, 68.0, 4, 5)]
+    # 한 창에 모두 들어가면 분할하지 않음
+    assert store.windows(600, 60) == [(0.0, 68.0, 0, 5)]
+
+
+def test_reduce_merges_overlapping_window_results():
+    # 겹치는 두 창이 같은 광고를 조금 다른 경계로 보고한 경우 하나로 합침
+    window_texts = [
+        json.dumps({"sponsor": "BenchVPN", "segments": [{"start": "00:30", "end": "00:40"}]}),
+        "Here is the result:\n```json\n" + json.dumps({"sponsor": "BenchVPN", "segments": ["00:36 - 00:44"]}) + "\n```",
+        "not json",
+    ]
+    result = reduce_window_results(window_texts)
+    assert result["sponsor"] == "BenchVPN"
+    assert result["segments"] == [
+        {"start": 30.0, "end": 44.0, "timestamp": "00:30 - 00:44", "sponsor": "BenchVPN"},
+    ]
+    assert result["windows"] == 3
+    assert result["failed_windows"] == 1
+
+
+def test_reduce_keeps_separate_segments_apart():
+    window_texts = [
+        json.dumps({"segments": [{"start": 10, "end": 20, "sponsor": "A"}]}),
+        json.dumps({"segments": [{"start": 120, "end": 150, "sponsor": "B"}]}),
+    ]
+    result = reduce_window_results(window_texts)
+    assert [(s["start"], s["end"], s["sponsor"]) for s in result["segments"]] == [(10.0, 20.0, "A"), (120.0, 150.0, "B")]
+    assert result["sponsor"] == "A, B"
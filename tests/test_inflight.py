@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from mcp_test.inflight import InflightGroup
+
+
+def test_waiters_share_one_call():
+    async def main():
+        group = InflightGroup("test")
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*[group.run("k", work) for _ in range(5)])
+        return results, calls, group.stats()
+
+    results, calls, stats = asyncio.run(main())
+    assert results == ["done"] * 5
+    assert calls == 1
+    assert stats == {"name": "test", "in_flight": 0, "started": 1, "coalesced": 4}
+
+
+def test_error_reaches_every_waiter():
+    async def main():
+        group = InflightGroup("test")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*[group.run("k", fail) for _ in range(3)], return_exceptions=True)
+        return results, group.in_flight()
+
+    results, in_flight = asyncio.run(main())
+    assert len(results) == 3
+    assert all(isinstance(r, ValueError) and str(r) == "boom" for r in results)
+    # 실패한 작업은 남지 않으므로 다음 호출은 새로 실행
+    assert in_flight == 0
+
+
+def test_one_waiter_cancelling_does_not_affect_others():
+    async def main():
+        group = InflightGroup("test")
+        release = asyncio.Event()
+        cancelled = False
+
+        async def work():
+            nonlocal cancelled
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            return "done"
+
+        first = asyncio.create_task(group.run("k", work))
+        second = asyncio.create_task(group.run("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, cancelled
+
+    result, cancelled = asyncio.run(main())
+    assert result == "done"
+    assert not cancelled
+
+
+def test_last_waiter_leaving_cancels_shared_task():
+    async def main():
+        group = InflightGroup("test")
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(group.run("k", work)) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+        # 취소된 작업에 합류하지 않고 새 작업을 시작
+        async def again():
+            return "fresh"
+
+        return await group.run("k", again), group.stats()["started"]
+
+    result, started = asyncio.run(main())
+    assert result == "fresh"
+    assert started == 2
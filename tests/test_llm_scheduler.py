@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from mcp_test.llm_scheduler import (
+    LLMScheduler, Ticket, PRIORITY_INTERACTIVE, PRIORITY_BATCH, PRIORITY_BACKGROUND,
+)
+
+
+async def run_in_order(scheduler: LLMScheduler, requests: list[tuple[str, Ticket]]) -> list[str]:
+    """자리 하나를 잡은 상태에서 requests 를 대기시킨 뒤, 자리를 얻은 순서를 반환"""
+    order = []
+
+    async def call(name: str, ticket: Ticket):
+        async with scheduler.slot(ticket):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    await scheduler.acquire(Ticket())
+    tasks = []
+    for name, ticket in requests:
+        tasks.append(asyncio.create_task(call(name, ticket)))
+        await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_higher_priority_runs_first_and_fifo_within_priority():
+    scheduler = LLMScheduler(1)
+    order = asyncio.run(run_in_order(scheduler, [
+        ("background", Ticket(PRIORITY_BACKGROUND)),
+        ("batch-1", Ticket(PRIORITY_BATCH)),
+        ("interactive", Ticket(PRIORITY_INTERACTIVE)),
+        ("batch-2", Ticket(PRIORITY_BATCH)),
+    ]))
+    assert order == ["interactive", "batch-1", "batch-2", "background"]
+    assert scheduler.inflight == 0
+    assert scheduler.granted == 5
+
+
+def test_promote_while_waiting_moves_ahead():
+    async def main():
+        scheduler = LLMScheduler(1)
+        late = Ticket(PRIORITY_BACKGROUND)
+        requests = [("batch", Ticket(PRIORITY_BATCH)), ("promoted", late)]
+
+        async def promote_soon():
+            await asyncio.sleep(0)
+            # 병합된 요청이 사용자 클릭 우선순위로 합류
+            late.promote(PRIORITY_INTERACTIVE)
+
+        promoter = asyncio.create_task(promote_soon())
+        order = await run_in_order(scheduler, requests)
+        await promoter
+        return order
+
+    assert asyncio.run(main()) == ["promoted", "batch"]
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def main():
+        scheduler = LLMScheduler(1)
+        await scheduler.acquire(Ticket())
+        waiter = asyncio.create_task(scheduler.acquire(Ticket(PRIORITY_BATCH)))
+        await asyncio.sleep(0)
+        # 자리를 넘겨받은 직후 취소되면 다음 대기자에게 양보
+        scheduler.release()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        next_one = asyncio.create_task(scheduler.acquire(Ticket()))
+        await asyncio.wait_for(next_one, 1)
+        scheduler.release()
+        return scheduler.inflight, scheduler.queue_depth()
+
+    inflight, depth = asyncio.run(main())
+    assert inflight == 0
+    assert sum(depth.values()) == 0
+
+
+def test_run_retries_and_releases_slot_during_backoff():
+    async def main():
+        scheduler = LLMScheduler(1)
+        attempts = 0
+        other_ran_during_backoff = False
+
+        async def flaky():
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                asyncio.get_running_loop().call_soon(start_other)
+                raise ConnectionError("temporary")
+            return "ok"
+
+        async def other():
+            nonlocal other_ran_during_backoff
+            async with scheduler.slot(Ticket(PRIORITY_BACKGROUND)):
+                other_ran_during_backoff = attempts == 1
+
+        tasks = []
+
+        def start_other():
+            tasks.append(asyncio.create_task(other()))
+
+        result = await scheduler.run(
+            Ticket(), flaky, retries=2, backoff=0.02, retryable=lambda e: isinstance(e, ConnectionError)
+        )
+        await asyncio.gather(*tasks)
+        return result, attempts, scheduler.retries, other_ran_during_backoff
+
+    assert asyncio.run(main()) == ("ok", 2, 1, True)
+
+
+def test_run_gives_up_on_non_retryable_errors():
+    async def main():
+        scheduler = LLMScheduler(1)
+
+        async def fail():
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            await scheduler.run(Ticket(), fail, retries=3, retryable=lambda e: isinstance(e, ConnectionError))
+        return scheduler.retries, scheduler.inflight
+
+    assert asyncio.run(main()) == (0, 0)
@@ -0,0 +1,47 @@
+import asyncio
+
+from mcp_test.prefetch import Prefetcher
+
+
+def test_cancel_except_only_touches_the_owner():
+    async def main():
+        prefetcher = Prefetcher(concurrency=4)
+        finished = []
+
+        def job(name):
+            async def run():
+                await asyncio.sleep(0.05)
+                finished.append(name)
+            return run
+
+        alice, bob = object(), object()
+        prefetcher.schedule("v1", job("alice:v1"), owner=alice)
+        prefetcher.schedule("v2", job("bob:v2"), owner=bob)
+        await asyncio.sleep(0)
+        # alice 가 다른 영상으로 이동 -> alice 의 v1 만 취소
+        cancelled = prefetcher.cancel_except({"v3"}, owner=alice)
+        prefetcher.schedule("v3", job("alice:v3"), owner=alice)
+        await asyncio.sleep(0.1)
+        return cancelled, sorted(finished), prefetcher.stats()
+
+    cancelled, finished, stats = asyncio.run(main())
+    assert cancelled == ["v1"]
+    assert finished == ["alice:v3", "bob:v2"]
+    assert stats["cancelled"] == 1 and stats["completed"] == 2
+    assert stats["active"] == []
+
+
+def test_same_video_is_scheduled_once_per_owner():
+    async def main():
+        prefetcher = Prefetcher()
+        owner = object()
+
+        async def run():
+            await asyncio.sleep(0.01)
+
+        states = [prefetcher.schedule("v1", run, owner=owner), prefetcher.schedule("v1", run, owner=owner),
+                  prefetcher.schedule("v1", run, owner=object())]
+        await asyncio.sleep(0.05)
+        return states
+
+    assert asyncio.run(main()) == ["scheduled", "running", "scheduled"]
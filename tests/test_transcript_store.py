@@ -0,0 +1,37 @@
+from mcp_test.transcript_store import TranscriptStore
+
+
+def open_store(directory, max_size: int = 4) -> TranscriptStore:
+    store = TranscriptStore("transcripts", str(directory), max_size=max_size)
+    # 쓰기마다 정리하도록
+    store.TRIM_INTERVAL = 1
+    return store
+
+
+def transcript(key: str) -> str:
+    return f"Title: {key}\nDescription: \n\nTranscript:\n[0.0-5.0] {key} line\n"
+
+
+def test_trim_evicts_least_recently_read(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr("mcp_test.transcript_store.time.time", lambda: float(next(clock)))
+    store = open_store(tmp_path)
+    for key in "abcd":
+        store[key] = transcript(key)
+    # 가장 먼저 저장했지만 최근에 읽은 a 는 남고, 그다음으로 오래된 b 가 정리됨
+    assert store.get("a") == transcript("a")
+    store["e"] = transcript("e")
+    assert sorted(store.keys()) == ["a", "c", "d", "e"]
+    assert store.stats()["evictions"] == 1
+
+
+def test_reads_in_another_process_count_for_trim(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr("mcp_test.transcript_store.time.time", lambda: float(next(clock)))
+    writer, reader = open_store(tmp_path), open_store(tmp_path)
+    for key in "abcd":
+        writer[key] = transcript(key)
+    # 쓰기가 없는 쪽의 조회 시각도 TRIM_INTERVAL 개가 모이면 색인에 반영됨
+    assert reader.read_range("a", 0, 5) == "[0.0-5.0] a line"
+    writer["e"] = transcript("e")
+    assert "a" in writer and "b" not in writer
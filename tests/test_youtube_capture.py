@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+from urllib.parse import urlsplit
+
+import pytest
+
+from conftest import FLOW_DIR
+from mcp_test import core
+from mcp_test import youtube_capture
+
+
+def load_flows() -> dict[str, dict]:
+    """기록된 프록시 응답 -> 파일 이름별 ingest_capture 인자"""
+    with open(os.path.join(FLOW_DIR, "manifest.json"), encoding="utf-8") as f:
+        flows = json.load(f)
+    captures = {}
+    for flow in flows:
+        with open(os.path.join(FLOW_DIR, flow["file"]), "rb") as f:
+            body = f.read()
+        kind = youtube_capture.classify(urlsplit(flow["url"]).path)
+        captures[flow["file"]] = youtube_capture.extract_capture(kind, flow["url"], body)
+    return captures
+
+
+def caption_lines(transcript: str) -> list[str]:
+    return [line for line in transcript.splitlines() if line.startswith("[")]
+
+
+def test_extract_capture_from_recorded_flows():
+    captures = load_flows()
+    watch = captures["watch.html"]
+    assert watch["video_id"] == "capTest0001"
+    assert watch["title"] == "Budget mechanical keyboard review"
+    assert [(t["language"], t["kind"]) for t in watch["tracks"]] == [("en", "asr")]
+
+    player = captures["player.json"]
+    assert player["video_id"] == "capTest0002"
+    assert [(t["language"], t["kind"]) for t in player["tracks"]] == [("en", "asr"), ("ko", "manual")]
+    assert all(youtube_capture.is_caption_url(t["url"]) for t in watch["tracks"] + player["tracks"])
+
+    # next 응답은 ingest_capture 대상이 아님
+    assert captures["next.json"] is None
+    assert captures["timedtext.json3"]["captions"]["ext"] == "json3"
+    assert captures["timedtext_srv1.xml"]["captions"]["language"] == "ko"
+
+
+@pytest.mark.parametrize("url", [
+    "http://www.youtube.com/api/timedtext?v=x&lang=en",
+    "https://evil.example/api/timedtext?v=x&lang=en",
+    "https://www.youtube.com.evil.example/api/timedtext?v=x&lang=en",
+    "https://notyoutube.com/api/timedtext?v=x&lang=en",
+    "https://www.youtube.com@evil.example/api/timedtext?v=x&lang=en",
+    "https://www.youtube.com:8443/api/timedtext?v=x&lang=en",
+    "https://www.youtube.com/redirect?q=https://evil.example/",
+    "file:///etc/passwd",
+    None,
+])
+def test_non_youtube_track_urls_are_rejected(url):
+    assert not youtube_capture.is_caption_url(url)
+    data = {
+        "videoDetails": {"videoId": "capTest0003", "title": "t"},
+        "captions": {"playerCaptionsTracklistRenderer": {"captionTracks": [
+            {"baseUrl": url, "languageCode": "en", "name": {"simpleText": "English"}},
+        ]}},
+    }
+    assert youtube_capture.summarize_player_response(data)["tracks"] == []
+    if url is not None:
+        # 캡처 레코드에 이미 들어간 URL 이라도 요청 직전에 거부
+        with pytest.raises(ValueError):
+            core._download_track({"language": "en", "kind": "manual", "url": url})
+
+
+def test_transcript_from_capture_uses_captured_captions():
+    captures = load_flows()
+
+    async def main():
+        for name in ("watch.html", "timedtext.json3", "player.json", "timedtext_srv1.xml"):
+            capture = captures[name]
+            await core.store_capture(capture["video_id"], capture)
+        return (
+            await core.transcript_from_capture("capTest0001"),
+            await core.transcript_from_capture("capTest0002"),
+            await core.transcript_from_capture("capTest9999"),
+        )
+
+    english, korean, missing = asyncio.run(main())
+    assert english.startswith("Title: Budget mechanical keyboard review\n")
+    assert korean.startswith("Title: 캠핑 장비 리뷰\n")
+    assert len(caption_lines(english)) == 4 and len(caption_lines(korean)) == 4
+    # 캡처가 없으면 yt-dlp 로 넘김
+    assert missing is None
+
+
+def test_transcript_from_capture_does_not_fetch_foreign_track():
+    captures = load_flows()
+    capture = dict(captures["watch.html"], video_id="capTest0004")
+    # 선호 트랙(ko)이 캡처된 자막(en)과 달라 다운로드를 시도하지만, 유튜브 밖 URL 이므로 캡처된 자막 사용
+    capture["tracks"] = capture["tracks"] + [
+        {"language": "ko", "kind": "manual", "name": "한국어", "url": "https://evil.example/api/timedtext?lang=ko"},
+    ]
+
+    async def main():
+        await core.store_capture("capTest0004", capture)
+        await core.store_capture("capTest0004", captures["timedtext.json3"])
+        return await core.transcript_from_capture("capTest0004")
+
+    transcript = asyncio.run(main())
+    assert transcript.startswith("Title: Budget mechanical keyboard review\n")
+    assert len(caption_lines(transcript)) == 4